@@ -1 +1,6 @@
 __version__ = '0.3.6'
+
+from astmonkey.transformers import Annotations
+from astmonkey.utils import clone, fix_locations
+from astmonkey.treediff import diff
+from astmonkey.serialization import deserialize, serialize
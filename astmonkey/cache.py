@@ -0,0 +1,175 @@
+import ast
+import errno
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+import astmonkey
+from astmonkey.serialization import deserialize, serialize
+from astmonkey.transformers import ParentChildNodeTransformer
+from astmonkey.visitors import FixLinenoNodeVisitor, SourceGeneratorNodeVisitor
+
+
+class TreeCache(object):
+    """Persistent on-disk cache of parsed and annotated trees.
+
+    Entries are keyed by the content hash of the source, the Python version
+    and the astmonkey version, so a cache directory may be shared between
+    interpreters. Every entry holds the tree in the format of
+    `astmonkey.serialization`, annotated with `ParentChildNodeTransformer`
+    again on load, and, once requested, the code rendered by `to_source`. The directory is kept below `max_size` bytes by evicting the
+    least recently used entries.
+    """
+
+    suffix = '.tree'
+
+    def __init__(self, directory, max_size=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return float(self.hits) / total if total else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+        }
+
+    def key(self, source):
+        if not isinstance(source, bytes):
+            source = source.encode('utf-8')
+        digest = hashlib.sha256(source)
+        digest.update('{0}.{1}/{2}'.format(sys.version_info[0], sys.version_info[1],
+                                           astmonkey.__version__).encode('ascii'))
+        return digest.hexdigest()
+
+    def parse(self, source, filename='<unknown>'):
+        """Return the annotated tree of `source`, parsing it only on a cache miss."""
+        return self._entry(source, filename)[1]['tree']
+
+    def to_source(self, source, filename='<unknown>', indent_with=' ' * 4):
+        """Return `source` round-tripped through the source generator."""
+        key, entry = self._entry(source, filename)
+        generated = entry['generated']
+        if indent_with not in generated:
+            generated[indent_with] = self._generate(entry['tree'], indent_with)
+            self._store(key, entry)
+        return generated[indent_with]
+
+    def clear(self):
+        for name in self._entries():
+            self._remove(name)
+        self._size = 0
+
+    def _entry(self, source, filename):
+        key = self.key(source)
+        entry = self._load(key)
+        if entry is None:
+            self.misses += 1
+            tree = ParentChildNodeTransformer().visit(ast.parse(source, filename))
+            entry = {'tree': tree, 'generated': {}}
+            self._store(key, entry)
+        else:
+            self.hits += 1
+        return key, entry
+
+    @staticmethod
+    def _generate(tree, indent_with):
+        FixLinenoNodeVisitor().visit(tree)
+        generator = SourceGeneratorNodeVisitor(indent_with)
+        generator.visit(tree)
+        return ''.join(generator.result)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _load(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            entry['tree'] = deserialize(entry['tree'])
+        except (IOError, OSError):
+            return None
+        except Exception:
+            self._remove(os.path.basename(path))
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry
+
+    def _store(self, key, entry):
+        # the serialization walks trees iteratively and leaves annotations
+        # out, which also hold nodes of unrelated trees in shared context nodes
+        data = pickle.dumps({'tree': serialize(entry['tree']), 'generated': entry['generated']},
+                            pickle.HIGHEST_PROTOCOL)
+        path = self._path(key)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        if self._size is None:
+            self._size = self._total_size()
+        else:
+            self._size += len(data) - old_size
+        if self._size > self.max_size:
+            self._evict(keep=os.path.basename(path))
+
+    def _entries(self):
+        return [name for name in os.listdir(self.directory) if name.endswith(self.suffix)]
+
+    def _total_size(self):
+        total = 0
+        for name in self._entries():
+            try:
+                total += os.path.getsize(os.path.join(self.directory, name))
+            except OSError:
+                pass
+        return total
+
+    def _evict(self, keep):
+        entries = []
+        for name in self._entries():
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name, stat.st_size))
+        entries.sort()
+        self._size = sum(size for _, _, size in entries)
+        for _, name, size in entries:
+            if self._size <= self.max_size:
+                break
+            if name != keep:
+                self._remove(name)
+                self._size -= size
+
+    def _remove(self, name):
+        try:
+            os.unlink(os.path.join(self.directory, name))
+        except OSError:
+            pass
@@ -0,0 +1,231 @@
+"""Round-trip Python files through the astmonkey source generator."""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from astmonkey.transformers import ParentChildNodeTransformer
+from astmonkey.utils import check_version
+from astmonkey.visitors import GraphNodeVisitor, to_source
+
+if not check_version(from_inclusive=(3, 3)):
+    raise ImportError('astmonkey.cli needs Python 3.3+')
+
+INDEX_FILENAME = '.astmonkey-index.json'
+
+
+def find_sources(paths):
+    """Return (path, relative output path) pairs of all Python files in `paths`.
+
+    Files in directories are relative to the directory, files given directly
+    are relative to the current directory (or to the root if they are not in
+    it), so files with the same names in different directories do not collide.
+    """
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, dirnames, filenames in os.walk(path):
+                dirnames[:] = sorted(name for name in dirnames if not name.startswith('.'))
+                for filename in sorted(filenames):
+                    if filename.endswith('.py'):
+                        file_path = os.path.join(directory, filename)
+                        sources.append((file_path, os.path.relpath(file_path, path)))
+        else:
+            sources.append((path, _relative_path(path)))
+    return sources
+
+
+def _relative_path(path):
+    try:
+        relative_path = os.path.relpath(path)
+    except ValueError:
+        # a path on another drive
+        relative_path = os.pardir
+    if relative_path.split(os.sep)[0] == os.pardir:
+        relative_path = os.path.splitdrive(os.path.abspath(path))[1].lstrip(os.sep)
+    return relative_path
+
+
+def render(source, dot=False):
+    node = ast.parse(source)
+    if dot:
+        visitor = GraphNodeVisitor()
+        visitor.visit(ParentChildNodeTransformer().visit(node))
+        return visitor.graph.to_string()
+    return to_source(node)
+
+
+def render_file(path, output_path, dot=False):
+    """Render a single file and return the content hash of the source."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    _write_atomic(output_path, render(data, dot).encode('utf-8'))
+    return hashlib.sha256(data).hexdigest()
+
+
+class Index(object):
+    """Stat and content hash of every rendered file, stored between runs."""
+
+    def __init__(self, path):
+        self.path = path
+        self.changed = False
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def stat(path):
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def is_fresh(self, path, output_path):
+        entry = self.entries.get(path)
+        if entry is None or not os.path.exists(output_path):
+            return False
+        stat = self.stat(path)
+        if entry['stat'] == stat:
+            return True
+        with open(path, 'rb') as f:
+            if hashlib.sha256(f.read()).hexdigest() != entry['hash']:
+                return False
+        entry['stat'] = stat
+        self.changed = True
+        return True
+
+    def update(self, path, content_hash, stat):
+        self.entries[path] = {'stat': stat, 'hash': content_hash}
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        self.changed = False
+        _write_atomic(self.path, json.dumps(self.entries, sort_keys=True).encode('utf-8'))
+
+
+class Runner(object):
+
+    def __init__(self, paths, output=None, dot=False, jobs=1, index_path=None, stdout=None, stderr=None):
+        self.paths = paths
+        self.output = output
+        self.dot = dot
+        self.jobs = jobs
+        self.stdout = stdout or sys.stdout
+        self.stderr = stderr or sys.stderr
+        self.index = None
+        if output is not None:
+            self.index = Index(index_path or os.path.join(output, INDEX_FILENAME))
+
+    def run(self):
+        """Render all changed files. Returns the number of failed files."""
+        if self.output is None:
+            return self._print_all()
+        tasks = []
+        failures = 0
+        for path, relative_path in find_sources(self.paths):
+            output_path = self._output_path(relative_path)
+            try:
+                if not self.index.is_fresh(path, output_path):
+                    tasks.append((path, output_path, Index.stat(path)))
+            except OSError as e:
+                failures += 1
+                self.stderr.write('{0}: {1}\n'.format(path, e))
+        for (path, _, stat), (content_hash, error) in zip(tasks, self._map(tasks)):
+            if error is None:
+                self.index.update(path, content_hash, stat)
+                self.stdout.write('{0}\n'.format(path))
+            else:
+                failures += 1
+                self.stderr.write('{0}: {1}\n'.format(path, error))
+        self.index.save()
+        return failures
+
+    def watch(self, interval=1.0):
+        while True:
+            self.run()
+            time.sleep(interval)
+
+    def _print_all(self):
+        failures = 0
+        for path, _ in find_sources(self.paths):
+            try:
+                with open(path, 'rb') as f:
+                    self.stdout.write(render(f.read(), self.dot) + '\n')
+            except Exception as e:
+                failures += 1
+                self.stderr.write('{0}: {1}\n'.format(path, _describe(e)))
+        return failures
+
+    def _output_path(self, relative_path):
+        if self.dot:
+            relative_path = os.path.splitext(relative_path)[0] + '.dot'
+        return os.path.join(self.output, relative_path)
+
+    def _map(self, tasks):
+        arguments = [(path, output_path, self.dot) for path, output_path, _ in tasks]
+        if self.jobs > 1 and len(arguments) > 1:
+            with ProcessPoolExecutor(self.jobs) as executor:
+                return list(executor.map(_render_task, arguments))
+        return [_render_task(task) for task in arguments]
+
+
+def _render_task(task):
+    # any error of a single file is reported, so it does not stop other files or watching
+    try:
+        return render_file(*task), None
+    except Exception as e:
+        return None, _describe(e)
+
+
+def _describe(error):
+    # errors are sent back from worker processes as strings, not all exceptions can be pickled
+    if isinstance(error, (SyntaxError, OSError)):
+        return str(error)
+    return '{0}: {1}'.format(error.__class__.__name__, error)
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path) or '.'
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='astmonkey', description=__doc__)
+    parser.add_argument('paths', nargs='+', metavar='PATH', help='Python files or directories')
+    parser.add_argument('-o', '--output', help='write results to this directory instead of stdout')
+    parser.add_argument('--dot', action='store_true', help='emit DOT graphs instead of source code')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--index', help='path of the index of rendered files (default: OUTPUT/{0})'.format(
+        INDEX_FILENAME))
+    parser.add_argument('-w', '--watch', action='store_true', help='keep rendering files when they change')
+    parser.add_argument('--interval', type=float, default=1.0, help='watch polling interval in seconds')
+    args = parser.parse_args(argv)
+    if args.watch and args.output is None:
+        parser.error('--watch requires --output')
+    runner = Runner(args.paths, output=args.output, dot=args.dot, jobs=args.jobs, index_path=args.index)
+    if args.watch:
+        try:
+            runner.watch(args.interval)
+        except KeyboardInterrupt:
+            return 0
+    return 1 if runner.run() else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""Compilation of modules unit by unit, reusing code objects of unchanged units."""
+import __future__
+import ast
+import copy
+import types
+
+from astmonkey.treediff import _subtree_keys
+
+# nodes missing in older versions of Python are never matched
+_FUNCTIONS = (ast.FunctionDef, getattr(ast, 'AsyncFunctionDef', ()))
+_DEFINITIONS = _FUNCTIONS + (ast.ClassDef,)
+
+
+class CodeCache(object):
+    """Compiles module `tree` as separate units and caches their code objects.
+
+    Every top-level function and class definition is a unit of its own,
+    other top-level statements are grouped into units between them.
+    Executing code objects of all units in order in one namespace has the
+    same effect as executing the whole module. Methods of top-level classes
+    are compiled separately too and put into the code of their class, so
+    after a node is mutated only the function or method containing it is
+    compiled again - and nothing at all when the mutation is reverted, as
+    code objects are cached by structural keys, which include locations.
+
+    Keys of statements are remembered, so after every change of the tree
+    `invalidate` has to be called with the changed node (annotated by
+    `ParentChildNodeTransformer`).
+    """
+
+    def __init__(self, tree, filename='<ast>'):
+        self.tree = tree
+        self.filename = filename
+        self.hits = 0
+        self.misses = 0
+        self._codes = {}
+        self._statement_keys = {}
+        # structural keys are interned here, so equal keys always mean equal statements
+        self._interned = {}
+
+    def invalidate(self, node=None):
+        """Forget keys of statements containing `node`, or of all statements if it is not given."""
+        path = []
+        while node is not None and node is not self.tree:
+            path.append(node)
+            node = getattr(node, 'parent', None)
+        if node is None:
+            self._statement_keys.clear()
+            return
+        for statement in path[-2:]:
+            self._statement_keys.pop(statement, None)
+        if len(path) == 1 and isinstance(path[0], ast.ClassDef):
+            for member in path[0].body:
+                self._statement_keys.pop(member, None)
+
+    def code_objects(self):
+        """Return code objects of all units, compiling only units which are not cached yet."""
+        units, flags = self._units()
+        old_keys, self._statement_keys = self._statement_keys, {}
+        codes = []
+        for unit in units:
+            key = (flags,) + tuple(self._key(statement, old_keys) for statement in unit)
+            code = self._codes.get(key)
+            if code is None:
+                self.misses += 1
+                if isinstance(unit[0], ast.ClassDef):
+                    code = self._compile_class(unit, flags)
+                else:
+                    code = self._compile(unit, flags)
+                self._codes[key] = code
+            else:
+                self.hits += 1
+            codes.append(code)
+        return codes
+
+    def execute(self, namespace=None):
+        """Execute the module in `namespace` (a new dictionary by default) and return it."""
+        if namespace is None:
+            namespace = {}
+        for code in self.code_objects():
+            exec(code, namespace)
+        return namespace
+
+    def clear(self):
+        self._codes.clear()
+        self._statement_keys.clear()
+        self._interned.clear()
+
+    def _units(self):
+        units = []
+        flags = 0
+        for statement in self.tree.body:
+            if isinstance(statement, ast.ImportFrom) and statement.module == '__future__':
+                for alias in statement.names:
+                    feature = getattr(__future__, alias.name, None)
+                    if feature is not None:
+                        flags |= feature.compiler_flag
+            if not units or isinstance(statement, _DEFINITIONS):
+                units.append([statement])
+            elif isinstance(units[-1][-1], _DEFINITIONS) and not _is_string(statement):
+                units.append([statement])
+            else:
+                # a string starting a unit would become the docstring of the module
+                units[-1].append(statement)
+        return units, flags
+
+    def _key(self, statement, old_keys, top_level=True):
+        """Return key of the statement, top-level classes are keyed member by member to rekey only changed ones."""
+        statement_key = old_keys.get(statement)
+        if top_level and isinstance(statement, ast.ClassDef):
+            if statement_key is None:
+                header = copy.copy(statement)
+                header.body = []
+                members = tuple(self._key(member, old_keys, top_level=False) for member in statement.body)
+                key = (_subtree_keys(header, self._interned, locations=True)[header],) + members
+                statement_key = self._interned.get(key)
+                if statement_key is None:
+                    statement_key = self._interned[key] = len(self._interned)
+            else:
+                for member in statement.body:
+                    self._statement_keys[member] = old_keys[member]
+        elif statement_key is None:
+            statement_key = _subtree_keys(statement, self._interned, locations=True)[statement]
+        self._statement_keys[statement] = statement_key
+        return statement_key
+
+    def _compile(self, statements, flags):
+        return compile(ast.Module(body=statements, type_ignores=[]), self.filename, 'exec', flags, dont_inherit=True)
+
+    def _compile_class(self, unit, flags):
+        """Compile the class with stubs of methods and replace code of the stubs with cached code of methods."""
+        class_node = unit[0]
+        skeleton = copy.copy(class_node)
+        skeleton.body = []
+        methods = {}
+        for member in class_node.body:
+            if isinstance(member, _FUNCTIONS):
+                code = self._compile_method(class_node, member, flags)
+                methods[code.co_name, code.co_firstlineno] = code
+                member = _stub(member, uses_class_cell='__class__' in code.co_freevars)
+            skeleton.body.append(member)
+        code = self._compile([skeleton] + unit[1:], flags)
+        class_code = _find_code(code, class_node.name)
+        return _replace_codes(code, {
+            (class_code.co_name, class_code.co_firstlineno): _replace_codes(class_code, methods),
+        })
+
+    def _compile_method(self, class_node, method, flags):
+        key = (flags, class_node.name, self._statement_keys[method])
+        code = self._codes.get(key)
+        if code is None:
+            # the method is compiled within a class of the same name to get the same qualified name and cells
+            wrapper = ast.ClassDef(name=class_node.name, bases=[], keywords=[], body=[method], decorator_list=[])
+            ast.copy_location(wrapper, class_node)
+            class_code = _find_code(self._compile([wrapper], flags), class_node.name)
+            code = self._codes[key] = _find_code(class_code, method.name)
+        return code
+
+
+def _stub(function, uses_class_cell):
+    """Return copy of the function with body referring to the ``__class__`` cell only if the function does."""
+    stub = copy.copy(function)
+    first = function.body[0]
+    if uses_class_cell:
+        statement = ast.Expr(value=ast.copy_location(ast.Name(id='__class__', ctx=ast.Load()), first))
+    else:
+        statement = ast.Pass()
+    stub.body = [ast.copy_location(statement, first)]
+    return stub
+
+
+def _find_code(code, name):
+    for value in code.co_consts:
+        if _is_code(value) and value.co_name == name:
+            return value
+    raise ValueError('code of {0} not found'.format(name))
+
+
+def _replace_codes(code, replacements):
+    """Return the code with nested code objects replaced by `replacements` with the same name and first line."""
+    consts = tuple(
+        replacements.get((value.co_name, value.co_firstlineno), value) if _is_code(value) else value
+        for value in code.co_consts
+    )
+    if hasattr(code, 'replace'):
+        return code.replace(co_consts=consts)
+    # before Python 3.8 code objects are rebuilt from all their attributes
+    return types.CodeType(*[consts if name == 'co_consts' else getattr(code, name)
+                            for name in _CODE_ARGUMENTS if hasattr(code, name)])
+
+
+def _is_code(value):
+    return value.__class__ is _CODE_TYPE
+
+
+def _is_string(statement):
+    if not isinstance(statement, ast.Expr):
+        return False
+    value = statement.value
+    if value.__class__.__name__ == 'Str':
+        # strings are parsed as Str nodes before Python 3.8
+        return True
+    return isinstance(value, getattr(ast, 'Constant', ())) and isinstance(value.value, (str, type(u'')))
+
+
+_CODE_TYPE = type(_is_code.__code__)
+# arguments of the code type constructor, without co_kwonlyargcount on Python 2
+_CODE_ARGUMENTS = ('co_argcount', 'co_kwonlyargcount', 'co_nlocals', 'co_stacksize', 'co_flags', 'co_code',
+                   'co_consts', 'co_names', 'co_varnames', 'co_filename', 'co_name', 'co_firstlineno', 'co_lnotab',
+                   'co_freevars', 'co_cellvars')
@@ -0,0 +1,95 @@
+"""Concurrent rendering of graphs by local Graphviz processes, which needs Python 3.7+."""
+import asyncio
+import os
+import time
+from collections import namedtuple
+from subprocess import PIPE
+
+from astmonkey.utils import check_version
+
+if not check_version(from_inclusive=(3, 7)):
+    raise ImportError('astmonkey.graphviz needs Python 3.7+')
+
+
+class RenderResult(namedtuple('RenderResult', ['output', 'error', 'elapsed'])):
+    """Output of Graphviz for one graph, or None and the `error` message if it failed.
+
+    `elapsed` is the time in seconds the Graphviz process was running.
+    """
+    __slots__ = ()
+
+
+class GraphvizRenderer(object):
+    """Renders many graphs by at most `concurrency` Graphviz processes at the same time.
+
+    Graphs are `pydot.Dot` objects (like `GraphNodeVisitor.graph`) or DOT
+    strings, they are written to standard input of `program` (``dot``,
+    ``sfdp`` or another layout program) and its standard output is read,
+    so no temporary files are used. A process running longer than `timeout`
+    seconds is killed and its graph gets an error result, as does a graph
+    the program fails on. Processes of cancelled renderings are killed too.
+    """
+
+    def __init__(self, program='dot', output_format='png', concurrency=None, timeout=None, args=()):
+        self.program = program
+        self.output_format = output_format
+        self.concurrency = concurrency or os.cpu_count() or 1
+        self.timeout = timeout
+        self.args = tuple(args)
+        self._loop = None
+        self._semaphore = None
+
+    def run(self, graphs):
+        """Render all graphs in a new event loop and return their results in order."""
+        return asyncio.run(self.render_all(graphs))
+
+    async def render_all(self, graphs):
+        return await asyncio.gather(*[self.render(graph) for graph in graphs])
+
+    async def render(self, graph):
+        data = _dot_bytes(graph)
+        async with self._limit():
+            start = time.perf_counter()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    self.program, '-T' + self.output_format, *self.args, stdin=PIPE, stdout=PIPE, stderr=PIPE)
+            except OSError as e:
+                return RenderResult(None, 'cannot run {0}: {1}'.format(self.program, e), time.perf_counter() - start)
+            try:
+                output, errors = await asyncio.wait_for(process.communicate(data), self.timeout)
+            except asyncio.TimeoutError:
+                await _kill(process)
+                return RenderResult(None, 'timed out after {0} s'.format(self.timeout), time.perf_counter() - start)
+            except BaseException:
+                await _kill(process)
+                raise
+            elapsed = time.perf_counter() - start
+        if process.returncode:
+            message = errors.decode('utf-8', 'replace').strip()
+            return RenderResult(None, 'exit status {0}: {1}'.format(process.returncode, message), elapsed)
+        return RenderResult(output, None, elapsed)
+
+    def _limit(self):
+        # semaphores belong to the event loop they are used in
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+
+async def _kill(process):
+    if process.returncode is None:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+    await process.wait()
+
+
+def _dot_bytes(graph):
+    if hasattr(graph, 'to_string'):
+        graph = graph.to_string()
+    if isinstance(graph, str):
+        graph = graph.encode('utf-8')
+    return graph
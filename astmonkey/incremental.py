@@ -0,0 +1,255 @@
+"""Incremental re-parsing of annotated trees after edits of their source."""
+import ast
+from collections import namedtuple
+
+from astmonkey.transformers import ParentChildNodeTransformer
+
+# compound statements nested in blocks are parsed within this statement, to keep their indentation
+_WRAPPER = 'if 1:\n'
+
+
+class TextEdit(namedtuple('TextEdit', ['start', 'end', 'text'])):
+    """Replacement of source between `start` and `end` by `text`.
+
+    Positions are ``(lineno, column)`` pairs, lines are numbered from 1 and
+    columns are counted in characters from 0.
+    """
+    __slots__ = ()
+
+
+def apply_edit(source, edit):
+    """Return `source` with `edit` applied."""
+    return '\n'.join(_apply_edit(source.split('\n'), edit))
+
+
+def reparse(tree, source, edit):
+    """Update module `tree` parsed from `source` after `edit` and return ``(tree, new_source)``.
+
+    Only the smallest run of statements of one block which covers the edit
+    is parsed again (a block nested in a compound statement is parsed
+    wrapped in an ``if`` statement) and spliced into the tree in place of
+    the old statements. New nodes get `ParentChildNodeTransformer`
+    annotations and line numbers of nodes following the edit are shifted,
+    so the tree stays equal to the tree parsed from the new source. If the
+    edit can't be isolated in a block, for example when it opens a bracket
+    closed by following statements, the whole source is parsed again and a
+    new tree is returned.
+    """
+    lines = source.split('\n')
+    new_lines = _apply_edit(lines, edit)
+    new_source = '\n'.join(new_lines)
+    if isinstance(tree, ast.Module):
+        for region in reversed(_regions(tree, edit.start[0], edit.end[0], len(lines))):
+            statements = region.parse(lines, new_lines)
+            if statements is not None:
+                region.splice(statements, len(new_lines) - len(lines))
+                return tree, new_source
+    new_tree = ast.parse(new_source)
+    ParentChildNodeTransformer().visit(new_tree)
+    return new_tree, new_source
+
+
+def _apply_edit(lines, edit):
+    (start_line, start_column), (end_line, end_column) = edit.start, edit.end
+    replacement = lines[start_line - 1][:start_column] + edit.text + lines[end_line - 1][end_column:]
+    return lines[:start_line - 1] + replacement.split('\n') + lines[end_line:]
+
+
+def _regions(tree, first, last, lines_count):
+    """Return regions of statements covering lines from `first` to `last`, from the outermost block."""
+    regions = []
+    owner, field = tree, 'body'
+    while True:
+        statements = getattr(owner, field)
+        if not statements:
+            break
+        start = _first_statement_ending_after(statements, first)
+        end = _last_statement_starting_before(statements, last)
+        if start > end:
+            # the edit lies between statements, so both neighbours are parsed again
+            start, end = max(end, 0), min(start, len(statements) - 1)
+        regions.append(_Region(owner, field, start, end, first, last, lines_count))
+        if start != end:
+            break
+        block = _block_covering(statements[start], first, last)
+        if block is None:
+            break
+        owner, field = block
+    return regions
+
+
+def _first_statement_ending_after(statements, line):
+    low, high = 0, len(statements)
+    while low < high:
+        middle = (low + high) // 2
+        if statements[middle].end_lineno < line:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _last_statement_starting_before(statements, line):
+    low, high = 0, len(statements)
+    while low < high:
+        middle = (low + high) // 2
+        if _first_line(statements[middle]) > line:
+            high = middle
+        else:
+            low = middle + 1
+    return low - 1
+
+
+def _first_line(statement):
+    decorators = getattr(statement, 'decorator_list', None)
+    return decorators[0].lineno if decorators else statement.lineno
+
+
+def _blocks(statement):
+    for field in ('body', 'orelse', 'finalbody'):
+        value = getattr(statement, field, None)
+        if isinstance(value, list) and value and isinstance(value[0], ast.stmt):
+            yield statement, field
+    for clause in getattr(statement, 'handlers', None) or getattr(statement, 'cases', None) or []:
+        yield clause, 'body'
+
+
+def _block_covering(statement, first, last):
+    for owner, field in _blocks(statement):
+        block = getattr(owner, field)
+        if _first_line(block[0]) <= first and last <= block[-1].end_lineno:
+            return owner, field
+    return None
+
+
+def _shift(node, delta):
+    for child in ast.walk(node):
+        lineno = getattr(child, 'lineno', None)
+        if lineno is not None:
+            child.lineno = lineno + delta
+            if getattr(child, 'end_lineno', None) is not None:
+                child.end_lineno += delta
+
+
+def _shift_annotated(node, delta):
+    # following `children` links is much faster than `ast.walk`
+    stack = [node]
+    while stack:
+        child = stack.pop()
+        state = child.__dict__
+        if state.get('lineno') is not None:
+            state['lineno'] += delta
+            if state.get('end_lineno') is not None:
+                state['end_lineno'] += delta
+        stack.extend(child.children)
+
+
+def _starts_after(node, line):
+    for child in ast.walk(node):
+        lineno = getattr(child, 'lineno', None)
+        if lineno is not None:
+            return lineno > line
+    return False
+
+
+class _Region(object):
+    """Statements `start` to `end` of the `field` block of `owner`, together with whole lines they span."""
+
+    def __init__(self, owner, field, start, end, first, last, lines_count):
+        self.owner = owner
+        self.field = field
+        self.start = start
+        self.end = end
+        self.first = first
+        self.last = last
+        self.statements = getattr(owner, field)
+        self.nested = not isinstance(owner, ast.Module)
+        self.first_line = _first_line(self.statements[start])
+        self.last_line = self.statements[end].end_lineno
+        if not self.nested:
+            # top-level regions may take comments and blank lines before and after all statements
+            if start == 0:
+                self.first_line = 1
+            if end == len(self.statements) - 1:
+                self.last_line = lines_count
+
+    def parse(self, lines, new_lines):
+        """Return statements parsed from the region after the edit, or None if the edit can't be isolated in it."""
+        if not (self.first_line <= self.first and self.last <= self.last_line) or not self._spans_whole_lines(lines):
+            return None
+        delta = len(new_lines) - len(lines)
+        code = '\n'.join(new_lines[self.first_line - 1:self.last_line + delta])
+        try:
+            if not self.nested:
+                statements = ast.parse(code).body
+                offset = self.first_line - 1
+            else:
+                module = ast.parse(_WRAPPER + code)
+                if len(module.body) != 1:
+                    return None
+                statements = module.body[0].body
+                offset = self.first_line - 2
+        except (SyntaxError, ValueError):
+            return None
+        if self.nested:
+            indentation = self.statements[self.start].col_offset
+            if any(statement.col_offset != indentation for statement in statements):
+                return None
+        if offset:
+            for statement in statements:
+                _shift(statement, offset)
+        return statements
+
+    def splice(self, statements, delta):
+        owner, field = self.owner, self.field
+        old_end = self.statements[self.end]
+        old_end_position = (old_end.end_lineno, old_end.end_col_offset)
+        self.statements[self.start:self.end + 1] = statements
+        for statement in statements:
+            ParentChildNodeTransformer().visit(statement)
+            statement.parent = owner
+            statement.parents = [owner]
+            statement.parent_field = field
+        for index in range(self.start, len(self.statements)):
+            self.statements[index].parent_field_index = index
+        owner.children = list(ast.iter_child_nodes(owner))
+        if delta:
+            for statement in self.statements[self.start + len(statements):]:
+                _shift_annotated(statement, delta)
+        # other blocks of the owner and nodes of its ancestors may follow the region
+        node, previous = owner, None
+        while node is not None:
+            if delta:
+                for child in node.children:
+                    if child is previous or node is owner and child.parent_field == field:
+                        continue
+                    if _starts_after(child, self.last_line):
+                        _shift_annotated(child, delta)
+            if getattr(node, 'end_lineno', None) is not None:
+                if (node.end_lineno, node.end_col_offset) == old_end_position and statements:
+                    node.end_lineno = statements[-1].end_lineno
+                    node.end_col_offset = statements[-1].end_col_offset
+                elif node.end_lineno > self.last_line:
+                    node.end_lineno += delta
+            previous, node = node, node.parent
+
+    def _spans_whole_lines(self, lines):
+        """Check that no other statement shares lines with the region."""
+        statements = self.statements
+        first_statement = statements[self.start]
+        last_statement = statements[self.end]
+        if self.start > 0 and statements[self.start - 1].end_lineno >= self.first_line:
+            return False
+        if self.end < len(statements) - 1 and _first_line(statements[self.end + 1]) <= self.last_line:
+            return False
+        if self.first_line == _first_line(first_statement):
+            line = lines[self.first_line - 1].encode('utf-8')
+            decorators = getattr(first_statement, 'decorator_list', None)
+            column = decorators[0].col_offset - 1 if decorators else first_statement.col_offset
+            if line[:column].strip():
+                return False
+        if self.last_line == last_statement.end_lineno:
+            rest = lines[self.last_line - 1].encode('utf-8')[last_statement.end_col_offset:].strip()
+            if rest and not rest.startswith(b'#'):
+                return False
+        return True
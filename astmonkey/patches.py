@@ -0,0 +1,147 @@
+"""Patches between code generated for a tree and code of its modified versions."""
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+from astmonkey.variants import TreeVariant, VariantSourceGeneratorNodeVisitor
+from astmonkey.visitors import FixLinenoNodeVisitor, SourceGeneratorNodeVisitor
+
+
+def diff(original, modified, indent_with=' ' * 4):
+    """Return `Patch` turning code generated for `original` module into code of `modified`."""
+    return RenderedTree(original, indent_with).diff(modified)
+
+
+class Hunk(namedtuple('Hunk', ['start', 'old_lines', 'new_lines'])):
+    """Lines `old_lines` of the original code, starting at line `start`, replaced by `new_lines`.
+
+    Lines are numbered from 1, `end` is the first line after the hunk.
+    """
+    __slots__ = ()
+
+    @property
+    def end(self):
+        return self.start + len(self.old_lines)
+
+
+class Patch(object):
+
+    def __init__(self, hunks):
+        self.hunks = hunks
+
+    def __bool__(self):
+        return bool(self.hunks)
+
+    __nonzero__ = __bool__
+
+    def apply(self, code):
+        lines = code.split('\n')
+        for hunk in reversed(self.hunks):
+            lines[hunk.start - 1:hunk.end - 1] = hunk.new_lines
+        return '\n'.join(lines)
+
+    def unified_diff(self, fromfile='original', tofile='modified'):
+        """Return the patch as an unified diff without context lines."""
+        result = ['--- {0}\n'.format(fromfile), '+++ {0}\n'.format(tofile)]
+        offset = 0
+        for hunk in self.hunks:
+            result.append('@@ -{0} +{1} @@\n'.format(
+                _diff_range(hunk.start, len(hunk.old_lines)),
+                _diff_range(hunk.start + offset, len(hunk.new_lines)),
+            ))
+            result.extend('-{0}\n'.format(line) for line in hunk.old_lines)
+            result.extend('+{0}\n'.format(line) for line in hunk.new_lines)
+            offset += len(hunk.new_lines) - len(hunk.old_lines)
+        return ''.join(result)
+
+
+def _diff_range(start, length):
+    if length == 1:
+        return str(start)
+    if not length:
+        start -= 1
+    return '{0},{1}'.format(start, length)
+
+
+_Segment = namedtuple('_Segment', ['lines_before', 'lines_after', 'text', 'original'])
+
+
+class RenderedTree(object):
+    """Code generated for a module annotated by `ParentChildNodeTransformer`.
+
+    Code of every top-level statement is kept, so modified trees - plain
+    trees or `TreeVariant` objects - which share statements with the
+    original one render only the statements which were changed.
+    """
+
+    def __init__(self, tree, indent_with=' ' * 4):
+        FixLinenoNodeVisitor().visit(tree)
+        self.tree = tree
+        self.indent_with = indent_with
+        self._indexes = {}
+        self._segments = self._render(SourceGeneratorNodeVisitor(indent_with), tree.body)
+        for index, statement in enumerate(tree.body):
+            self._indexes[statement] = index
+        self.code = ''.join(segment.text for segment in self._segments)
+        self.lines = self.code.split('\n')
+
+    def diff(self, modified):
+        """Return `Patch` turning the original code into code of `modified` tree or variant."""
+        if isinstance(modified, TreeVariant):
+            generator = VariantSourceGeneratorNodeVisitor(self.indent_with, modified)
+            modified = modified.root
+        else:
+            generator = SourceGeneratorNodeVisitor(self.indent_with)
+        segments = self._render(generator, modified.body)
+        new_lines = ''.join(segment.text for segment in segments).split('\n')
+        hunks = []
+        end = 0
+        last_original = -1
+        for position, segment in enumerate(segments):
+            if segment.original is None or segment.original <= last_original or not self._is_anchor(
+                    segments, position):
+                continue
+            self._add_hunks(hunks, end, self.lines[end:segment.lines_before], new_lines[end:segment.lines_before])
+            end = segment.lines_after
+            last_original = segment.original
+        self._add_hunks(hunks, end, self.lines[end:], new_lines[end:])
+        return Patch(hunks)
+
+    def replace(self, node, new_node):
+        """Return `Patch` for the original tree with `node` replaced by `new_node`."""
+        return self.diff(TreeVariant(self.tree).replace(node, new_node))
+
+    def _render(self, generator, statements):
+        writer = generator.writer
+        segments = []
+        for statement in statements:
+            lines_before = writer.lines
+            index = self._indexes.get(statement)
+            if index is not None and self._segments[index].lines_before == lines_before:
+                text = self._segments[index].text
+                writer.write(text)
+            else:
+                index = None
+                start = len(writer.result)
+                generator.statement_line(statement, new_line=bool(segments))
+                generator.visit(statement)
+                text = ''.join(writer.result[start:])
+            segments.append(_Segment(lines_before, writer.lines, text, index))
+        return segments
+
+    def _is_anchor(self, segments, position):
+        """Check if lines of the reused statement are not shared with its neighbours."""
+        following = [self._segments[segments[position].original + 1:], segments[position + 1:]]
+        return _starts_line(segments[position]) and all(not rest or _starts_line(rest[0]) for rest in following)
+
+    @staticmethod
+    def _add_hunks(hunks, start, old_lines, new_lines):
+        if old_lines == new_lines:
+            return
+        matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+            if tag != 'equal':
+                hunks.append(Hunk(start + old_start + 1, old_lines[old_start:old_end], new_lines[new_start:new_end]))
+
+
+def _starts_line(segment):
+    return not segment.lines_before or segment.text.startswith('\n')
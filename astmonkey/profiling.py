@@ -0,0 +1,141 @@
+import inspect
+import marshal
+import pstats
+import time
+from contextlib import contextmanager
+
+from astmonkey.transformers import ParentChildNodeTransformer
+from astmonkey.visitors import FixLinenoNodeVisitor, GraphNodeVisitor, SourceGeneratorNodeVisitor
+
+
+class Profiler(object):
+    """Collects call counts and times of visitor methods and whole passes.
+
+    Instrumentation is opt-in and per instance: `instrument` replaces the
+    `visit_*` methods of a single visitor object with timing wrappers, so
+    visitors which are not instrumented do not pay anything for it.
+    """
+
+    def __init__(self, timer=getattr(time, 'perf_counter', time.time)):
+        self.timer = timer
+        self.reset()
+
+    def reset(self):
+        self.methods = {}
+        self.passes = {}
+        self._children_times = []
+
+    def instrument(self, visitor):
+        if getattr(visitor, 'bulk_constants', False):
+            # constants have to be visited one by one to be counted
+            visitor.bulk_constants = False
+        for name in dir(visitor.__class__):
+            if name.startswith('visit_'):
+                method = getattr(visitor, name)
+                if callable(method):
+                    setattr(visitor, name, self._wrap(visitor, name, method))
+        return visitor
+
+    @contextmanager
+    def measure(self, name):
+        record = self.passes.setdefault(name, [0, 0.0])
+        start = self.timer()
+        try:
+            yield
+        finally:
+            record[0] += 1
+            record[1] += self.timer() - start
+
+    def run(self, visitor, node, name=None):
+        with self.measure(name or visitor.__class__.__name__):
+            return visitor.visit(node)
+
+    def to_source(self, node, indent_with=' ' * 4):
+        """Same as `visitors.to_source`, but every pass and generator method is measured."""
+        self.run(ParentChildNodeTransformer(), node)
+        self.run(FixLinenoNodeVisitor(), node)
+        generator = self.instrument(SourceGeneratorNodeVisitor(indent_with))
+        self.run(generator, node)
+        return ''.join(generator.result)
+
+    def graph(self, node, visitor=None):
+        """Annotate the tree and build its graph, measuring both passes."""
+        self.run(ParentChildNodeTransformer(), node)
+        visitor = visitor or GraphNodeVisitor()
+        self.run(visitor, node)
+        return visitor.graph
+
+    def stats(self):
+        return {
+            'passes': dict(
+                (name, {'calls': calls, 'time': total_time})
+                for name, (calls, total_time) in self.passes.items()
+            ),
+            'methods': dict(
+                ('{0}.{1}'.format(class_name, name), {
+                    'calls': calls,
+                    'primitive_calls': primitive_calls,
+                    'tottime': tottime,
+                    'cumtime': cumtime,
+                })
+                for (_, _, class_name, name), (calls, primitive_calls, tottime, cumtime) in self.methods.items()
+            ),
+        }
+
+    def pstats(self):
+        return pstats.Stats(_StatsSource(self._pstats_dict()))
+
+    def dump_stats(self, filename):
+        with open(filename, 'wb') as f:
+            marshal.dump(self._pstats_dict(), f)
+
+    def _pstats_dict(self):
+        result = {}
+        for (filename, lineno, class_name, name), (calls, primitive_calls, tottime, cumtime) in self.methods.items():
+            func = (filename, lineno, '{0}.{1}'.format(class_name, name))
+            result[func] = (primitive_calls, calls, tottime, cumtime, {})
+        for name, (calls, total_time) in self.passes.items():
+            result[('~', 0, '<pass {0}>'.format(name))] = (calls, calls, total_time, total_time, {})
+        return result
+
+    def _wrap(self, visitor, name, method):
+        function = getattr(method, '__func__', method)
+        try:
+            filename = inspect.getsourcefile(function) or '~'
+            lineno = function.__code__.co_firstlineno
+        except (TypeError, AttributeError):
+            filename, lineno = '~', 0
+        key = (filename, lineno, visitor.__class__.__name__, name)
+        record = self.methods.setdefault(key, [0, 0, 0.0, 0.0])
+        children_times = self._children_times
+        timer = self.timer
+        depth = [0]
+
+        def wrapper(node):
+            record[0] += 1
+            depth[0] += 1
+            children_times.append(0.0)
+            start = timer()
+            try:
+                return method(node)
+            finally:
+                elapsed = timer() - start
+                record[2] += elapsed - children_times.pop()
+                depth[0] -= 1
+                if not depth[0]:
+                    record[1] += 1
+                    record[3] += elapsed
+                if children_times:
+                    children_times[-1] += elapsed
+
+        return wrapper
+
+
+class _StatsSource(object):
+    """Minimal profiler interface expected by `pstats.Stats`."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
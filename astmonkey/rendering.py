@@ -0,0 +1,67 @@
+"""Rendering of trees shared by many threads."""
+import threading
+
+from astmonkey.transformers import Annotations
+from astmonkey.variants import TreeVariant
+from astmonkey.visitors import LinenoFixes, SourceGeneratorNodeVisitor
+
+
+class Renderer(object):
+    """Generates code of trees without modifying them.
+
+    Parents are resolved by lazy `Annotations` (or by the variant for
+    `TreeVariant` objects) and line numbers are fixed in a local map, so
+    many threads can render the same tree, or variants sharing its nodes,
+    at the same time. Every thread reuses its own generator between calls.
+    """
+
+    def __init__(self, indent_with=' ' * 4):
+        self.indent_with = indent_with
+        self._local = threading.local()
+
+    def to_source(self, node):
+        generator = getattr(self._local, 'generator', None)
+        if generator is None:
+            generator = self._local.generator = RendererSourceGeneratorNodeVisitor(self.indent_with)
+        if isinstance(node, TreeVariant):
+            generator.reset(node.root, node.parent_of)
+        else:
+            generator.reset(node)
+        try:
+            generator.visit(generator.tree)
+            return generator.writer.getvalue()
+        finally:
+            generator.reset()
+
+    def reset(self):
+        """Drop generators of all threads."""
+        self._local = threading.local()
+
+
+class RendererSourceGeneratorNodeVisitor(SourceGeneratorNodeVisitor):
+    """Source generator which keeps parents and fixed line numbers of the rendered tree in its own state."""
+
+    def __init__(self, indent_with, writer=None):
+        super(RendererSourceGeneratorNodeVisitor, self).__init__(indent_with, writer)
+        self.tree = None
+        self._parent_of = None
+        self._lineno_fixes = LinenoFixes()
+
+    def reset(self, tree=None, parent_of=None, writer=None):
+        """Prepare the generator for rendering `tree`, or release the previous tree if it is not given."""
+        super(RendererSourceGeneratorNodeVisitor, self).reset(writer)
+        self.tree = tree
+        if tree is None:
+            self._parent_of = None
+            self._lineno_fixes = LinenoFixes()
+            return
+        self._parent_of = parent_of or Annotations(tree).parent_of
+        self._lineno_fixes = LinenoFixes()
+        self._lineno_fixes.visit(tree)
+
+    def parent_of(self, node):
+        return self._parent_of(node)
+
+    def _get_actual_lineno(self, node):
+        lineno = super(RendererSourceGeneratorNodeVisitor, self)._get_actual_lineno(node)
+        return self._lineno_fixes.actual_lineno(node, lineno)
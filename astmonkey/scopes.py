@@ -0,0 +1,286 @@
+"""Scope analysis of trees annotated by `ParentChildNodeTransformer`."""
+import ast
+from collections import namedtuple
+
+LOCAL = 'local'
+GLOBAL = 'global'
+FREE = 'free'
+
+# nodes missing in older versions of Python are never matched
+_ASYNC_FUNCTION_DEF = getattr(ast, 'AsyncFunctionDef', ())
+_NONLOCAL = getattr(ast, 'Nonlocal', ())
+_ARG = getattr(ast, 'arg', ())
+_NAMED_EXPR = getattr(ast, 'NamedExpr', ())
+_FUNCTIONS = (ast.FunctionDef, _ASYNC_FUNCTION_DEF, ast.Lambda)
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+_DEFINITIONS = _FUNCTIONS + (ast.ClassDef,) + _COMPREHENSIONS
+# fields of definitions holding nodes evaluated in their own scopes
+_INNER_FIELDS = ('body', 'elt', 'key', 'value', 'generators')
+_MATCH_CAPTURES = tuple(getattr(ast, name) for name in ('MatchAs', 'MatchStar') if hasattr(ast, name))
+_MATCH_MAPPING = getattr(ast, 'MatchMapping', ())
+
+
+class Binding(namedtuple('Binding', ['kind', 'scope'])):
+    """Resolution of a name: `kind` is `LOCAL`, `GLOBAL` or `FREE` and `scope` is the scope binding the name.
+
+    Names which are not bound anywhere, like builtins, are `GLOBAL` names of
+    the module scope.
+    """
+    __slots__ = ()
+
+
+class Scope(object):
+    """Symbol table of a module, class, function, lambda or comprehension.
+
+    `assigned` holds names bound in the scope (including imports and
+    definitions), `parameters` names of arguments, `declared_global` and
+    `declared_nonlocal` names of ``global`` and ``nonlocal`` statements and
+    `referenced` names loaded in the scope. Targets of assignment expressions
+    in comprehensions are bound in the enclosing function, so comprehensions
+    declare them nonlocal.
+    """
+
+    def __init__(self, node, parent, kind):
+        self.node = node
+        self.parent = parent
+        self.kind = kind
+        self._reset()
+
+    def _reset(self):
+        self.assigned = set()
+        self.parameters = set()
+        self.referenced = set()
+        self.declared_global = set()
+        self.declared_nonlocal = set()
+        self.children = []
+        self._bindings = {}
+
+    @property
+    def locals(self):
+        if self.kind == 'module':
+            return set()
+        return (self.assigned | self.parameters) - self.declared_global - self.declared_nonlocal
+
+    @property
+    def free(self):
+        """Names bound in an enclosing function which are used in the scope or passed through it to nested scopes.
+
+        Like free variables of `symtable`, these are referenced names, names
+        declared nonlocal and free names of nested scopes, unless bound here.
+        """
+        return set(name for name in self._free_bindings() if name not in self.locals)
+
+    def _free_bindings(self):
+        # names of the free variables of the scope and scopes nested in it, with the scopes binding them
+        bindings = {}
+        for name in self.referenced | self.declared_nonlocal:
+            binding = self.resolve(name)
+            if binding.kind == FREE:
+                bindings[name] = binding.scope
+        for child in self.children:
+            for name, scope in child._free_bindings().items():
+                if scope is not self:
+                    bindings[name] = scope
+        return bindings
+
+    def resolve(self, name):
+        """Return `Binding` of the name used in this scope, resolutions are cached."""
+        try:
+            return self._bindings[name]
+        except KeyError:
+            pass
+        binding = self._bindings[name] = self._resolve(name)
+        return binding
+
+    def _resolve(self, name):
+        if self.kind == 'module' or name in self.declared_global:
+            return Binding(GLOBAL, self._module())
+        if name in self.declared_nonlocal:
+            return self._resolve_enclosing(name)
+        if name in self.assigned or name in self.parameters:
+            return Binding(LOCAL, self)
+        return self._resolve_enclosing(name)
+
+    def _resolve_enclosing(self, name):
+        scope = self.parent
+        # names bound in class bodies are not visible in nested scopes
+        while scope.kind == 'class':
+            scope = scope.parent
+        binding = scope.resolve(name)
+        if binding.kind == LOCAL:
+            return Binding(FREE, binding.scope)
+        return binding
+
+    def _module(self):
+        scope = self
+        while scope.parent is not None:
+            scope = scope.parent
+        return scope
+
+    def __repr__(self):
+        return '<Scope {0} of {1}>'.format(self.kind, self.node.__class__.__name__)
+
+
+class ScopeAnalysis(object):
+    """Scopes of all nodes of a module tree, computed in a single traversal.
+
+    `scope_of` and `binding_of` are dictionary lookups (resolutions of
+    names are cached in scopes). After a subtree is changed, `invalidate`
+    recomputes only the innermost scope containing it (and scopes nested in
+    it). The tree has to be annotated by `ParentChildNodeTransformer`.
+    Scopes follow the rules of Python 3, so list comprehensions of Python 2
+    trees get scopes of their own too.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._scopes = {}
+        self._own_scopes = {}
+        self.module_scope = Scope(tree, None, 'module')
+        self._analyze(self.module_scope)
+
+    def scope_of(self, node):
+        """Return the scope in which the node is evaluated.
+
+        Definitions belong to the scope their names are bound in, while
+        their bodies and arguments belong to their own scopes.
+        """
+        return self._scopes[node]
+
+    def binding_of(self, node):
+        """Return `Binding` of a name of `ast.Name` or `ast.arg` node."""
+        name = node.arg if isinstance(node, _ARG) else node.id
+        return self._scopes[node].resolve(name)
+
+    def invalidate(self, node):
+        """Recompute the scope containing `node` after the subtree of the node was changed.
+
+        New nodes don't have to be analyzed yet, the scope is found by their
+        `parent` annotations.
+        """
+        child = None
+        while node is not None and node not in self._scopes:
+            child, node = node, getattr(node, 'parent', None)
+        if node is None:
+            scope = self.module_scope
+        elif child is not None and node in self._own_scopes and child.parent_field in _INNER_FIELDS:
+            scope = self._own_scopes[node]
+        else:
+            scope = self._scopes[node]
+            if isinstance(node, (ast.arguments, ast.arg)):
+                # defaults and annotations are evaluated in the scope enclosing the function
+                scope = scope.parent
+        # assignment expressions in comprehensions bind names in the enclosing scope
+        while scope.kind == 'comprehension':
+            scope = scope.parent
+        scope._reset()
+        self._analyze(scope)
+
+    def _analyze(self, scope):
+        if scope.kind == 'module':
+            stack = [(child, scope) for child in reversed(scope.node.children)]
+        else:
+            stack = self._enter(scope.node, scope)[::-1]
+        scopes = self._scopes
+        while stack:
+            node, scope = stack.pop()
+            scopes[node] = scope
+            if isinstance(node, ast.Name):
+                if isinstance(node.ctx, ast.Load):
+                    scope.referenced.add(node.id)
+                else:
+                    scope.assigned.add(node.id)
+            elif isinstance(node, _DEFINITIONS):
+                stack.extend(reversed(self._define(node, scope)))
+            elif isinstance(node, ast.Global):
+                scope.declared_global.update(node.names)
+            elif isinstance(node, _NONLOCAL):
+                scope.declared_nonlocal.update(node.names)
+            elif isinstance(node, _NAMED_EXPR):
+                self._bind(scope, node.target.id)
+                scopes[node.target] = scope
+                stack.append((node.value, scope))
+            else:
+                name = _bound_name(node)
+                if name is not None:
+                    scope.assigned.add(name)
+                stack.extend((child, scope) for child in reversed(node.children))
+
+    def _define(self, node, scope):
+        """Return parts of the definition with their scopes, the enclosing `scope` or a new scope of its own."""
+        if isinstance(node, ast.ClassDef):
+            kind = 'class'
+            outer = node.decorator_list + node.bases + getattr(node, 'keywords', [])
+        elif isinstance(node, _COMPREHENSIONS):
+            kind = 'comprehension'
+            # the first iterable is evaluated in the enclosing scope
+            outer = [node.generators[0].iter]
+        else:
+            kind = 'function'
+            arguments = node.args
+            outer = [] if isinstance(node, ast.Lambda) else list(node.decorator_list)
+            outer.extend(arguments.defaults)
+            outer.extend(default for default in getattr(arguments, 'kw_defaults', []) if default is not None)
+            outer.extend(argument.annotation for argument in _arguments(arguments)
+                         if getattr(argument, 'annotation', None))
+            if getattr(node, 'returns', None):
+                outer.append(node.returns)
+        if not isinstance(node, (ast.Lambda,) + _COMPREHENSIONS):
+            scope.assigned.add(node.name)
+        inner = self._own_scopes[node] = Scope(node, scope, kind)
+        scope.children.append(inner)
+        return [(child, scope) for child in outer] + self._enter(node, inner)
+
+    def _enter(self, node, scope):
+        """Return parts of the definition `node` evaluated in its own `scope`, with the scope."""
+        if isinstance(node, ast.ClassDef):
+            inner = node.body
+        elif isinstance(node, _COMPREHENSIONS):
+            inner = []
+            for index, generator in enumerate(node.generators):
+                self._scopes[generator] = scope
+                if index:
+                    inner.append(generator.iter)
+                inner.append(generator.target)
+                inner.extend(generator.ifs)
+            inner.extend([node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt])
+        else:
+            self._scopes[node.args] = scope
+            for argument in _arguments(node.args):
+                if isinstance(argument, ast.AST):
+                    self._scopes[argument] = scope
+                    scope.parameters.add(argument.arg if isinstance(argument, _ARG) else argument.id)
+                else:
+                    # variable arguments are plain names in Python 2
+                    scope.parameters.add(argument)
+            inner = node.body if isinstance(node.body, list) else [node.body]
+        return [(child, scope) for child in inner]
+
+    @staticmethod
+    def _bind(scope, name):
+        while scope.kind == 'comprehension':
+            scope.declared_nonlocal.add(name)
+            scope = scope.parent
+        scope.assigned.add(name)
+
+
+def _arguments(arguments):
+    result = getattr(arguments, 'posonlyargs', []) + arguments.args + getattr(arguments, 'kwonlyargs', [])
+    if arguments.vararg:
+        result.append(arguments.vararg)
+    if arguments.kwarg:
+        result.append(arguments.kwarg)
+    return result
+
+
+def _bound_name(node):
+    if isinstance(node, ast.alias):
+        if node.name == '*':
+            return None
+        return node.asname or node.name.split('.')[0]
+    if isinstance(node, (ast.ExceptHandler,) + _MATCH_CAPTURES):
+        # names of Python 2 handlers are name nodes, which are bound themselves
+        return node.name if isinstance(node.name, (str, type(None))) else None
+    if isinstance(node, _MATCH_MAPPING):
+        return node.rest
+    return None
@@ -0,0 +1,227 @@
+"""Compact binary format of trees for sending them to other processes.
+
+The tree is written as a stream of integer codes in post-order - children
+before their parents - so loading it is a flat loop over the stream which
+pops fields of every node from a stack, and parents are implied by the
+order. Node types and constants (including all identifiers) are stored
+once in tables and referenced by indexes. Nodes occurring many times in the
+tree, like expression contexts, are written once and referenced later.
+Locations are kept in a separate stream. Annotations are not stored at all,
+they are set while nodes are loaded, as every node gets its children at
+once.
+"""
+import ast
+import marshal
+import sys
+from array import array
+
+FORMAT_VERSION = 1
+
+# every code holds its kind in the lowest bits and its argument in the rest
+_KIND_BITS = 2
+_KIND_MASK = (1 << _KIND_BITS) - 1
+_CONSTANT = 0
+_REFERENCE = 1
+_LIST = 2
+_NODE = 3
+_NONE_CODE = _NODE
+
+# argument of node codes is 1 + 2 * type index + 1 if attributes of the node are stored as constants
+_MISSING_ATTRIBUTE = -1
+
+
+def serialize(tree):
+    """Return bytes holding the tree, without `ParentChildNodeTransformer` annotations."""
+    return _Serializer().dump(tree)
+
+
+def deserialize(data, annotate=True):
+    """Load tree written by `serialize`.
+
+    If `annotate` is true, nodes get the same annotations as
+    `ParentChildNodeTransformer` would add to them.
+    """
+    version, types, constants, streams = marshal.loads(data)
+    if version != FORMAT_VERSION:
+        raise ValueError('unsupported format version {0}'.format(version))
+    codes, locations = [_load_array(typecode, stream) for typecode, stream in streams]
+    locations = locations.tolist()
+    classes = [None]
+    for name, fields, attributes in types:
+        node_class = getattr(ast, name)
+        keys = fields + attributes + (('parent', 'parents', 'children') if annotate else ())
+        classes.append((node_class, fields, attributes, keys, False))
+        classes.append((node_class, fields, attributes, keys, True))
+    node_base = ast.AST
+    values = []
+    push = values.append
+    nodes = []
+    location = 0
+    for code in codes:
+        kind = code & _KIND_MASK
+        if kind == _CONSTANT:
+            push(constants[code >> _KIND_BITS])
+        elif kind == _REFERENCE:
+            push(nodes[code >> _KIND_BITS])
+        elif kind == _LIST:
+            count = code >> _KIND_BITS
+            if count:
+                items = values[-count:]
+                del values[-count:]
+                push(items)
+            else:
+                push([])
+        elif code == _NONE_CODE:
+            push(None)
+        else:
+            node_class, fields, attributes, keys, special = classes[code >> _KIND_BITS]
+            node = node_class.__new__(node_class)
+            if fields:
+                state = values[-len(fields):]
+                del values[-len(fields):]
+            else:
+                state = []
+            if attributes:
+                end = location + len(attributes)
+                state += locations[location:end]
+                location = end
+            if annotate:
+                children = []
+                for field, value in zip(fields, state):
+                    if value.__class__ is list:
+                        for position, item in enumerate(value):
+                            if isinstance(item, node_base):
+                                child_state = item.__dict__
+                                child_state['parent'] = node
+                                child_state['parents'].append(node)
+                                child_state['parent_field'] = field
+                                child_state['parent_field_index'] = position
+                                children.append(item)
+                    elif isinstance(value, node_base):
+                        child_state = value.__dict__
+                        child_state['parent'] = node
+                        child_state['parents'].append(node)
+                        child_state['parent_field'] = field
+                        child_state['parent_field_index'] = None
+                        children.append(value)
+                state += (None, [], children)
+            node.__dict__ = state = dict(zip(keys, state))
+            if special:
+                # attributes hold indexes of constants
+                for attribute in attributes:
+                    if state[attribute] == _MISSING_ATTRIBUTE:
+                        del state[attribute]
+                    else:
+                        state[attribute] = constants[state[attribute]]
+            nodes.append(node)
+            push(node)
+    return values[0]
+
+
+def _load_array(typecode, stream):
+    result = array(typecode)
+    result.frombytes(stream)
+    if sys.byteorder != 'little':
+        result.byteswap()
+    return result
+
+
+def _dump_array(values):
+    smallest, largest = (min(values), max(values)) if values else (0, 0)
+    for typecode in 'bhiq':
+        limit = 1 << (8 * array(typecode).itemsize - 1)
+        if -limit <= smallest and largest < limit:
+            break
+    result = array(typecode, values)
+    if sys.byteorder != 'little':
+        result.byteswap()
+    return typecode, result.tobytes()
+
+
+class _Serializer(object):
+
+    def __init__(self):
+        self.codes = []
+        self.locations = []
+        self.types = []
+        self.type_indexes = {}
+        self.constants = []
+        self.constant_indexes = {}
+        self.node_indexes = {}
+
+    def dump(self, tree):
+        codes = self.codes
+        stack = [tree]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, ast.AST):
+                self._expand_node(value, stack)
+            elif value.__class__ is _End:
+                self._write_node(value.node)
+            elif value.__class__ is _ListEnd:
+                codes.append(value.count << _KIND_BITS | _LIST)
+            elif isinstance(value, list):
+                stack.append(_ListEnd(len(value)))
+                stack.extend(reversed(value))
+            elif value is None:
+                codes.append(_NONE_CODE)
+            else:
+                codes.append(self._constant_index(value) << _KIND_BITS | _CONSTANT)
+        streams = (_dump_array(self.codes), _dump_array(self.locations))
+        return marshal.dumps((FORMAT_VERSION, self.types, self.constants, streams))
+
+    def _expand_node(self, node, stack):
+        index = self.node_indexes.get(id(node))
+        if index is not None:
+            self.codes.append(index << _KIND_BITS | _REFERENCE)
+            return
+        stack.append(_End(node))
+        fields = self._node_type(node)[1]
+        stack.extend(getattr(node, field, None) for field in reversed(fields))
+
+    def _write_node(self, node):
+        type_index = self.type_indexes[node.__class__]
+        attributes = self.types[type_index][2]
+        values = [getattr(node, attribute, _missing) for attribute in attributes]
+        special = not all(value.__class__ is int for value in values)
+        if special:
+            values = [
+                _MISSING_ATTRIBUTE if value is _missing else self._constant_index(value) for value in values
+            ]
+        self.locations.extend(values)
+        self.codes.append((1 + 2 * type_index + special) << _KIND_BITS | _NODE)
+        self.node_indexes[id(node)] = len(self.node_indexes)
+
+    def _node_type(self, node):
+        node_class = node.__class__
+        index = self.type_indexes.get(node_class)
+        if index is None:
+            index = self.type_indexes[node_class] = len(self.types)
+            self.types.append((node_class.__name__, tuple(node_class._fields), tuple(node_class._attributes)))
+        return self.types[index]
+
+    def _constant_index(self, value):
+        # constants equal across types, like 1, 1.0 and True, or 0.0 and -0.0, have to be kept apart
+        key = (value.__class__, repr(value) if isinstance(value, (float, complex)) else value)
+        index = self.constant_indexes.get(key)
+        if index is None:
+            index = self.constant_indexes[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+
+class _End(object):
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+
+class _ListEnd(object):
+    __slots__ = ('count',)
+
+    def __init__(self, count):
+        self.count = count
+
+
+_missing = object()
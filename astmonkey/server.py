@@ -0,0 +1,264 @@
+"""Local daemon rendering trees with warm interpreters and caches.
+
+Run it with ``python -m astmonkey.server --socket PATH``. Clients send one
+JSON object per line and receive one JSON object per line::
+
+    {"op": "source", "source": "x = (y + 1)"}
+    {"result": "x = (y + 1)"}
+
+Supported operations are ``source`` (code generated by the source
+generator), ``graph`` (DOT graph built by `GraphNodeVisitor`) and
+``annotations`` (parent links of every node). A tree can be sent instead of
+the source as ``tree`` - a base64 encoded `astmonkey.serialize` output, so
+the socket is only accessible by its owner.
+
+The server needs Python 3.7+.
+"""
+import argparse
+import ast
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import socket
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from astmonkey.serialization import deserialize, serialize
+from astmonkey.transformers import ParentChildNodeTransformer
+from astmonkey.utils import check_version
+from astmonkey.visitors import FixLinenoNodeVisitor, GraphNodeVisitor, SourceGeneratorNodeVisitor
+
+if not check_version(from_inclusive=(3, 7)):
+    raise ImportError('astmonkey.server needs Python 3.7+')
+
+DEFAULT_CACHE_SIZE = 128
+MAX_MESSAGE_SIZE = 256 * 1024 * 1024
+
+
+class ServerError(Exception):
+    pass
+
+
+class LRUCache(object):
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = OrderedDict()
+
+    def get(self, key):
+        try:
+            value = self.items.pop(key)
+        except KeyError:
+            return None
+        self.items[key] = value
+        return value
+
+    def put(self, key, value):
+        self.items.pop(key, None)
+        self.items[key] = value
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+
+_trees = LRUCache(DEFAULT_CACHE_SIZE)
+
+
+def _init_worker(cache_size):
+    global _trees
+    _trees = LRUCache(cache_size)
+
+
+def request_key(request):
+    if 'tree' in request:
+        payload = b'tree:' + request['tree'].encode('ascii')
+    else:
+        payload = b'source:' + request['source'].encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+def process(request, trees=None):
+    """Handle a single request. Executed in worker processes."""
+    if trees is None:
+        trees = _trees
+    operation = OPERATIONS.get(request.get('op', 'source'))
+    if operation is None:
+        raise ValueError('unknown operation {0!r}'.format(request.get('op')))
+    key = request_key(request)
+    tree = trees.get(key)
+    if tree is None:
+        if 'tree' in request:
+            tree = deserialize(base64.b64decode(request['tree']))
+        else:
+            tree = ParentChildNodeTransformer().visit(ast.parse(request['source']))
+        FixLinenoNodeVisitor().visit(tree)
+        trees.put(key, tree)
+    return operation(tree, request)
+
+
+def _source(tree, request):
+    generator = SourceGeneratorNodeVisitor(request.get('indent_with', ' ' * 4))
+    generator.visit(tree)
+    return ''.join(generator.result)
+
+
+def _graph(tree, request):
+    visitor = GraphNodeVisitor()
+    visitor.visit(tree)
+    return visitor.graph.to_string()
+
+
+def _annotations(tree, request):
+    indexes = {}
+    result = []
+    for node in ast.walk(tree):
+        if id(node) in indexes:
+            continue
+        indexes[id(node)] = len(result)
+        result.append({
+            'type': node.__class__.__name__,
+            'parent': indexes.get(id(node.parent)) if node.parent is not None else None,
+            'field': getattr(node, 'parent_field', None),
+            'index': getattr(node, 'parent_field_index', None),
+            'lineno': getattr(node, 'lineno', None),
+            'col_offset': getattr(node, 'col_offset', None),
+        })
+    return result
+
+
+OPERATIONS = {
+    'source': _source,
+    'graph': _graph,
+    'annotations': _annotations,
+}
+
+
+class RenderServer(object):
+    """Asyncio server listening on an Unix socket.
+
+    CPU-heavy work runs in `workers` single-process pools. Requests for the
+    same content always go to the same pool, so each worker keeps an LRU
+    cache of annotated trees (`cache_size` entries) which stays warm.
+    """
+
+    def __init__(self, path, workers=None, cache_size=DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self._pools = []
+        self._server = None
+        self._clients = set()
+
+    async def start(self):
+        self._pools = [
+            ProcessPoolExecutor(1, initializer=_init_worker, initargs=(self.cache_size,))
+            for _ in range(self.workers)
+        ]
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        old_umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(self._handle_client, path=self.path,
+                                                           limit=MAX_MESSAGE_SIZE)
+        finally:
+            os.umask(old_umask)
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            self.close()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+        # since Python 3.12 closed servers wait for their connections, so clients are cancelled first
+        for client in self._clients:
+            client.cancel()
+        await asyncio.gather(*self._clients, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        self.close()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for pool in self._pools:
+            pool.shutdown()
+        self._pools = []
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle_client(self, reader, writer):
+        task = asyncio.current_task()
+        self._clients.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self._respond(line)
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                await writer.drain()
+        except asyncio.CancelledError:
+            # clients are cancelled only when the server stops
+            pass
+        finally:
+            self._clients.discard(task)
+            writer.close()
+            await writer.wait_closed()
+
+    async def _respond(self, line):
+        try:
+            request = json.loads(line.decode('utf-8'))
+            pool = self._pools[int(request_key(request)[:8], 16) % len(self._pools)]
+            result = await asyncio.get_running_loop().run_in_executor(pool, process, request)
+        except Exception as e:
+            return {'error': '{0}: {1}'.format(e.__class__.__name__, e)}
+        return {'result': result}
+
+
+def request(path, op='source', source=None, tree=None, timeout=None, **kwargs):
+    """Send a single request to the server listening on `path` and return its result."""
+    message = dict(kwargs, op=op)
+    if tree is not None:
+        message['tree'] = base64.b64encode(serialize(tree)).decode('ascii')
+    else:
+        message['source'] = source
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        client.connect(path)
+        client.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        with client.makefile('rb') as stream:
+            line = stream.readline()
+    finally:
+        client.close()
+    if not line:
+        raise ServerError('connection closed by server')
+    response = json.loads(line.decode('utf-8'))
+    if 'error' in response:
+        raise ServerError(response['error'])
+    return response['result']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m astmonkey.server', description=__doc__.splitlines()[0])
+    parser.add_argument('--socket', required=True, help='path of the Unix socket')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help='number of annotated trees cached by every worker')
+    args = parser.parse_args(argv)
+    server = RenderServer(args.socket, workers=args.workers, cache_size=args.cache_size)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
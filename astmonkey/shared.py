@@ -0,0 +1,295 @@
+"""Flat encoding of trees readable from shared memory without copying.
+
+Nodes are stored in pre-order as rows of integer columns: type, parent
+index, field and position in the parent, end of the subtree and locations.
+Field values which are not nodes are encoded in a separate column of slots
+and refer to a table of constants. Processes attached to the same buffer
+read the columns in place and build `ast` nodes only for subtrees they ask
+for, so memory used by the tree does not grow with the number of workers.
+
+Trees are read from any buffer on Python 3.3+, shared memory blocks need
+Python 3.8+.
+"""
+import ast
+import marshal
+import struct
+from array import array
+
+from astmonkey import visitors
+from astmonkey.transformers import ParentChildNodeTransformer
+
+_MAGIC = b'ASTMTREE'
+_HEADER = struct.Struct('=8sIII')
+_ITEM_SIZE = array('i').itemsize
+
+# slots hold their kind in the lowest bits and its argument (constant index or list length) in the rest
+_KIND_BITS = 2
+_KIND_MASK = (1 << _KIND_BITS) - 1
+_NODE = 0
+_NONE = 1
+_LIST = 2
+_CONSTANT = 3
+
+_LOCATIONS = ('lineno', 'col_offset', 'end_lineno', 'end_col_offset')
+_MISSING_LOCATION = -(1 << 31)
+_NONE_LOCATION = _MISSING_LOCATION + 1
+
+_NODE_COLUMNS = ('types', 'parents', 'fields', 'indexes', 'ends', 'slot_starts') + _LOCATIONS
+
+
+def encode(tree):
+    """Return bytes of the flat encoding of the tree, to be used by `SharedTree`."""
+    types = []
+    type_indexes = {}
+    field_names = []
+    field_indexes = {}
+    constants = []
+    constant_indexes = {}
+    columns = dict((name, array('i')) for name in _NODE_COLUMNS + ('slots',))
+    slots = columns['slots']
+
+    def constant(value):
+        key = (value.__class__, repr(value) if isinstance(value, (float, complex)) else value)
+        index = constant_indexes.get(key)
+        if index is None:
+            index = constant_indexes[key] = len(constants)
+            constants.append(value)
+        return index << _KIND_BITS | _CONSTANT
+
+    stack = [(tree, -1, -1, -1)]
+    while stack:
+        node, parent, field, position = stack.pop()
+        index = len(columns['types'])
+        node_class = node.__class__
+        type_index = type_indexes.get(node_class)
+        if type_index is None:
+            type_index = type_indexes[node_class] = len(types)
+            types.append((node_class.__name__, tuple(node_class._fields)))
+        columns['types'].append(type_index)
+        columns['parents'].append(parent)
+        columns['fields'].append(field)
+        columns['indexes'].append(position)
+        columns['ends'].append(index + 1)
+        columns['slot_starts'].append(len(slots))
+        for name in _LOCATIONS:
+            value = getattr(node, name, _missing)
+            if value is _missing:
+                value = _MISSING_LOCATION
+            elif value is None:
+                value = _NONE_LOCATION
+            columns[name].append(value)
+        children = []
+        for name in node_class._fields:
+            field_index = field_indexes.get(name)
+            if field_index is None:
+                field_index = field_indexes[name] = len(field_names)
+                field_names.append(name)
+            value = getattr(node, name, None)
+            if isinstance(value, list):
+                slots.append(len(value) << _KIND_BITS | _LIST)
+                for item_position, item in enumerate(value):
+                    if isinstance(item, ast.AST):
+                        slots.append(_NODE)
+                        children.append((item, index, field_index, item_position))
+                    else:
+                        slots.append(_NONE if item is None else constant(item))
+            elif isinstance(value, ast.AST):
+                slots.append(_NODE)
+                children.append((value, index, field_index, -1))
+            else:
+                slots.append(_NONE if value is None else constant(value))
+        stack.extend(reversed(children))
+    ends = columns['ends']
+    parents = columns['parents']
+    for index in range(len(ends) - 1, 0, -1):
+        parent = parents[index]
+        if ends[index] > ends[parent]:
+            ends[parent] = ends[index]
+    columns['slot_starts'].append(len(slots))
+    tables = marshal.dumps((types, field_names, constants))
+    chunks = [_HEADER.pack(_MAGIC, len(columns['types']), len(slots), len(tables))]
+    chunks.extend(columns[name].tobytes() for name in _NODE_COLUMNS + ('slots',))
+    chunks.append(tables)
+    return b''.join(chunks)
+
+
+class SharedTree(object):
+    """Tree encoded by `encode`, read in place from `buffer`.
+
+    `buffer` may be any object supporting the buffer protocol, like a
+    `mmap.mmap` of a file holding the encoded tree. Nodes are referred to
+    by their pre-order indexes, the root has index 0.
+    """
+
+    def __init__(self, buffer, shared_memory_block=None):
+        self.shared_memory = shared_memory_block
+        self._buffer = memoryview(buffer)
+        magic, self._size, slots_count, tables_size = _HEADER.unpack_from(self._buffer)
+        if magic != _MAGIC:
+            raise ValueError('buffer does not hold an encoded tree')
+        offset = _HEADER.size
+        self._columns = {}
+        for name in _NODE_COLUMNS + ('slots',):
+            count = slots_count if name == 'slots' else self._size + (name == 'slot_starts')
+            self._columns[name] = self._buffer[offset:offset + count * _ITEM_SIZE].cast('i')
+            offset += count * _ITEM_SIZE
+        types, self._field_names, self._constants = marshal.loads(self._buffer[offset:offset + tables_size])
+        self._types = [(getattr(ast, name), fields) for name, fields in types]
+
+    @classmethod
+    def share(cls, tree):
+        """Encode the tree into a new shared memory block, which other processes can `attach` by its `name`."""
+        from multiprocessing import shared_memory
+
+        data = encode(tree)
+        block = shared_memory.SharedMemory(create=True, size=len(data))
+        block.buf[:len(data)] = data
+        return cls(block.buf, block)
+
+    @classmethod
+    def attach(cls, name):
+        from multiprocessing import shared_memory
+
+        block = shared_memory.SharedMemory(name=name)
+        return cls(block.buf, block)
+
+    @property
+    def name(self):
+        return self.shared_memory.name
+
+    def close(self):
+        """Release the buffer; views of it have to be released before the shared memory block is closed."""
+        for column in self._columns.values():
+            column.release()
+        self._columns = {}
+        self._buffer.release()
+        if self.shared_memory is not None:
+            self.shared_memory.close()
+
+    def unlink(self):
+        """Free the shared memory block, only the process which shared the tree should call it."""
+        self.shared_memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._size
+
+    def type_of(self, index):
+        return self._types[self._columns['types'][index]][0]
+
+    def parent_of(self, index):
+        parent = self._columns['parents'][index]
+        return parent if parent >= 0 else None
+
+    def field_of(self, index):
+        """Return (field, index in the field list) of the node in its parent, like `ParentChildNodeTransformer`."""
+        field = self._columns['fields'][index]
+        if field < 0:
+            return None, None
+        position = self._columns['indexes'][index]
+        return self._field_names[field], position if position >= 0 else None
+
+    def children_of(self, index):
+        ends = self._columns['ends']
+        children = []
+        child = index + 1
+        while child < ends[index]:
+            children.append(child)
+            child = ends[child]
+        return children
+
+    def subtree_of(self, index):
+        """Return range of indexes of the node and all its descendants."""
+        return range(index, self._columns['ends'][index])
+
+    def position_of(self, index):
+        """Return (lineno, col_offset, end_lineno, end_col_offset), missing locations are None."""
+        return tuple(self._location(name, index) for name in _LOCATIONS)
+
+    def materialize(self, index=0, annotate=False):
+        """Build `ast` nodes of the subtree, optionally annotated like by `ParentChildNodeTransformer`."""
+        columns = self._columns
+        types = columns['types']
+        end = columns['ends'][index]
+        nodes = []
+        # nodes without fields and locations, like expression contexts, are shared like in parsed trees
+        singletons = {}
+        for node_index in range(index, end):
+            node_class = self._types[types[node_index]][0]
+            if not node_class._fields and not node_class._attributes:
+                node = singletons.get(node_class)
+                if node is None:
+                    node = singletons[node_class] = node_class()
+                nodes.append(node)
+                continue
+            node = node_class.__new__(node_class)
+            for name in node_class._attributes:
+                if name in columns:
+                    value = columns[name][node_index]
+                    if value != _MISSING_LOCATION:
+                        setattr(node, name, None if value == _NONE_LOCATION else value)
+            nodes.append(node)
+        for node_index, node in zip(range(index, end), nodes):
+            self._fill_fields(node_index, node, nodes, index)
+        if annotate:
+            ParentChildNodeTransformer().visit(nodes[0])
+        return nodes[0]
+
+    def to_source(self, index=0, indent_with=' ' * 4):
+        """Generate code of the subtree, starting from the first line whatever its original line number is."""
+        node = self.materialize(index)
+        first_line = self._location('lineno', index)
+        if first_line:
+            for child in ast.walk(node):
+                for name in ('lineno', 'end_lineno'):
+                    lineno = getattr(child, name, None)
+                    if lineno is not None:
+                        setattr(child, name, lineno - first_line + 1)
+        # statements and expressions are rendered within a module, like they are in parsed code
+        if isinstance(node, ast.expr):
+            node = ast.copy_location(ast.Expr(value=node), node)
+        if isinstance(node, ast.stmt):
+            node = ast.Module(body=[node], type_ignores=[])
+        return visitors.to_source(node, indent_with)
+
+    def _fill_fields(self, node_index, node, nodes, offset):
+        columns = self._columns
+        slots = columns['slots']
+        ends = columns['ends']
+        constants = self._constants
+        slot = columns['slot_starts'][node_index]
+        child = node_index + 1
+        for name in self._types[columns['types'][node_index]][1]:
+            code = slots[slot]
+            slot += 1
+            kind = code & _KIND_MASK
+            if kind == _LIST:
+                value = []
+                for _ in range(code >> _KIND_BITS):
+                    code = slots[slot]
+                    slot += 1
+                    if code == _NODE:
+                        value.append(nodes[child - offset])
+                        child = ends[child]
+                    else:
+                        value.append(None if code == _NONE else constants[code >> _KIND_BITS])
+            elif kind == _NODE:
+                value = nodes[child - offset]
+                child = ends[child]
+            elif kind == _NONE:
+                value = None
+            else:
+                value = constants[code >> _KIND_BITS]
+            setattr(node, name, value)
+
+    def _location(self, name, index):
+        value = self._columns[name][index]
+        return None if value in (_MISSING_LOCATION, _NONE_LOCATION) else value
+
+
+_missing = object()
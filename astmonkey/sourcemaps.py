@@ -0,0 +1,162 @@
+import ast
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+
+from astmonkey.transformers import ParentChildNodeTransformer
+from astmonkey.visitors import FixLinenoNodeVisitor, SourceGeneratorNodeVisitor
+
+_COLUMN_BITS = 32
+
+
+def to_source_with_map(node, indent_with=' ' * 4, writer=None):
+    """Same as `visitors.to_source`, but returns also `SourceMap` of the generated code."""
+    ParentChildNodeTransformer().visit(node)
+    FixLinenoNodeVisitor().visit(node)
+    generator = SourceMapGeneratorNodeVisitor(indent_with, writer)
+    generator.visit(node)
+    return generator.writer.getvalue(), generator.source_map
+
+
+class SourceMap(object):
+    """Positions of nodes in generated code.
+
+    Every visited node gets (start line, start column, end line, end column)
+    entry - lines are 1-based and columns are 0-based like in `ast`, end
+    positions are exclusive. Entries are kept in arrays in the order of
+    their start positions, so lookups by position are binary searches.
+
+    Positions are those of `ast.parse` of the generated code, except that:
+
+    * columns count characters of the generated string, not UTF-8 bytes,
+    * decorated definitions start at their first decorator, like in `ast`
+      of Python < 3.8.
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.positions = array('l')
+        self.parents = array('l')
+        self._keys = array('q')
+        self._indexes = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def position_of(self, node):
+        index = self._indexes[node]
+        return tuple(self.positions[index * 4:index * 4 + 4])
+
+    def node_at(self, line, column):
+        """Return the innermost node which generated code at the position."""
+        key = _key(line, column)
+        index = bisect_right(self._keys, key) - 1
+        while index >= 0:
+            if key < _key(self.positions[index * 4 + 2], self.positions[index * 4 + 3]):
+                return self.nodes[index]
+            index = self.parents[index]
+        return None
+
+    def node_at_line(self, line):
+        """Return the outermost statement or expression starting in the line.
+
+        If no node starts in the line, the innermost node spanning it is returned.
+        """
+        index = bisect_right(self._keys, _key(line, 0) - 1)
+        while index < len(self.nodes) and self.positions[index * 4] == line:
+            if not isinstance(self.nodes[index], ast.mod):
+                return self.nodes[index]
+            index += 1
+        return self.node_at(line, 0)
+
+    def start(self, node, line, column, parent_index):
+        index = len(self.nodes)
+        self.nodes.append(node)
+        self.positions.extend((line, column, line, column))
+        self.parents.append(parent_index)
+        self._keys.append(_key(line, column))
+        self._indexes[node] = index
+        return index
+
+    def move_start(self, index, line, column):
+        """Move the start of the entry forward, not past the start of the next entry."""
+        self.positions[index * 4] = line
+        self.positions[index * 4 + 1] = column
+        self._keys[index] = _key(line, column)
+
+    def end(self, index, line, column):
+        self.positions[index * 4 + 2] = line
+        self.positions[index * 4 + 3] = column
+
+
+def _key(line, column):
+    return (line << _COLUMN_BITS) | column
+
+
+class SourceMapGeneratorNodeVisitor(SourceGeneratorNodeVisitor):
+    """Source generator which records positions of visited nodes in `source_map`."""
+    bulk_constants = False
+
+    def __init__(self, indent_with, writer=None):
+        super(SourceMapGeneratorNodeVisitor, self).__init__(indent_with, writer)
+        self.source_map = SourceMap()
+        self._open_entries = [-1]
+        self._ended_entries = set()
+
+    def visit(self, node):
+        self.correct_line_number(node)
+        self._start_chain_node(node)
+        try:
+            return super(SourceMapGeneratorNodeVisitor, self).visit(node)
+        finally:
+            self._finish_chain_node(node)
+
+    def _start_chain_node(self, node):
+        line, column = self._position()
+        self._open_entries.append(self.source_map.start(node, line, column, self._open_entries[-1]))
+
+    def _finish_chain_node(self, node):
+        index = self._open_entries.pop()
+        if index in self._ended_entries:
+            self._ended_entries.remove(index)
+        else:
+            self.source_map.end(index, *self._position())
+
+    def _position(self):
+        return max(self.writer.lines, 1), self.writer.column
+
+    def if_elif(self, node, use_elif=False):
+        if not use_elif:
+            super(SourceMapGeneratorNodeVisitor, self).if_elif(node)
+            return
+        # elif clauses are rendered by the parent if statement without `visit`
+        self.statement_line(node)
+        self._start_chain_node(node)
+        try:
+            self.if_clause(node, use_elif=True)
+        finally:
+            self._finish_chain_node(node)
+
+    def docstring(self, node):
+        self._start_chain_node(node)
+        try:
+            super(SourceMapGeneratorNodeVisitor, self).docstring(node)
+        finally:
+            self._finish_chain_node(node)
+
+    @contextmanager
+    def inside(self, pre, post, cond=True):
+        index = self._open_entries[-1]
+        source_map = self.source_map
+        if (not cond or pre != '(' or index < 0 or isinstance(source_map.nodes[index], ast.Tuple)
+                or tuple(source_map.positions[index * 4:index * 4 + 2]) != self._position()):
+            with super(SourceMapGeneratorNodeVisitor, self).inside(pre, post, cond):
+                yield
+            return
+        # parentheses generated around the whole expression are not a part of it in `ast`
+        self.write(pre)
+        source_map.move_start(index, *self._position())
+        yield
+        source_map.end(index, *self._position())
+        self._ended_entries.add(index)
+        self.write(post)
@@ -0,0 +1,10 @@
+from astmonkey import utils
+
+collect_ignore = []
+if not utils.check_version(from_inclusive=(3, 7)):
+    # asyncio of Python 3.7+ is used by the server and the Graphviz renderer
+    collect_ignore.extend(['test_graphviz.py', 'test_server.py'])
+if not utils.check_version(from_inclusive=(3, 0)):
+    collect_ignore.append('test_tokens.py')
+if not utils.check_version(from_inclusive=(3, 3)):
+    collect_ignore.append('test_cli.py')
@@ -0,0 +1,99 @@
+import ast
+import os
+
+import pytest
+
+from astmonkey import cache, visitors
+
+
+class TestTreeCache(object):
+    SOURCE = 'x = 1\nx = 2\n\ndef foo(a):\n    return a + 1'
+
+    @pytest.fixture
+    def tree_cache(self, tmpdir):
+        return cache.TreeCache(str(tmpdir.join('cache')))
+
+    def test_miss_then_hit(self, tree_cache):
+        tree_cache.parse(self.SOURCE)
+        tree_cache.parse(self.SOURCE)
+
+        assert tree_cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+    def test_warm_cache_in_new_instance(self, tree_cache):
+        tree_cache.parse(self.SOURCE)
+
+        warm_cache = cache.TreeCache(tree_cache.directory)
+        tree = warm_cache.parse(self.SOURCE)
+
+        assert warm_cache.hits == 1
+        assert ast.dump(tree) == ast.dump(ast.parse(self.SOURCE))
+
+    def test_cached_tree_is_annotated(self, tree_cache):
+        tree_cache.parse(self.SOURCE)
+
+        tree = tree_cache.parse(self.SOURCE)
+
+        assign_node = tree.body[0]
+        ctx_node = assign_node.targets[0].ctx
+        assert assign_node.parent is tree
+        assert assign_node.parent_field == 'body'
+        assert tree.children == tree.body
+        assert ctx_node.parents == [tree.body[0].targets[0], tree.body[1].targets[0]]
+
+    def test_long_expression(self, tree_cache):
+        source = ' + '.join('a{0}'.format(i) for i in range(900))
+        parsed_tree = tree_cache.parse(source)
+        try:
+            tree = tree_cache.parse(source)
+
+            assert tree_cache.hits == 1
+            assert tree.body[0].value.right.id == 'a899'
+            assert tree.body[0].value.parent is tree.body[0]
+        finally:
+            # operator and context nodes are shared with other trees, so forget the parents from this one
+            parsed_nodes = set(id(node) for node in ast.walk(parsed_tree))
+            shared_nodes = dict((id(node), node) for node in ast.walk(parsed_tree) if len(node.parents) > 1)
+            for node in shared_nodes.values():
+                node.parents = [parent for parent in node.parents if id(parent) not in parsed_nodes]
+                node.parent = node.parents[-1] if node.parents else None
+
+    def test_to_source(self, tree_cache):
+        generated = tree_cache.to_source(self.SOURCE)
+
+        assert generated == visitors.to_source(ast.parse(self.SOURCE))
+        assert tree_cache.to_source(self.SOURCE) == generated
+        assert tree_cache.misses == 1
+
+    def test_key_depends_on_content(self, tree_cache):
+        assert tree_cache.key('x = 1') != tree_cache.key('x = 2')
+        assert tree_cache.key('x = 1') == tree_cache.key(b'x = 1')
+
+    def test_lru_eviction(self, tree_cache):
+        tree_cache.parse('a = 1')
+        entry_size = os.path.getsize(tree_cache._path(tree_cache.key('a = 1')))
+        tree_cache.max_size = int(entry_size * 2.5)
+        tree_cache.parse('b = 1')
+        os.utime(tree_cache._path(tree_cache.key('a = 1')), (0, 0))
+
+        tree_cache.parse('c = 1')
+
+        assert not os.path.exists(tree_cache._path(tree_cache.key('a = 1')))
+        assert os.path.exists(tree_cache._path(tree_cache.key('b = 1')))
+        assert os.path.exists(tree_cache._path(tree_cache.key('c = 1')))
+
+    def test_corrupted_entry_is_a_miss(self, tree_cache):
+        tree_cache.parse(self.SOURCE)
+        with open(tree_cache._path(tree_cache.key(self.SOURCE)), 'wb') as f:
+            f.write(b'garbage')
+
+        tree = tree_cache.parse(self.SOURCE)
+
+        assert tree_cache.misses == 2
+        assert ast.dump(tree) == ast.dump(ast.parse(self.SOURCE))
+
+    def test_clear(self, tree_cache):
+        tree_cache.parse(self.SOURCE)
+
+        tree_cache.clear()
+
+        assert os.listdir(tree_cache.directory) == []
@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from astmonkey import cli
+
+
+class TestCli(object):
+
+    @pytest.fixture
+    def project(self, tmpdir):
+        project = tmpdir.mkdir('project')
+        project.join('a.py').write('x = 1\n')
+        project.mkdir('pkg').join('b.py').write('def f():\n    return 2\n')
+        project.join('README.txt').write('not python')
+        return project
+
+    @pytest.fixture
+    def output(self, tmpdir):
+        return tmpdir.join('output')
+
+    def test_find_sources(self, project):
+        sources = cli.find_sources([str(project)])
+
+        assert [relative_path for _, relative_path in sources] == ['a.py', os.path.join('pkg', 'b.py')]
+
+    def test_stdout(self, project, capsys):
+        assert cli.main([str(project.join('a.py'))]) == 0
+
+        assert capsys.readouterr().out == 'x = 1\n'
+
+    def test_output_directory(self, project, output, capsys):
+        assert cli.main([str(project), '-o', str(output)]) == 0
+
+        assert output.join('a.py').read() == 'x = 1'
+        assert output.join('pkg', 'b.py').read() == 'def f():\n    return 2'
+        assert output.join(cli.INDEX_FILENAME).check()
+
+    def test_dot(self, project, output):
+        assert cli.main([str(project), '-o', str(output), '--dot']) == 0
+
+        assert output.join('a.dot').read().startswith('graph G {')
+
+    def test_unchanged_files_are_skipped(self, project, output, capsys):
+        cli.main([str(project), '-o', str(output)])
+        capsys.readouterr()
+
+        cli.main([str(project), '-o', str(output)])
+
+        assert capsys.readouterr().out == ''
+
+    def test_changed_files_are_rendered(self, project, output, capsys):
+        cli.main([str(project), '-o', str(output)])
+        capsys.readouterr()
+        project.join('a.py').write('x = 2\n')
+        os.utime(str(project.join('a.py')), (0, 0))
+
+        cli.main([str(project), '-o', str(output)])
+
+        assert capsys.readouterr().out == str(project.join('a.py')) + '\n'
+        assert output.join('a.py').read() == 'x = 2'
+
+    def test_touched_files_are_not_rendered(self, project, output, capsys):
+        cli.main([str(project), '-o', str(output)])
+        capsys.readouterr()
+        os.utime(str(project.join('a.py')), (0, 0))
+
+        cli.main([str(project), '-o', str(output)])
+
+        assert capsys.readouterr().out == ''
+
+    def test_jobs(self, project, output):
+        assert cli.main([str(project), '-o', str(output), '--jobs', '2']) == 0
+
+        assert output.join('pkg', 'b.py').read() == 'def f():\n    return 2'
+
+    def test_syntax_error(self, project, output, capsys):
+        project.join('c.py').write('x = (')
+
+        assert cli.main([str(project), '-o', str(output)]) == 1
+
+        assert str(project.join('c.py')) in capsys.readouterr().err
+        assert not output.join('c.py').check()
+
+    def test_unexpected_error(self, project, output, capsys, monkeypatch):
+        render = cli.render
+
+        def failing_render(source, dot=False):
+            if source.startswith(b'x'):
+                raise RuntimeError('failure')
+            return render(source, dot)
+
+        monkeypatch.setattr(cli, 'render', failing_render)
+
+        assert cli.main([str(project), '-o', str(output)]) == 1
+
+        assert capsys.readouterr().err == '{0}: RuntimeError: failure\n'.format(project.join('a.py'))
+        assert output.join('pkg', 'b.py').check()
+        assert output.join(cli.INDEX_FILENAME).check()
+
+    def test_files_with_same_names(self, project, output, monkeypatch):
+        project.mkdir('other').join('b.py').write('y = 3\n')
+        monkeypatch.chdir(project)
+
+        assert cli.main([os.path.join('pkg', 'b.py'), os.path.join('other', 'b.py'), '-o', str(output)]) == 0
+
+        assert output.join('pkg', 'b.py').read() == 'def f():\n    return 2'
+        assert output.join('other', 'b.py').read() == 'y = 3'
+
+    def test_file_outside_current_directory(self, project, monkeypatch):
+        monkeypatch.chdir(project.mkdir('other'))
+        path = str(project.join('a.py'))
+
+        assert cli.find_sources([path]) == [(path, os.path.splitdrive(path)[1].lstrip(os.sep))]
+
+    def test_watch_requires_output(self, project):
+        with pytest.raises(SystemExit):
+            cli.main([str(project), '--watch'])
@@ -0,0 +1,213 @@
+import ast
+
+import pytest
+
+from astmonkey import utils
+from astmonkey.codecache import CodeCache
+from astmonkey.transformers import ParentChildNodeTransformer
+
+if not utils.check_version(from_inclusive=(3, 7)):
+    pytest.skip('the module uses postponed evaluation of annotations', allow_module_level=True)
+
+# constants are parsed as Num and Str nodes before Python 3.8
+_VALUE_FIELDS = {'Constant': 'value', 'Num': 'n', 'Str': 's'}
+
+SOURCE = '''"""Module docstring."""
+from __future__ import annotations
+
+import functools
+
+LIMIT = 10
+
+
+def clamp(value: Undefined) -> int:
+    return min(value, LIMIT)
+
+
+"""Not a docstring."""
+
+
+class Base(object):
+
+    def name(self):
+        return 'base'
+
+
+class Child(Base):
+    """Child docstring."""
+    SIZES = [size * 2 for size in range(3)]
+
+    def __init__(self, value=LIMIT):
+        self._value = value
+
+    def name(self):
+        return 'child of ' + super().name()
+
+    @property
+    def value(self):
+        return clamp(self._value)
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+
+    def items(self):
+        for size in self.SIZES:
+            yield size + self.value
+
+    async def fetch(self):
+        return self.value
+
+    class Nested(object):
+
+        def method(self):
+            return __class__.__name__
+
+
+@functools.lru_cache()
+def cached(value):
+    return Child(value).value
+
+
+RESULT = cached(20)
+'''
+
+
+class TestCodeCache(object):
+
+    def _tree(self, source=SOURCE):
+        return ParentChildNodeTransformer().visit(ast.parse(source))
+
+    def _execute(self, cache):
+        return cache.execute({'__name__': 'module'})
+
+    def _constant(self, tree, value):
+        return next(node for node in ast.walk(tree) if node.__class__.__name__ in _VALUE_FIELDS and
+                    getattr(node, _VALUE_FIELDS[node.__class__.__name__]) == value)
+
+    def _set_constant(self, node, value):
+        setattr(node, _VALUE_FIELDS[node.__class__.__name__], value)
+
+    def test_same_effect_as_module(self):
+        namespace = self._execute(CodeCache(self._tree()))
+        expected = {'__name__': 'module'}
+        exec(compile(ast.parse(SOURCE), '<ast>', 'exec'), expected)
+
+        assert sorted(namespace) == sorted(expected)
+        assert namespace['__doc__'] == 'Module docstring.'
+        assert namespace['RESULT'] == 10
+        assert namespace['clamp'].__annotations__ == {'value': 'Undefined', 'return': 'int'}
+        child = namespace['Child'](3)
+        assert child.name() == 'child of base'
+        assert list(child.items()) == [3, 5, 7]
+        assert namespace['Child'].__doc__ == 'Child docstring.'
+        assert namespace['Child'].__init__.__qualname__ == 'Child.__init__'
+        assert namespace['Child'].Nested().method() == 'Nested'
+        child.value = 20
+        assert child.value == 10
+
+    def test_units_compiled_once(self):
+        cache = CodeCache(self._tree())
+
+        first = cache.code_objects()
+        second = cache.code_objects()
+
+        assert first == second
+        assert cache.misses == len(first)
+        assert cache.hits == len(first)
+
+    def test_only_mutated_function_compiled(self):
+        tree = self._tree()
+        cache = CodeCache(tree)
+        cache.code_objects()
+        name = next(node for node in ast.walk(tree) if isinstance(node, ast.Name) and node.id == 'LIMIT' and
+                    isinstance(node.parent, ast.Call))
+        compiled = []
+        cache._compile = lambda statements, flags: compiled.append(statements) or CodeCache._compile(
+            cache, statements, flags)
+
+        name.id = 'value'
+        cache.invalidate(name)
+        namespace = self._execute(cache)
+
+        assert namespace['clamp'](30) == 30
+        assert len(compiled) == 1
+
+    def test_only_mutated_method_compiled(self):
+        tree = self._tree()
+        cache = CodeCache(tree)
+        cache.code_objects()
+        constant = self._constant(tree, 'base')
+        compiled = []
+        cache._compile = lambda statements, flags: compiled.append(statements) or CodeCache._compile(
+            cache, statements, flags)
+
+        self._set_constant(constant, 'mutant')
+        cache.invalidate(constant)
+        namespace = self._execute(cache)
+
+        assert namespace['Child']().name() == 'child of mutant'
+        # the method within a wrapper class and the class with stubs of methods
+        assert len(compiled) == 2
+
+    def test_mutated_nested_class(self):
+        tree = self._tree()
+        cache = CodeCache(tree)
+        cache.code_objects()
+        attribute = next(node for node in ast.walk(tree) if isinstance(node, ast.Attribute) and node.attr == '__name__')
+
+        attribute.attr = '__qualname__'
+        cache.invalidate(attribute)
+
+        assert self._execute(cache)['Child'].Nested().method() == 'Child.Nested'
+
+    def test_reverted_mutation_reuses_code(self):
+        tree = self._tree()
+        cache = CodeCache(tree)
+        original = cache.code_objects()
+        constant = self._constant(tree, 2)
+
+        self._set_constant(constant, 3)
+        cache.invalidate(constant)
+        mutant = cache.code_objects()
+        self._set_constant(constant, 2)
+        cache.invalidate(constant)
+        misses = cache.misses
+
+        assert mutant != original
+        assert cache.code_objects() == original
+        assert cache.misses == misses
+
+    def test_constants_with_equal_hashes(self):
+        tree = self._tree('def f():\n    return 1\n')
+        constant = tree.body[0].body[0].value
+        self._set_constant(constant, -1)
+        cache = CodeCache(tree)
+        assert self._execute(cache)['f']() == -1
+
+        # hash(-1) == hash(-2) in CPython
+        self._set_constant(constant, -2)
+        cache.invalidate(constant)
+
+        assert self._execute(cache)['f']() == -2
+        assert cache.hits == 0
+
+    def test_invalidate_all(self):
+        tree = self._tree('x = 1\n\ndef f():\n    return x\n')
+        cache = CodeCache(tree)
+        cache.code_objects()
+
+        tree.body[1].body[0].value.id = 'y'
+        cache.invalidate()
+
+        with pytest.raises(NameError):
+            self._execute(cache)['f']()
+
+    def test_statements_added(self):
+        tree = self._tree('x = 1\n\ndef f():\n    return x\n')
+        cache = CodeCache(tree)
+        cache.code_objects()
+
+        tree.body.append(ast.parse('y = f()', '<ast>').body[0])
+
+        assert self._execute(cache)['y'] == 1
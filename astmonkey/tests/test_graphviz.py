@@ -0,0 +1,110 @@
+import ast
+import asyncio
+import os
+import stat
+import sys
+
+import pytest
+
+from astmonkey import transformers
+from astmonkey.graphviz import GraphvizRenderer
+from astmonkey.visitors import GraphNodeVisitor
+
+STUB = '''#!{executable}
+import os
+import sys
+import time
+
+data = sys.stdin.buffer.read()
+directory = sys.argv[2] if len(sys.argv) > 2 else None
+if directory:
+    marker = os.path.join(directory, 'running-{{0}}'.format(os.getpid()))
+    open(marker, 'w').close()
+    with open(os.path.join(directory, 'log'), 'a') as log:
+        log.write('{{0}} {{1}}\\n'.format(os.getpid(), len([name for name in os.listdir(directory) if name.startswith('running-')])))
+if b'fail' in data:
+    sys.stderr.write('syntax error in line 1\\n')
+    sys.exit(1)
+if b'hang' in data:
+    time.sleep(60)
+if directory:
+    time.sleep(0.2)
+    os.remove(marker)
+sys.stdout.buffer.write(sys.argv[1].encode('ascii') + b'\\n' + data)
+'''
+
+
+class TestGraphvizRenderer(object):
+
+    @pytest.fixture
+    def program(self, tmp_path):
+        path = tmp_path / 'stub-dot'
+        path.write_text(STUB.format(executable=sys.executable))
+        path.chmod(path.stat().st_mode | stat.S_IXUSR)
+        return str(path)
+
+    def _log(self, directory):
+        with open(os.path.join(directory, 'log')) as log:
+            return [tuple(int(item) for item in line.split()) for line in log]
+
+    def test_render_graphs(self, program):
+        node = transformers.ParentChildNodeTransformer().visit(ast.parse('x = 1'))
+        visitor = GraphNodeVisitor()
+        visitor.visit(node)
+
+        results = GraphvizRenderer(program, output_format='svg').run([visitor.graph, 'graph G {}'])
+
+        assert results[0].output == b'-Tsvg\n' + visitor.graph.to_string().encode('utf-8')
+        assert results[1].output == b'-Tsvg\ngraph G {}'
+        assert all(result.error is None and result.elapsed > 0 for result in results)
+
+    def test_failed_graph(self, program):
+        results = GraphvizRenderer(program).run(['graph fail {}', 'graph G {}'])
+
+        assert results[0] == (None, 'exit status 1: syntax error in line 1', results[0].elapsed)
+        assert results[1].output == b'-Tpng\ngraph G {}'
+
+    def test_missing_program(self, tmp_path):
+        results = GraphvizRenderer(str(tmp_path / 'missing')).run(['graph G {}'])
+
+        assert results[0].output is None
+        assert results[0].error.startswith('cannot run')
+
+    def test_bounded_concurrency(self, program, tmp_path):
+        directory = str(tmp_path)
+
+        results = GraphvizRenderer(program, concurrency=2, args=[directory]).run(['graph G {}'] * 6)
+
+        assert all(result.error is None for result in results)
+        log = self._log(directory)
+        assert len(log) == 6
+        assert max(running for _, running in log) <= 2
+
+    def test_timeout(self, program, tmp_path):
+        directory = str(tmp_path)
+
+        results = GraphvizRenderer(program, timeout=0.5, args=[directory]).run(['graph hang {}', 'graph G {}'])
+
+        assert results[0].error == 'timed out after 0.5 s'
+        assert results[1].output is not None
+        self._assert_killed(self._log(directory)[0][0])
+
+    def test_cancellation(self, program, tmp_path):
+        directory = str(tmp_path)
+        renderer = GraphvizRenderer(program, args=[directory])
+
+        async def cancel():
+            task = asyncio.ensure_future(renderer.render_all(['graph hang {}']))
+            while not os.path.exists(os.path.join(directory, 'log')):
+                await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel())
+
+        self._assert_killed(self._log(directory)[0][0])
+
+    def _assert_killed(self, pid):
+        with pytest.raises(ProcessLookupError):
+            os.kill(pid, 0)
@@ -0,0 +1,142 @@
+import ast
+
+import pytest
+
+from astmonkey import incremental
+from astmonkey.incremental import TextEdit
+from astmonkey.transformers import ParentChildNodeTransformer
+
+SOURCE = '''import os
+
+
+def f(x):
+    """Doc."""
+    if x:
+        y = 1
+    else:
+        y = 2
+    return y
+
+
+class A(object):
+
+    @staticmethod
+    def g():
+        try:
+            pass
+        except ValueError:
+            return 1
+        finally:
+            z = 3
+
+
+result = f(1) + A.g()
+'''
+
+
+class TestReparse(object):
+
+    def _annotated(self, source):
+        return ParentChildNodeTransformer().visit(ast.parse(source))
+
+    def _reparse(self, source, edit):
+        tree = self._annotated(source)
+        new_tree, new_source = incremental.reparse(tree, source, edit)
+        assert new_source == incremental.apply_edit(source, edit)
+        assert ast.dump(new_tree, include_attributes=True) == ast.dump(ast.parse(new_source), include_attributes=True)
+        self._assert_annotations(new_tree)
+        return tree, new_tree
+
+    def _assert_annotations(self, tree):
+        for node in ast.walk(tree):
+            assert node.children == list(ast.iter_child_nodes(node))
+            for field, value in ast.iter_fields(node):
+                items = value if isinstance(value, list) else [value]
+                for index, item in enumerate(items):
+                    if isinstance(item, ast.AST) and item._attributes:
+                        assert item.parent is node
+                        assert item.parent_field == field
+                        assert item.parent_field_index == (index if isinstance(value, list) else None)
+
+    def test_edit_in_nested_block(self):
+        tree, new_tree = self._reparse(SOURCE, TextEdit((7, 12), (7, 13), '10'))
+
+        assert new_tree is tree
+        assert new_tree.body[1].body[1].body[0].value.value == 10
+
+    def test_untouched_nodes_kept(self):
+        tree = self._annotated(SOURCE)
+        function = tree.body[1]
+        untouched = [function.body[0], function.body[1].orelse[0], function.body[2], tree.body[2], tree.body[3]]
+
+        new_tree, _ = incremental.reparse(tree, SOURCE, TextEdit((7, 12), (7, 13), '10'))
+
+        assert new_tree is tree
+        assert [function.body[0], function.body[1].orelse[0], function.body[2], tree.body[2], tree.body[3]] == untouched
+
+    def test_new_lines_shift_following_nodes(self):
+        tree, new_tree = self._reparse(SOURCE, TextEdit((7, 13), (7, 13), '\n        w = 2\n'))
+
+        assert new_tree is tree
+        assert new_tree.body[3].lineno == 27
+
+    def test_removed_lines(self):
+        tree, new_tree = self._reparse(SOURCE, TextEdit((8, 0), (10, 0), ''))
+
+        assert new_tree is tree
+
+    @pytest.mark.parametrize('edit', [
+        TextEdit((20, 19), (20, 20), '2'),
+        TextEdit((22, 17), (22, 17), '\n            z += 1'),
+        TextEdit((15, 5), (15, 17), 'classmethod'),
+        TextEdit((4, 7), (4, 7), ', w=None'),
+    ])
+    def test_edits(self, edit):
+        tree, new_tree = self._reparse(SOURCE, edit)
+
+        assert new_tree is tree
+
+    def test_edit_between_statements(self):
+        tree, new_tree = self._reparse(SOURCE, TextEdit((2, 0), (2, 0), 'import sys'))
+
+        assert new_tree is tree
+
+    def test_appending_at_end(self):
+        tree, new_tree = self._reparse(SOURCE, TextEdit((26, 0), (26, 0), 'print(result)\n'))
+
+        assert new_tree is tree
+
+    def test_statements_sharing_line(self):
+        source = 'if x: a = 1\nelse: a = 2\nb = 3; c = 4\n'
+
+        self._reparse(source, TextEdit((1, 10), (1, 11), '5'))
+        self._reparse(source, TextEdit((3, 4), (3, 5), '6'))
+
+    def test_edit_not_isolated_in_block(self):
+        source = 'if a:\n    pass\nx = 1\n'
+
+        # the statement becomes a clause of the preceding one
+        tree, new_tree = self._reparse(source, TextEdit((3, 0), (3, 0), 'else:\n    '))
+
+        assert new_tree is not tree
+
+    def test_syntax_error(self):
+        tree = self._annotated(SOURCE)
+
+        with pytest.raises(SyntaxError):
+            incremental.reparse(tree, SOURCE, TextEdit((7, 12), (7, 13), '(1,'))
+
+    def test_repeated_edits(self):
+        source = SOURCE
+        tree = self._annotated(source)
+        for edit in [TextEdit((9, 13), (9, 13), '0'), TextEdit((10, 12), (10, 12), ' + 1'),
+                     TextEdit((10, 16), (10, 16), '\n    y += 1')]:
+            tree, source = incremental.reparse(tree, source, edit)
+
+        assert ast.dump(tree, include_attributes=True) == ast.dump(ast.parse(source), include_attributes=True)
+
+
+class TestApplyEdit(object):
+
+    def test_apply_edit(self):
+        assert incremental.apply_edit('ab\ncd\nef', TextEdit((1, 1), (3, 1), 'X\nY')) == 'aX\nYf'
@@ -0,0 +1,88 @@
+import ast
+import difflib
+
+import pytest
+
+from astmonkey import patches
+from astmonkey.transformers import ParentChildNodeTransformer
+from astmonkey.variants import TreeVariant, VariantSourceGeneratorNodeVisitor
+from astmonkey.visitors import to_source
+
+
+class TestRenderedTree(object):
+    SOURCE = ("import os\n\n\n"
+              "def f(a):\n"
+              "    return a + 1\n\n\n"
+              "def g(b):\n"
+              "    if b:\n"
+              "        return b * 2\n"
+              "    return 0\n"
+              "x = f(g(2))")
+
+    @pytest.fixture
+    def rendered(self):
+        return patches.RenderedTree(ParentChildNodeTransformer().visit(ast.parse(self.SOURCE)))
+
+    def _unified_diff(self, old, new):
+        return ''.join(difflib.unified_diff(
+            [line + '\n' for line in old.split('\n')], [line + '\n' for line in new.split('\n')],
+            'original', 'modified', n=0, lineterm='\n'))
+
+    def test_original_code(self, rendered):
+        assert rendered.code == to_source(ast.parse(self.SOURCE))
+
+    def test_replace(self, rendered):
+        binop = rendered.tree.body[2].body[0].body[0].value
+
+        patch = rendered.replace(binop.op, ast.Div())
+
+        assert patch.hunks == [patches.Hunk(10, ['        return b * 2'], ['        return b / 2'])]
+        assert patch.apply(rendered.code) == rendered.code.replace('b * 2', 'b / 2')
+
+    def test_unified_diff(self, rendered):
+        variant = TreeVariant(rendered.tree)
+        variant = variant.remove(rendered.tree.body[2].body[0])
+        variant = variant.replace(rendered.tree.body[1].body[0].value, ast.Name(id='a', ctx=ast.Load()))
+        modified_code = variant.to_source()
+
+        patch = rendered.diff(variant)
+
+        assert patch.apply(rendered.code) == modified_code
+        assert patch.unified_diff() == self._unified_diff(rendered.code, modified_code)
+
+    def test_plain_modified_tree(self, rendered):
+        module = ast.Module(body=rendered.tree.body[:2] + rendered.tree.body[3:], type_ignores=[])
+        ParentChildNodeTransformer().visit(module)
+
+        patch = rendered.diff(module)
+
+        assert [hunk.start for hunk in patch.hunks] == [8]
+        assert patch.apply(rendered.code) == to_source(module)
+
+    def test_no_changes(self, rendered):
+        patch = rendered.diff(TreeVariant(rendered.tree))
+
+        assert not patch
+        assert patch.apply(rendered.code) == rendered.code
+
+    def test_unchanged_statements_not_rendered(self, rendered, monkeypatch):
+        rendered_functions = []
+        visit_function_def = VariantSourceGeneratorNodeVisitor.visit_FunctionDef
+
+        def visit(generator, node):
+            rendered_functions.append(node.name)
+            visit_function_def(generator, node)
+
+        monkeypatch.setattr(VariantSourceGeneratorNodeVisitor, 'visit_FunctionDef', visit)
+
+        rendered.replace(rendered.tree.body[1].body[0].value.op, ast.Sub())
+
+        assert rendered_functions == ['f']
+
+    def test_diff(self):
+        original = ParentChildNodeTransformer().visit(ast.parse('x = 1\ny = 2'))
+        modified = ParentChildNodeTransformer().visit(ast.parse('x = 1\ny = 3'))
+
+        patch = patches.diff(original, modified)
+
+        assert patch.hunks == [patches.Hunk(2, ['y = 2'], ['y = 3'])]
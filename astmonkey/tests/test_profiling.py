@@ -0,0 +1,76 @@
+import ast
+import pstats
+
+import pytest
+
+from astmonkey import profiling, utils, visitors
+
+
+class TestProfiler(object):
+    SOURCE = 'def foo(x):\n    return x + (x + 1)\nfoo(2)'
+
+    @pytest.fixture
+    def profiler(self):
+        return profiling.Profiler()
+
+    def test_to_source(self, profiler):
+        generated = profiler.to_source(ast.parse(self.SOURCE))
+
+        assert generated == visitors.to_source(ast.parse(self.SOURCE))
+
+    def test_method_stats(self, profiler):
+        profiler.to_source(ast.parse(self.SOURCE))
+
+        methods = profiler.stats()['methods']
+        generator_name = visitors.SourceGeneratorNodeVisitor.__name__
+        binop_stats = methods[generator_name + '.visit_BinOp']
+        assert binop_stats['calls'] == 2
+        assert binop_stats['primitive_calls'] == 1
+        assert binop_stats['cumtime'] >= binop_stats['tottime'] >= 0
+        # arguments are names in Python 2
+        name_calls = 3 if utils.check_version(from_inclusive=(3, 0)) else 4
+        assert methods[generator_name + '.visit_Name']['calls'] == name_calls
+
+    def test_pass_stats(self, profiler):
+        profiler.to_source(ast.parse(self.SOURCE))
+
+        passes = profiler.stats()['passes']
+        assert set(passes) == {
+            'ParentChildNodeTransformer',
+            'FixLinenoNodeVisitor',
+            visitors.SourceGeneratorNodeVisitor.__name__,
+        }
+        assert all(stats['calls'] == 1 for stats in passes.values())
+
+    def test_graph(self, profiler):
+        graph = profiler.graph(ast.parse(self.SOURCE))
+
+        assert graph.get_nodes()
+        assert profiler.stats()['passes']['GraphNodeVisitor']['calls'] == 1
+
+    def test_measure(self, profiler):
+        with profiler.measure('custom'):
+            pass
+
+        assert profiler.stats()['passes']['custom']['calls'] == 1
+
+    def test_pstats(self, profiler, tmpdir):
+        profiler.to_source(ast.parse(self.SOURCE))
+        filename = str(tmpdir.join('stats'))
+
+        profiler.dump_stats(filename)
+
+        assert pstats.Stats(filename).total_calls == profiler.pstats().total_calls > 0
+
+    def test_not_instrumented_visitor(self, profiler):
+        generator = visitors.SourceGeneratorNodeVisitor(' ' * 4)
+
+        assert 'visit_Name' not in vars(generator)
+        assert 'visit_Name' in vars(profiler.instrument(generator))
+
+    def test_reset(self, profiler):
+        profiler.to_source(ast.parse(self.SOURCE))
+
+        profiler.reset()
+
+        assert profiler.stats() == {'passes': {}, 'methods': {}}
@@ -0,0 +1,100 @@
+import ast
+import threading
+
+import pytest
+
+from astmonkey import transformers, visitors
+from astmonkey.rendering import LinenoFixes, Renderer
+from astmonkey.variants import TreeVariant
+
+
+class TestRenderer(object):
+    SOURCE = ('import os\n\n\n'
+              '@decorator\n'
+              'def f(a, b=1):\n'
+              '    """Docstring."""\n'
+              '    return -(a + b) * f(a.b[1])\n\n\n'
+              'class A(object):\n'
+              '    x = [1,\n'
+              '         2]\n'
+              'while not x:\n'
+              '    pass')
+
+    @pytest.fixture
+    def renderer(self):
+        return Renderer()
+
+    def _dump(self, node):
+        return ast.dump(node, include_attributes=True)
+
+    def _annotated_nodes(self, node):
+        return [node for node in ast.walk(node)
+                if not isinstance(node, (ast.expr_context, ast.operator, ast.unaryop)) and hasattr(node, 'parent')]
+
+    def test_same_as_to_source(self, renderer):
+        assert renderer.to_source(ast.parse(self.SOURCE)) == visitors.to_source(ast.parse(self.SOURCE))
+
+    def test_tree_not_modified(self, renderer):
+        node = ast.parse(self.SOURCE)
+        node.body[2].body[0].lineno = 1
+        dump = self._dump(node)
+
+        renderer.to_source(node)
+
+        assert self._dump(node) == dump
+        assert not self._annotated_nodes(node)
+
+    def test_implausible_line_numbers(self, renderer):
+        node = ast.parse(self.SOURCE)
+        node.body[3].body[0].lineno = 1
+        expected = visitors.to_source(ast.parse(self.SOURCE))
+
+        assert renderer.to_source(node) == expected
+
+    def test_reuse(self, renderer):
+        first = renderer.to_source(ast.parse('x = 1'))
+
+        second = renderer.to_source(ast.parse(self.SOURCE))
+        renderer.reset()
+        third = renderer.to_source(ast.parse('x = 1'))
+
+        assert first == third == 'x = 1'
+        assert second == visitors.to_source(ast.parse(self.SOURCE))
+
+    def test_variant(self, renderer):
+        node = transformers.ParentChildNodeTransformer().visit(ast.parse(self.SOURCE))
+        variant = TreeVariant(node).replace(node.body[1].body[1].value.left.operand.op, ast.Sub())
+
+        assert renderer.to_source(variant) == variant.to_source()
+
+    def test_lineno_fixes(self):
+        node = ast.parse('while a:\n    pass\nfor a in b:\n    pass')
+        node.body[1].body[0].lineno = 2
+        fixes = LinenoFixes()
+
+        fixes.visit(node)
+
+        assert fixes.linenos == {node.body[1].body[0]: 4}
+        assert node.body[1].body[0].lineno == 2
+
+    def test_concurrent_rendering(self, renderer):
+        node = transformers.ParentChildNodeTransformer().visit(ast.parse(self.SOURCE))
+        binop = node.body[1].body[1].value
+        variants = [ast.parse(self.SOURCE)] + [TreeVariant(node).replace(binop.op, op()) for op in
+                                               (ast.Add, ast.Sub, ast.Div, ast.Mod, ast.Pow, ast.FloorDiv)]
+        expected = [visitors.to_source(ast.parse(self.SOURCE))] + [variant.to_source() for variant in variants[1:]]
+        threads_count = 8
+        barrier = threading.Barrier(threads_count)
+        results = [None] * threads_count
+
+        def render(thread_index):
+            barrier.wait()
+            results[thread_index] = [[renderer.to_source(variant) for variant in variants] for _ in range(20)]
+
+        threads = [threading.Thread(target=render, args=(index,)) for index in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert all(rounds == [expected] * 20 for rounds in results)
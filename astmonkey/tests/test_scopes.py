@@ -0,0 +1,215 @@
+import ast
+import symtable
+
+import pytest
+
+from astmonkey import scopes, utils
+from astmonkey.scopes import ScopeAnalysis
+from astmonkey.transformers import ParentChildNodeTransformer
+
+SOURCE = '''import os.path
+from functools import *
+
+LIMIT = 10
+
+
+def outer(a, b=LIMIT, *args, c: int = 1, **kwargs):
+    counter = 0
+
+    def inner(d=counter):
+        nonlocal counter
+        counter += d
+        return counter + a + LIMIT
+
+    return inner
+
+
+class A(object):
+    SIZES = [size * LIMIT for size in range(3)]
+
+    def method(self):
+        global created
+        created = SIZES
+        return [total := x for x in self.items if x], total
+
+    lambda_ = lambda e: e + LIMIT
+
+
+try:
+    pass
+except ValueError as error:
+    print(error, os.path)
+'''
+
+
+@pytest.mark.skipif(not utils.check_version(from_inclusive=(3, 8)), reason='the source uses assignment expressions')
+class TestScopeAnalysis(object):
+
+    @pytest.fixture
+    def tree(self):
+        return ParentChildNodeTransformer().visit(ast.parse(SOURCE))
+
+    @pytest.fixture
+    def analysis(self, tree):
+        return ScopeAnalysis(tree)
+
+    def _names(self, tree, name):
+        return [node for node in ast.walk(tree) if isinstance(node, ast.Name) and node.id == name]
+
+    def _function(self, tree, name):
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name == name:
+                return node
+
+    def test_module_scope(self, tree, analysis):
+        module_scope = analysis.module_scope
+
+        assert module_scope.kind == 'module'
+        assert {'os', 'LIMIT', 'outer', 'A', 'error'} <= module_scope.assigned
+        assert [scope.kind for scope in module_scope.children] == ['function', 'class']
+
+    def test_scope_of_definition_parts(self, tree, analysis):
+        outer = self._function(tree, 'outer')
+        outer_scope = analysis.scope_of(outer.body[0])
+
+        assert analysis.scope_of(outer) is analysis.module_scope
+        assert analysis.scope_of(outer.args.defaults[0]) is analysis.module_scope
+        assert analysis.scope_of(outer.args.kwonlyargs[0].annotation) is analysis.module_scope
+        assert analysis.scope_of(outer.args.args[0]) is outer_scope
+        assert outer_scope.node is outer
+        assert outer_scope.parameters == {'a', 'b', 'args', 'c', 'kwargs'}
+        assert outer_scope.locals == {'a', 'b', 'args', 'c', 'kwargs', 'counter', 'inner'}
+
+    def test_bindings(self, tree, analysis):
+        inner = self._function(tree, 'inner')
+        outer_scope = analysis.scope_of(self._function(tree, 'outer').body[0])
+        counter, a, limit = inner.body[2].value.left.left, inner.body[2].value.left.right, inner.body[2].value.right
+
+        assert analysis.binding_of(counter) == (scopes.FREE, outer_scope)
+        assert analysis.binding_of(a) == (scopes.FREE, outer_scope)
+        assert analysis.binding_of(limit) == (scopes.GLOBAL, analysis.module_scope)
+        assert analysis.binding_of(inner.args.args[0]) == (scopes.LOCAL, analysis.scope_of(inner.body[0]))
+        # the default is evaluated in the enclosing function
+        assert analysis.binding_of(inner.args.defaults[0]) == (scopes.LOCAL, outer_scope)
+        assert analysis.scope_of(inner.body[0]).free == {'counter', 'a'}
+
+    def test_class_scope_is_skipped(self, tree, analysis):
+        method = self._function(tree, 'method')
+        class_scope = analysis.scope_of(self._function(tree, 'A').body[0])
+        sizes = method.body[1].value
+
+        assert class_scope.kind == 'class'
+        assert 'SIZES' in class_scope.locals
+        assert analysis.binding_of(sizes) == (scopes.GLOBAL, analysis.module_scope)
+        assert analysis.binding_of(method.body[1].targets[0]) == (scopes.GLOBAL, analysis.module_scope)
+
+    def test_comprehensions(self, tree, analysis):
+        class_node = self._function(tree, 'A')
+        comprehension = class_node.body[0].value
+        comprehension_scope = analysis.scope_of(comprehension.elt)
+        method_scope = analysis.scope_of(self._function(tree, 'method').body[0])
+
+        assert comprehension_scope.kind == 'comprehension'
+        # the first iterable is evaluated in the class body
+        assert analysis.scope_of(comprehension.generators[0].iter) is analysis.scope_of(comprehension)
+        assert analysis.binding_of(comprehension.elt.left) == (scopes.LOCAL, comprehension_scope)
+        assert analysis.binding_of(comprehension.elt.right) == (scopes.GLOBAL, analysis.module_scope)
+        # assignment expressions bind names in the enclosing function
+        assert 'total' in method_scope.locals
+        total = self._names(tree, 'total')
+        assert [analysis.binding_of(name).kind for name in total] == [scopes.LOCAL, scopes.FREE]
+
+    def test_lambda(self, tree, analysis):
+        lambda_ = self._function(tree, 'A').body[2].value
+
+        assert analysis.scope_of(lambda_.body).kind == 'function'
+        assert analysis.binding_of(lambda_.body.left) == (scopes.LOCAL, analysis.scope_of(lambda_.body))
+
+    def test_agrees_with_symtable(self, tree, analysis):
+        table = symtable.symtable(SOURCE, '<test>', 'exec')
+
+        def check(table, scope):
+            assert scope.free == set(symbol.get_name() for symbol in table.get_symbols() if symbol.is_free())
+            for symbol in table.get_symbols():
+                name = symbol.get_name()
+                if symbol.is_referenced() and name in scope.referenced:
+                    kind = scope.resolve(name).kind
+                    if symbol.is_free():
+                        assert kind == scopes.FREE, name
+                    elif symbol.is_global():
+                        assert kind == scopes.GLOBAL, name
+                    else:
+                        assert kind == scopes.LOCAL, name
+            for child_table, child_scope in zip(table.get_children(), scope.children):
+                check(child_table, child_scope)
+
+        check(table, analysis.module_scope)
+
+    def test_free_names_passed_through_and_declared(self):
+        source = (
+            'def f():\n'
+            '    x = 1\n'
+            '    def g():\n'
+            '        class C:\n'
+            '            x = 2\n'
+            '            def h(self):\n'
+            '                return x\n'
+            '    def k():\n'
+            '        nonlocal x\n'
+            '        x = 3\n'
+        )
+        tree = ParentChildNodeTransformer().visit(ast.parse(source))
+        analysis = ScopeAnalysis(tree)
+        g, k = tree.body[0].body[1:]
+        class_ = g.body[0]
+
+        assert analysis.scope_of(g.body[0]).free == {'x'}
+        assert analysis.scope_of(class_.body[0]).free == set()
+        assert analysis.scope_of(class_.body[1].body[0]).free == {'x'}
+        assert analysis.scope_of(k.body[0]).free == {'x'}
+
+    def test_invalidate_scope(self, tree, analysis):
+        outer = self._function(tree, 'outer')
+        inner = self._function(tree, 'inner')
+        outer_scope = analysis.scope_of(outer.body[0])
+        inner_scope = analysis.scope_of(inner.body[0])
+        class_scope = analysis.scope_of(self._function(tree, 'A').body[0])
+
+        statement = ast.parse('a = 2').body[0]
+        ParentChildNodeTransformer().visit(statement)
+        statement.parent = inner
+        statement.parent_field = 'body'
+        inner.body.insert(0, statement)
+        inner.children = list(ast.iter_child_nodes(inner))
+        analysis.invalidate(statement)
+
+        a = inner.body[3].value.left.right
+        assert analysis.scope_of(inner.body[1]) is inner_scope
+        assert analysis.binding_of(a) == (scopes.LOCAL, inner_scope)
+        assert analysis.scope_of(outer.body[0]) is outer_scope
+        assert analysis.scope_of(self._function(tree, 'A').body[0]) is class_scope
+
+    def test_invalidate_comprehension(self, tree, analysis):
+        method = self._function(tree, 'method')
+        method_scope = analysis.scope_of(method.body[0])
+        comprehension = method.body[2].value.elts[0]
+
+        comprehension.elt = ast.Name(id='x', ctx=ast.Load())
+        ParentChildNodeTransformer().visit(comprehension)
+        analysis.invalidate(comprehension.elt)
+
+        assert 'total' not in method_scope.locals
+        assert analysis.binding_of(method.body[2].value.elts[1]) == (scopes.GLOBAL, analysis.module_scope)
+
+
+class TestScopeAnalysisOfSimpleSource(object):
+
+    def test_function_scope(self):
+        tree = ParentChildNodeTransformer().visit(ast.parse('def f(a, *args, **kwargs):\n    b = a\n    return g(b)\n'))
+        analysis = ScopeAnalysis(tree)
+        function_scope = analysis.scope_of(tree.body[0].body[0])
+
+        assert function_scope.parameters == set(['a', 'args', 'kwargs'])
+        assert function_scope.locals == set(['a', 'args', 'kwargs', 'b'])
+        assert analysis.binding_of(tree.body[0].body[0].value) == (scopes.LOCAL, function_scope)
+        assert analysis.binding_of(tree.body[0].body[1].value.func) == (scopes.GLOBAL, analysis.module_scope)
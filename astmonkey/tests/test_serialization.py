@@ -0,0 +1,116 @@
+import ast
+import marshal
+import pickle
+
+import pytest
+
+import astmonkey
+from astmonkey import serialization, transformers, visitors
+
+
+class TestSerialization(object):
+    SOURCE = '''
+import os
+
+@decorator(1, key=2.5)
+def f(a, *args, b=None, **kwargs):
+    """Docstring."""
+    global counter
+    x = a + -1 if a else b'bytes'
+    return {True: 1, 1.0: 0.0, -0.0: ..., **kwargs}[x]
+'''
+
+    def test_roundtrip(self):
+        node = ast.parse(self.SOURCE)
+
+        loaded = serialization.deserialize(serialization.serialize(node))
+
+        assert ast.dump(loaded, include_attributes=True) == ast.dump(node, include_attributes=True)
+        assert visitors.to_source(loaded) == visitors.to_source(node)
+
+    def test_keeps_constants_of_equal_values_apart(self):
+        node = ast.Tuple(elts=[ast.Constant(value=value) for value in (1, 1.0, True, 0.0, -0.0)], ctx=ast.Load())
+
+        loaded = serialization.deserialize(serialization.serialize(node))
+
+        values = [element.value for element in loaded.elts]
+        assert [type(value) for value in values] == [int, float, bool, float, float]
+        assert repr(values[-1]) == '-0.0'
+
+    def test_annotations(self):
+        loaded = serialization.deserialize(serialization.serialize(ast.parse(self.SOURCE)))
+        expected = transformers.ParentChildNodeTransformer().visit(ast.parse(self.SOURCE))
+
+        for loaded_node, expected_node in zip(ast.walk(loaded), ast.walk(expected)):
+            if isinstance(expected_node, (ast.expr_context, ast.operator, ast.unaryop)):
+                continue
+            assert type(loaded_node.parent) is type(expected_node.parent)
+            assert len(loaded_node.parents) == len(expected_node.parents)
+            assert [type(child) for child in loaded_node.children] == [
+                type(child) for child in expected_node.children]
+            if expected_node.parent is not None:
+                assert loaded_node.parent_field == expected_node.parent_field
+                assert loaded_node.parent_field_index == expected_node.parent_field_index
+
+    def test_shared_nodes_stay_shared(self):
+        loaded = serialization.deserialize(serialization.serialize(ast.parse('x = y\nz = w')))
+
+        contexts = [node.ctx for node in ast.walk(loaded) if isinstance(node, ast.Name)]
+        assert contexts[0] is contexts[2]
+        assert contexts[1] is contexts[3]
+        assert contexts[0] is not contexts[1]
+        assert len(contexts[1].parents) == 2
+
+    def test_without_annotations(self):
+        loaded = serialization.deserialize(serialization.serialize(ast.parse(self.SOURCE)), annotate=False)
+
+        assert not any(hasattr(node, 'parent') for node in ast.walk(loaded))
+
+    def test_ignores_annotations_of_serialized_tree(self):
+        node = transformers.ParentChildNodeTransformer().visit(ast.parse(self.SOURCE))
+
+        data = serialization.serialize(node.body[1])
+
+        assert serialization.deserialize(data).parent is None
+
+    def test_missing_and_unusual_attributes(self):
+        node = ast.Module(body=[ast.Expr(value=ast.Name(id='x', ctx=ast.Load(), lineno=None, col_offset=-1))],
+                          type_ignores=[])
+
+        loaded = serialization.deserialize(serialization.serialize(node))
+
+        name = loaded.body[0].value
+        assert not hasattr(loaded.body[0], 'lineno')
+        assert name.lineno is None
+        assert name.col_offset == -1
+
+    def test_deep_tree(self):
+        node = ast.Name(id='x', ctx=ast.Load())
+        for _ in range(100000):
+            node = ast.UnaryOp(op=ast.Not(), operand=node)
+
+        loaded = serialization.deserialize(serialization.serialize(ast.Expression(body=node)))
+
+        depth = 0
+        node = loaded.body
+        while isinstance(node, ast.UnaryOp):
+            node = node.operand
+            depth += 1
+        assert depth == 100000
+        assert node.parent.parent_field == 'operand'
+
+    def test_smaller_than_pickle(self):
+        node = transformers.ParentChildNodeTransformer().visit(ast.parse(self.SOURCE * 20))
+
+        assert len(serialization.serialize(node)) * 2 < len(pickle.dumps(node, pickle.HIGHEST_PROTOCOL))
+
+    def test_unsupported_version(self):
+        data = serialization.serialize(ast.parse('x'))
+        version, types, constants, streams = marshal.loads(data)
+
+        with pytest.raises(ValueError):
+            serialization.deserialize(marshal.dumps((version + 1, types, constants, streams)))
+
+    def test_package_export(self):
+        assert astmonkey.serialize is serialization.serialize
+        assert astmonkey.deserialize is serialization.deserialize
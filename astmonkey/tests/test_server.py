@@ -0,0 +1,106 @@
+import ast
+import asyncio
+import threading
+
+import pytest
+
+from astmonkey import server, visitors
+
+
+class TestProcess(object):
+    SOURCE = 'x = y + 1'
+
+    @pytest.fixture
+    def trees(self):
+        return server.LRUCache(2)
+
+    def test_source(self, trees):
+        assert server.process({'op': 'source', 'source': self.SOURCE}, trees) == self.SOURCE
+
+    def test_tree(self, trees):
+        request = {'op': 'source', 'source': self.SOURCE}
+
+        server.process(request, trees)
+
+        assert list(trees.items) == [server.request_key(request)]
+
+    def test_graph(self, trees):
+        result = server.process({'op': 'graph', 'source': self.SOURCE}, trees)
+
+        assert result.startswith('graph G {')
+
+    def test_annotations(self, trees):
+        result = server.process({'op': 'annotations', 'source': self.SOURCE}, trees)
+
+        assert result[0] == {
+            'type': 'Module', 'parent': None, 'field': None, 'index': None, 'lineno': None, 'col_offset': None,
+        }
+        assert result[1]['type'] == 'Assign'
+        assert result[1]['parent'] == 0
+        assert result[1]['field'] == 'body'
+        assert result[1]['index'] == 0
+
+    def test_unknown_operation(self, trees):
+        with pytest.raises(ValueError):
+            server.process({'op': 'foo', 'source': self.SOURCE}, trees)
+
+
+class TestLRUCache(object):
+
+    def test_eviction(self):
+        cache = server.LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+
+        cache.put('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+
+
+class TestRenderServer(object):
+
+    @pytest.fixture
+    def socket_path(self, tmpdir):
+        path = str(tmpdir.join('astmonkey.sock'))
+        render_server = server.RenderServer(path, workers=2)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(render_server.start())
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+        yield path
+        asyncio.run_coroutine_threadsafe(render_server.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    def test_source(self, socket_path):
+        assert server.request(socket_path, source='x = y + 1', timeout=30) == 'x = y + 1'
+
+    def test_tree(self, socket_path):
+        node = ast.parse('def f(x):\n    return x')
+
+        result = server.request(socket_path, tree=node, timeout=30)
+
+        assert result == visitors.to_source(ast.parse('def f(x):\n    return x'))
+
+    def test_concurrent_clients(self, socket_path):
+        sources = ['x = {0}'.format(i) for i in range(20)]
+        results = [None] * len(sources)
+
+        def send(index):
+            results[index] = server.request(socket_path, source=sources[index], timeout=30)
+
+        threads = [threading.Thread(target=send, args=(index,)) for index in range(len(sources))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == sources
+
+    def test_error(self, socket_path):
+        with pytest.raises(server.ServerError):
+            server.request(socket_path, source='x = (', timeout=30)
@@ -0,0 +1,141 @@
+import ast
+import mmap
+
+import pytest
+
+from astmonkey import shared, transformers, utils, visitors
+
+if not utils.check_version(from_inclusive=(3, 3)):
+    pytest.skip('trees are read from buffers by memoryview casts', allow_module_level=True)
+
+SOURCE = '''
+import os
+
+
+def f(a, b=None):
+    """Docstring."""
+    global counter
+    return {a: b, **os.environ}
+
+
+class C(object):
+
+    def g(self):
+        return [x for x in range(10) if x % 2]
+'''
+
+
+def _render_statement(name, position):
+    with shared.SharedTree.attach(name) as tree:
+        return tree.to_source(tree.children_of(0)[position])
+
+
+def _pre_order(node):
+    nodes = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(reversed(list(ast.iter_child_nodes(node))))
+    return nodes
+
+
+class TestSharedTree(object):
+
+    @pytest.fixture
+    def tree(self):
+        with shared.SharedTree(shared.encode(ast.parse(SOURCE))) as tree:
+            yield tree
+
+    def test_materialize(self, tree):
+        assert ast.dump(tree.materialize(), include_attributes=True) == ast.dump(ast.parse(SOURCE),
+                                                                                  include_attributes=True)
+
+    def test_materialize_subtree(self, tree):
+        function = ast.parse(SOURCE).body[1]
+        index = tree.children_of(0)[1]
+
+        node = tree.materialize(index, annotate=True)
+
+        assert ast.dump(node, include_attributes=True) == ast.dump(function, include_attributes=True)
+        assert node.parent is None
+        assert node.body[0].parent is node
+
+    def test_navigation(self, tree):
+        expected = _pre_order(transformers.ParentChildNodeTransformer().visit(ast.parse(SOURCE)))
+
+        assert len(tree) == len(expected)
+        for index, node in enumerate(expected):
+            assert tree.type_of(index) is type(node)
+            if index:
+                parent = tree.parent_of(index)
+                assert parent < index and index in tree.children_of(parent)
+                # contexts and operators are shared, so their annotations point to their last occurrence
+                if len(node.parents) == 1:
+                    assert tree.type_of(parent) is type(node.parent)
+                    assert tree.field_of(index) == (node.parent_field, node.parent_field_index)
+        assert tree.parent_of(0) is None
+        assert tree.field_of(0) == (None, None)
+
+    def test_subtree_and_position(self, tree):
+        function = tree.children_of(0)[1]
+
+        # end positions are recorded by Python 3.8+
+        end = (8, 31) if utils.check_version(from_inclusive=(3, 8)) else (None, None)
+        assert tree.position_of(function) == (5, 0) + end
+        assert tree.position_of(0) == (None, None, None, None)
+        assert all(tree.type_of(index) is not ast.ClassDef for index in tree.subtree_of(function))
+        assert tree.subtree_of(0) == range(len(tree))
+
+    def test_to_source_starts_at_first_line(self, tree):
+        method = tree.children_of(tree.children_of(0)[2])[-1]
+
+        assert tree.to_source(method) == 'def g(self):\n    return [x for x in range(10) if x % 2]'
+
+    def test_to_source_of_expression(self, tree):
+        call = [index for index in range(len(tree)) if tree.type_of(index) is ast.Call][0]
+
+        assert tree.to_source(call) == 'range(10)'
+
+    @pytest.mark.skipif(not utils.check_version(from_inclusive=(3, 8)), reason='shared memory needs Python 3.8+')
+    def test_shared_memory_in_workers(self):
+        from concurrent.futures import ProcessPoolExecutor
+
+        tree = shared.SharedTree.share(ast.parse(SOURCE))
+        try:
+            with ProcessPoolExecutor(2) as executor:
+                results = list(executor.map(_render_statement, [tree.name] * 3, range(3)))
+        finally:
+            tree.close()
+            tree.unlink()
+
+        module = ast.parse(SOURCE)
+        assert results == [visitors.to_source(ast.Module(body=[statement], type_ignores=[])).lstrip('\n')
+                           for statement in module.body]
+
+    def test_mmap(self, tmpdir):
+        path = tmpdir.join('tree.bin')
+        path.write_binary(shared.encode(ast.parse(SOURCE)))
+
+        with open(str(path), 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            tree = shared.SharedTree(buffer)
+            node = tree.materialize()
+            tree.close()
+            buffer.close()
+
+        assert ast.dump(node) == ast.dump(ast.parse(SOURCE))
+
+    def test_deep_tree(self):
+        node = ast.Name(id='x', ctx=ast.Load())
+        for _ in range(100000):
+            node = ast.UnaryOp(op=ast.Not(), operand=node)
+
+        with shared.SharedTree(shared.encode(ast.Expression(body=node))) as tree:
+            materialized = tree.materialize(tree.children_of(0)[0])
+
+        assert isinstance(materialized, ast.UnaryOp)
+
+    def test_invalid_buffer(self):
+        with pytest.raises(ValueError):
+            shared.SharedTree(b'\0' * 64)
@@ -0,0 +1,110 @@
+import ast
+
+import pytest
+
+from astmonkey import utils
+from astmonkey.sourcemaps import SourceMap, to_source_with_map
+
+needs_end_positions = pytest.mark.skipif(not utils.check_version(from_inclusive=(3, 8)),
+                                         reason='end positions of nodes need Python 3.8+')
+
+
+class TestSourceMap(object):
+    SOURCE = ("import os\n"
+              "class A(B):\n\n"
+              "    def f(self, x=1, *args):\n"
+              "        if x:\n"
+              "            return [i * 2 for i in args if i]\n"
+              "        else:\n"
+              "            self.y = {'a': (x, 2)}\n"
+              "x = a.b[1:2] + c")
+
+    @pytest.fixture
+    def mapped(self):
+        node = ast.parse(self.SOURCE)
+        source, source_map = to_source_with_map(node)
+        return node, source, source_map
+
+    @needs_end_positions
+    def test_positions_match_reparsed_code(self, mapped):
+        node, source, source_map = mapped
+
+        for original, reparsed in zip(ast.walk(node), ast.walk(ast.parse(source))):
+            if isinstance(reparsed, (ast.stmt, ast.expr)):
+                assert source_map.position_of(original) == (
+                    reparsed.lineno, reparsed.col_offset, reparsed.end_lineno, reparsed.end_col_offset)
+
+    @needs_end_positions
+    def test_positions_of_generated_parentheses_docstrings_and_elifs(self):
+        node = ast.parse(
+            "def f(a):\n"
+            "    '''Doc.\n\n    More.'''\n"
+            "    if a:\n"
+            "        return (a + 1) * -(a or b)\n"
+            "    elif not a:\n"
+            "        return map(lambda x: x, a) + [c and d]\n"
+            "    elif a > b > c:\n"
+            "        pass\n"
+            "    else:\n"
+            "        return (a.b + 1).c")
+        source, source_map = to_source_with_map(node)
+
+        for original, reparsed in zip(ast.walk(node), ast.walk(ast.parse(source))):
+            if isinstance(reparsed, (ast.stmt, ast.expr)):
+                assert source_map.position_of(original) == (
+                    reparsed.lineno, reparsed.col_offset, reparsed.end_lineno, reparsed.end_col_offset)
+
+    def test_decorated_definition_starts_at_decorator(self):
+        node = ast.parse('@decorator\ndef f():\n    pass')
+
+        source, source_map = to_source_with_map(node)
+
+        assert source_map.position_of(node.body[0]) == (1, 0, 3, 8)
+        assert source_map.position_of(node.body[0].decorator_list[0]) == (1, 1, 1, 10)
+
+    def test_columns_count_characters(self):
+        node = ast.parse(u"x = '\u00e9' + y")
+
+        source, source_map = to_source_with_map(node)
+
+        assert source_map.position_of(node.body[0].value.right) == (1, 10, 1, 11)
+
+    def test_node_at(self, mapped):
+        node, _, source_map = mapped
+        binop = node.body[1].body[0].body[0].body[0].value.elt
+
+        assert source_map.node_at(6, 20) is binop.left
+        assert source_map.node_at(6, 22) is binop
+        assert source_map.node_at(6, 100) is node.body[1].body[0].body[0]
+        assert source_map.node_at(100, 0) is None
+
+    def test_node_at_line(self, mapped):
+        node, _, source_map = mapped
+
+        assert source_map.node_at_line(1) is node.body[0]
+        assert source_map.node_at_line(6) is node.body[1].body[0].body[0].body[0]
+        assert source_map.node_at_line(3) is node.body[1]
+
+    def test_same_source_as_to_source(self):
+        from astmonkey import visitors
+
+        assert to_source_with_map(ast.parse(self.SOURCE))[0] == visitors.to_source(ast.parse(self.SOURCE))
+
+    def test_empty(self):
+        source_map = SourceMap()
+
+        assert len(source_map) == 0
+        assert source_map.node_at(1, 0) is None
+        assert source_map.node_at_line(1) is None
+
+    def test_deep_chain(self):
+        node = ast.Name(id='a', ctx=ast.Load())
+        for _ in range(5000):
+            node = ast.Attribute(value=node, attr='b', ctx=ast.Load())
+        module = ast.Module(body=[ast.Expr(value=node, lineno=1, col_offset=0)], type_ignores=[])
+
+        source, source_map = to_source_with_map(module)
+
+        assert source == 'a' + '.b' * 5000
+        assert source_map.position_of(node.value) == (1, 0, 1, 1 + 2 * 4999)
+        assert source_map.node_at(1, 0).id == 'a'
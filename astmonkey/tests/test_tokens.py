@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import ast
+import io
+import tokenize
+
+import pytest
+
+from astmonkey import utils, visitors
+from astmonkey.tests import test_visitors
+from astmonkey.tokens import TokenWriter
+
+# `tokenize` of Python 3.6 has ASYNC and AWAIT tokens, 3.12+ splits f-strings and fills lines of the last NEWLINE tokens
+same_tokenize = pytest.mark.skipif(not utils.check_version(from_inclusive=(3, 7), to_exclusive=(3, 12)),
+                                   reason='tokens are those of tokenize of Python 3.7 to 3.11')
+
+
+class TestTokenWriter(object):
+
+    def _tokens(self, code):
+        return list(tokenize.generate_tokens(io.StringIO(code).readline))
+
+    def _generate(self, source, scan_batch=1):
+        writer = TokenWriter()
+        writer.scan_batch = scan_batch
+        visitors.to_source(ast.parse(source), writer=writer)
+        return writer
+
+    @pytest.mark.parametrize('source', test_visitors.TestSourceGeneratorNodeVisitor.roundtrip_testdata)
+    @same_tokenize
+    def test_same_tokens_as_tokenize(self, source):
+        writer = self._generate(source)
+
+        assert writer.get_tokens() == self._tokens(writer.getvalue())
+
+    @pytest.mark.parametrize('source', [
+        'class A:\n    """doc\n\n    string"""\n\n    def f(self):\n        return (1,\n            2)\n\n\nx = 1',
+        "x = f'a{b!r:>{width}}c' + 'd'",
+        'if x:\n    if y:\n        pass',
+        'x = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27]',
+    ])
+    @same_tokenize
+    def test_same_tokens_as_tokenize_with_lines(self, source):
+        writer = self._generate(source)
+
+        tokens = writer.get_tokens()
+
+        assert tokens == self._tokens(writer.getvalue())
+        assert all(isinstance(token, tokenize.TokenInfo) for token in tokens)
+
+    @same_tokenize
+    def test_tokens_emitted_in_batches(self):
+        source = '\n'.join('x{0} = {0}'.format(i) for i in range(100))
+
+        writer = self._generate(source, scan_batch=16)
+
+        assert 0 < len(writer.tokens) < 400
+        assert writer.get_tokens()[:len(writer.tokens)] == writer.tokens
+        assert writer.get_tokens() == self._tokens(writer.getvalue())
+
+    def test_get_tokens_can_be_repeated(self):
+        writer = self._generate('def f():\n    return 1')
+
+        assert writer.get_tokens() == writer.get_tokens()
+
+    @same_tokenize
+    def test_empty(self):
+        writer = TokenWriter()
+
+        assert writer.get_tokens() == self._tokens('')
+
+    def test_error_token(self):
+        writer = TokenWriter()
+        writer.write('x = $')
+
+        tokens = writer.get_tokens()
+
+        assert [(token.type, token.string) for token in tokens[:3]] == [
+            (tokenize.NAME, 'x'), (tokenize.OP, '='), (tokenize.ERRORTOKEN, '$')]
+
+    @same_tokenize
+    def test_string_split_between_writes(self):
+        writer = TokenWriter()
+        for text in ["x = f'", 'a', '{', 'b', '}', "'", '\n', 'y']:
+            writer.write(text)
+
+        assert writer.get_tokens() == self._tokens("x = f'a{b}'\ny")
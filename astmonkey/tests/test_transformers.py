@@ -6,6 +6,7 @@ except ImportError:
     import unittest
 import ast
 
+import astmonkey
 from astmonkey import transformers
 
 
@@ -46,3 +47,234 @@ class TestParentChildNodeTransformer(object):
         assert second_name_node in ctx_node.parents
         assert ctx_node in first_name_node.children
         assert ctx_node in second_name_node.children
+
+
+class TestPipeline(object):
+
+    class RecordingVisitor(ast.NodeVisitor):
+
+        def __init__(self, name, events):
+            self.name = name
+            self.events = events
+
+        def visit_BinOp(self, node):
+            self.events.append((self.name, 'visit', node.__class__.__name__))
+
+        def leave_BinOp(self, node):
+            self.events.append((self.name, 'leave', node.__class__.__name__))
+
+    class AddToSub(ast.NodeTransformer):
+
+        def visit_BinOp(self, node):
+            if isinstance(node.op, ast.Add):
+                return ast.BinOp(left=node.left, op=ast.Sub(), right=node.right)
+            return node
+
+    class NegateNumbers(ast.NodeTransformer):
+
+        def leave_Constant(self, node):
+            return ast.UnaryOp(op=ast.USub(), operand=node)
+
+    class RemovePass(ast.NodeTransformer):
+
+        def visit_Pass(self, node):
+            return None
+
+    class DuplicateExpr(ast.NodeTransformer):
+
+        def visit_Expr(self, node):
+            return [node, ast.Expr(value=ast.BinOp(left=ast.Name(id='b', ctx=ast.Load()), op=ast.Add(),
+                                                   right=ast.Name(id='c', ctx=ast.Load())))]
+
+    def test_order_of_hooks(self):
+        events = []
+        pipeline = transformers.Pipeline([self.RecordingVisitor('first', events),
+                                          self.RecordingVisitor('second', events)])
+
+        pipeline.visit(ast.parse('x = (a + b) + c'))
+
+        assert events == [
+            ('first', 'visit', 'BinOp'), ('second', 'visit', 'BinOp'),
+            ('first', 'visit', 'BinOp'), ('second', 'visit', 'BinOp'),
+            ('first', 'leave', 'BinOp'), ('second', 'leave', 'BinOp'),
+            ('first', 'leave', 'BinOp'), ('second', 'leave', 'BinOp'),
+        ]
+
+    def test_replacement_visible_to_later_stages(self):
+        events = []
+        recorder = ast.NodeVisitor()
+        recorder.visit_BinOp = lambda node: events.append(node.op.__class__.__name__)
+        node = ast.parse('x = a + 1')
+
+        result = transformers.Pipeline([self.AddToSub(), recorder, self.NegateNumbers()]).visit(node)
+
+        assert events == ['Sub']
+        assert ast.dump(result.body[0].value) == ast.dump(ast.parse('a - (-1)').body[0].value)
+
+    def test_post_order_replacement_visible_to_later_stages(self):
+        events = []
+        recorder = ast.NodeVisitor()
+        recorder.visit_Call = lambda node: events.append(('visit', 'Call'))
+        recorder.visit_Name = lambda node: events.append(('visit', node.id))
+        recorder.leave_Call = lambda node: events.append(('leave', 'Call'))
+
+        class AddToCall(ast.NodeTransformer):
+
+            def leave_BinOp(self, node):
+                return ast.Call(func=ast.Name(id='add', ctx=ast.Load()), args=[node.left, node.right], keywords=[])
+
+        result = transformers.Pipeline([AddToCall(), recorder]).visit(ast.parse('x = a + b'))
+
+        # operands were traversed by all stages before the replacement
+        assert events == [('visit', 'x'), ('visit', 'a'), ('visit', 'b'), ('visit', 'Call'), ('visit', 'add'),
+                          ('leave', 'Call')]
+        assert ast.dump(result.body[0].value) == ast.dump(ast.parse('add(a, b)').body[0].value)
+
+    def test_replaced_node_in_post_order_replacement(self):
+        events = []
+        recorder = ast.NodeVisitor()
+        recorder.visit_Constant = lambda node: events.append(('visit', node.value))
+        recorder.leave_Constant = lambda node: events.append(('leave', node.value))
+        recorder.visit_UnaryOp = lambda node: events.append(('visit', 'UnaryOp'))
+
+        result = transformers.Pipeline([self.NegateNumbers(), recorder]).visit(ast.parse('x = 1'))
+
+        assert events == [('visit', 1), ('visit', 'UnaryOp'), ('leave', 1)]
+        assert ast.dump(result.body[0].value) == ast.dump(ast.parse('-1').body[0].value)
+
+    def test_remove_and_splice(self):
+        node = ast.parse('if x:\n    pass\n    a\n')
+
+        pipeline = transformers.Pipeline([self.RemovePass(), self.DuplicateExpr(), self.AddToSub()])
+        result = pipeline.visit(node)
+
+        assert ast.dump(result) == ast.dump(ast.parse('if x:\n    a\n    b - c\n'))
+
+    def test_dispatch_only_hooked_types(self):
+        pipeline = transformers.Pipeline([self.AddToSub(), self.RemovePass()])
+
+        pipeline.visit(ast.parse('x = a + 1\npass'))
+
+        hooked = [node_class for node_class, (pre, post) in pipeline._hooks.items() if pre or post]
+        assert sorted(node_class.__name__ for node_class in hooked) == ['BinOp', 'Pass']
+
+    def test_annotate(self):
+        node = ast.parse('def f(a):\n    return a + 1\nx = f(2)')
+        expected = transformers.ParentChildNodeTransformer().visit(ast.parse('def f(a):\n    return a - 1\nx = f(2)'))
+
+        result = transformers.Pipeline([self.AddToSub()], annotate=True).visit(node)
+
+        for node, expected_node in zip(ast.walk(result), ast.walk(expected)):
+            assert node.__class__ == expected_node.__class__
+            assert len(node.children) == len(expected_node.children)
+            if expected_node.parent is None:
+                assert node.parent is None
+            else:
+                assert node.parent.__class__ == expected_node.parent.__class__
+                assert node.parent_field == expected_node.parent_field
+                assert node.parent_field_index == expected_node.parent_field_index
+
+    def test_deep_tree(self):
+        depth = 10000
+        node = ast.Name(id='a0', ctx=ast.Load())
+        for index in range(1, depth):
+            node = ast.BinOp(left=node, op=ast.Add(), right=ast.Name(id='a{0}'.format(index), ctx=ast.Load()))
+
+        result = transformers.Pipeline([self.AddToSub()], annotate=True).visit(ast.Expression(body=node))
+
+        node = result.body
+        for index in reversed(range(1, depth)):
+            assert isinstance(node.op, ast.Sub)
+            assert node.right.id == 'a{0}'.format(index)
+            assert node.left.parent is node
+            node = node.left
+        assert node.id == 'a0'
+
+    def test_children_traversed_once(self):
+        names = []
+        recorder = ast.NodeVisitor()
+        recorder.visit_Name = lambda node: names.append(node.id)
+
+        transformers.Pipeline([self.AddToSub(), recorder]).visit(ast.parse('x = f(a + b, [c, (d, e)])'))
+
+        assert names == ['x', 'f', 'a', 'b', 'c', 'd', 'e']
+
+    def test_visitor_results_ignored(self):
+        class ReturnNone(ast.NodeVisitor):
+
+            def visit_BinOp(self, node):
+                return None
+
+        result = transformers.Pipeline([ReturnNone()]).visit(ast.parse('x = a + b'))
+
+        assert isinstance(result.body[0].value, ast.BinOp)
+
+    def test_stage_calling_generic_visit(self):
+        class VisitChildren(ast.NodeTransformer):
+
+            def visit_BinOp(self, node):
+                self.generic_visit(node)
+                return node
+
+        with pytest.raises(ValueError):
+            transformers.Pipeline([self.AddToSub(), VisitChildren()])
+
+    def test_stage_calling_generic_visit_in_post_order_hook(self):
+        class VisitChildren(ast.NodeVisitor):
+
+            def leave_Call(self, node):
+                super(VisitChildren, self).generic_visit(node)
+
+        with pytest.raises(ValueError):
+            transformers.Pipeline([VisitChildren()])
+
+
+class TestAnnotations(object):
+    SOURCE = 'def f(a):\n    return a + 1\n\n\nx = f(2)\ny = [x, x]'
+
+    @pytest.fixture
+    def tree(self):
+        return ast.parse(self.SOURCE)
+
+    def test_same_links_as_transformer(self, tree):
+        annotations = astmonkey.Annotations(tree)
+        expected = transformers.ParentChildNodeTransformer().visit(ast.parse(self.SOURCE))
+
+        for node, expected_node in zip(ast.walk(tree), ast.walk(expected)):
+            if isinstance(node, (ast.expr_context, ast.operator)):
+                continue
+            parent = annotations.parent_of(node)
+            assert (parent.__class__ if parent else None) == (
+                expected_node.parent.__class__ if expected_node.parent else None)
+            assert annotations.field_of(node) == (getattr(expected_node, 'parent_field', None),
+                                                  getattr(expected_node, 'parent_field_index', None))
+            assert [child.__class__ for child in annotations.children_of(node)] == [
+                child.__class__ for child in expected_node.children]
+
+    def test_tree_not_modified(self, tree):
+        annotations = astmonkey.Annotations(tree)
+
+        annotations.parent_of(tree.body[-1].value.elts[1])
+
+        nodes = [node for node in ast.walk(tree) if not isinstance(node, (ast.expr_context, ast.operator))]
+        assert not any(hasattr(node, 'parent') or hasattr(node, 'children') for node in nodes)
+
+    def test_children_of_computes_only_queried_node(self, tree):
+        annotations = astmonkey.Annotations(tree)
+        assign = tree.body[1]
+
+        children = annotations.children_of(assign)
+
+        assert children == [assign.targets[0], assign.value]
+        assert annotations.parent_of(assign.value) is assign
+        assert tree.body[2] not in annotations._parents
+
+    def test_walk_stops_at_queried_node(self, tree):
+        annotations = astmonkey.Annotations(tree)
+
+        assert annotations.parent_of(tree.body[0].body[0]) is tree.body[0]
+        assert tree.body[2].value not in annotations._parents
+
+    def test_node_from_other_tree(self, tree):
+        with pytest.raises(ValueError):
+            astmonkey.Annotations(tree).parent_of(ast.Name(id='x', ctx=ast.Load()))
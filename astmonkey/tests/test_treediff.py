@@ -0,0 +1,116 @@
+import ast
+
+import astmonkey
+from astmonkey import treediff
+
+
+def edits(source_a, source_b):
+    return [(edit.kind, edit.old_path, edit.new_path) for edit in treediff.diff(ast.parse(source_a), ast.parse(source_b))]
+
+
+class TestDiff(object):
+
+    def test_same_trees(self):
+        assert edits('x = 1\ny = x + 2', 'x = 1\n\n\ny = (x +\n     2)') == []
+
+    def test_replace_leaf(self):
+        tree_a = ast.parse('x = 1\ny = x + 2')
+        tree_b = ast.parse('x = 1\ny = x + 3')
+
+        result = treediff.diff(tree_a, tree_b)
+
+        assert result == [treediff.Edit('replace', (('body', 1), ('value', None), ('right', None)),
+                                        (('body', 1), ('value', None), ('right', None)), tree_a.body[1].value.right,
+                                        tree_b.body[1].value.right)]
+
+    def test_replace_node_of_other_type(self):
+        assert edits('y = x + 2', 'y = x < 2') == [('replace', (('body', 0), ('value', None)),
+                                                   (('body', 0), ('value', None)))]
+
+    def test_replace_own_fields(self):
+        assert edits('def f(): pass', 'def g(): pass') == [('replace', (('body', 0),), (('body', 0),))]
+
+    def test_constants_of_other_types_differ(self):
+        assert edits('x = 1', 'x = True') == [('replace', (('body', 0), ('value', None)),
+                                               (('body', 0), ('value', None)))]
+
+    def test_constants_with_equal_hashes_differ(self):
+        tree_a = ast.parse('x = 1')
+        tree_b = ast.parse('x = 1')
+        # hash(-1) == hash(-2) in CPython
+        tree_a.body[0].value.value = -1
+        tree_b.body[0].value.value = -2
+
+        assert [edit.kind for edit in treediff.diff(tree_a, tree_b)] == ['replace']
+
+    def test_signed_zeros_differ(self):
+        tree_a = ast.parse('x = 0.0')
+        tree_b = ast.parse('x = 0.0')
+        tree_b.body[0].value.value = -0.0
+
+        assert [edit.kind for edit in treediff.diff(tree_a, tree_b)] == ['replace']
+
+    def test_list_items_with_equal_hashes_differ(self):
+        tree_a = ast.parse('a = 1\nb = 2')
+        tree_b = ast.parse('a = 1\nb = 2')
+        tree_a.body[1].value.value = -1
+        tree_b.body[1].value.value = -2
+
+        assert [edit.kind for edit in treediff.diff(tree_a, tree_b)] == ['replace']
+
+    def test_insert_and_delete_list_items(self):
+        assert edits('a = 1\nb = 2\nc = 3', 'a = 1\nc = 3\nf()') == [
+            ('delete', (('body', 1),), None),
+            ('insert', None, (('body', 2),)),
+        ]
+
+    def test_insert_optional_field(self):
+        assert edits('def f():\n    return', 'def f():\n    return 1') == [
+            ('insert', None, (('body', 0), ('body', 0), ('value', None))),
+        ]
+
+    def test_paths_follow_shifted_items(self):
+        assert edits('a = 1\nb = 2', 'c = 0\na = 1\nb = 3') == [
+            ('insert', None, (('body', 0),)),
+            ('replace', (('body', 1), ('value', None)), (('body', 2), ('value', None))),
+        ]
+
+    def test_compare_most_similar_items(self):
+        assert edits('x = 1\ny = 2', 'y = 3\nx = 4') == [
+            ('replace', (('body', 1), ('value', None)), (('body', 0), ('value', None))),
+            ('replace', (('body', 0), ('value', None)), (('body', 1), ('value', None))),
+        ]
+
+    def test_move(self):
+        tree_a = ast.parse('a = 1\nb = 2\ndef f():\n    c = 3')
+        tree_b = ast.parse('b = 2\ndef f():\n    c = 3\n    a = 1')
+
+        result = treediff.diff(tree_a, tree_b)
+
+        assert result == [treediff.Edit('move', (('body', 0),), (('body', 1), ('body', 1)), tree_a.body[0],
+                                        tree_b.body[1].body[1])]
+
+    def test_no_move_of_subtrees_with_equal_hashes(self):
+        tree_a = ast.parse('f(1)\ng(2)')
+        tree_b = ast.parse('g(2)\nf(1)')
+        tree_a.body[0].value.args[0].value = -1
+        tree_b.body[1].value.args[0].value = -2
+
+        assert 'move' not in [edit.kind for edit in treediff.diff(tree_a, tree_b)]
+
+    def test_deep_trees(self):
+        depth = 10000
+        trees = []
+        for last in ['x', 'y']:
+            node = ast.Name(id=last, ctx=ast.Load())
+            for _ in range(depth):
+                node = ast.UnaryOp(op=ast.Not(), operand=node)
+            trees.append(ast.Expression(body=node))
+
+        result = treediff.diff(*trees)
+
+        assert [edit.kind for edit in result] == ['replace']
+        assert len(result[0].old_path) == depth + 1
+
+    def test_package_export(self):
+        assert astmonkey.diff is treediff.diff
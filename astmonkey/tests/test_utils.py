@@ -1,7 +1,7 @@
 import ast
 import unittest
 
-from astmonkey import utils, transformers
+from astmonkey import clone, utils, transformers, visitors
 
 
 class TestIsDocstring(unittest.TestCase):
@@ -24,3 +24,176 @@ class TestIsDocstring(unittest.TestCase):
         node = transformers.ParentChildNodeTransformer().visit(ast.parse('class X:\n\t"""doc"""'))
 
         assert utils.is_docstring(node.body[0].body[0].value)
+
+
+class TestClone(unittest.TestCase):
+    SOURCE = 'x = 1\nx = 2\n\ndef foo(a, *args):\n    """doc"""\n    return {a: [b for b in args if b]}'
+
+    def _annotations(self, node, nodes):
+        return (
+            nodes.index(node.parent) if node.parent else None,
+            [nodes.index(parent) for parent in node.parents],
+            getattr(node, 'parent_field', None),
+            getattr(node, 'parent_field_index', None),
+            [nodes.index(child) for child in node.children],
+        )
+
+    def test_copy_is_equal(self):
+        node = ast.parse(self.SOURCE)
+
+        node_copy = clone(node)
+
+        assert ast.dump(node_copy, include_attributes=True) == ast.dump(node, include_attributes=True)
+
+    def test_copy_is_independent(self):
+        node = ast.parse(self.SOURCE)
+
+        node_copy = clone(node)
+
+        assert node_copy is not node
+        assert node_copy.body[0] is not node.body[0]
+        assert node_copy.body[0].targets[0] is not node.body[0].targets[0]
+
+    def test_shared_nodes_stay_shared(self):
+        node = ast.parse(self.SOURCE)
+
+        node_copy = clone(node)
+
+        assert node_copy.body[0].targets[0].ctx is node_copy.body[1].targets[0].ctx
+        assert node_copy.body[0].targets[0].ctx is not node.body[0].targets[0].ctx
+
+    def test_annotations_are_identical(self):
+        node = ast.parse(self.SOURCE)
+        node_copy = clone(node)
+        expected = transformers.ParentChildNodeTransformer().visit(clone(node, annotate=False))
+
+        nodes = list(ast.walk(node_copy))
+        expected_nodes = list(ast.walk(expected))
+        for copied, original in zip(nodes, expected_nodes):
+            assert self._annotations(copied, nodes) == self._annotations(original, expected_nodes)
+
+    def test_annotated_tree(self):
+        node = transformers.ParentChildNodeTransformer().visit(ast.parse(self.SOURCE))
+
+        node_copy = clone(node)
+
+        assert node_copy.body[0].parent is node_copy
+        assert node_copy.children == node_copy.body
+        assert node_copy.body[2].body[1].parent_field == 'body'
+        assert node_copy.body[2].body[1].parent_field_index == 1
+
+    def test_without_annotations(self):
+        node = transformers.ParentChildNodeTransformer().visit(ast.parse(self.SOURCE))
+
+        node_copy = clone(node, annotate=False)
+
+        assert not hasattr(node_copy, 'parent')
+        assert not hasattr(node_copy.body[0], 'children')
+
+    def test_deep_tree(self):
+        node = ast.Name(id='a', ctx=ast.Load())
+        for _ in range(5000):
+            node = ast.BinOp(left=node, op=ast.Add(), right=ast.Name(id='a', ctx=ast.Load()))
+        node = ast.Module(body=[ast.Expr(value=node)], type_ignores=[])
+
+        node_copy = clone(node)
+
+        assert node_copy.body[0].value.left.parent is node_copy.body[0].value
+        assert node_copy.body[0].value.left is not node.body[0].value.left
+
+
+class TestFixLocations(unittest.TestCase):
+    SOURCE = 'def foo(a):\n    x = a\n    if x:\n        x += 1\n    return [x, a]\n\ntry:\n    foo(1)\nfinally:\n    pass\n'
+
+    def _tree(self):
+        return transformers.ParentChildNodeTransformer().visit(ast.parse(self.SOURCE))
+
+    def _statement(self, source):
+        statement = ast.parse(source).body[0]
+        for node in ast.walk(statement):
+            for name in node._attributes:
+                delattr(node, name)
+        return statement
+
+    def _insert(self, parent, field, index, node):
+        getattr(parent, field).insert(index, node)
+        transformers.ParentChildNodeTransformer().visit(parent)
+        return utils.fix_locations(node)
+
+    def _render(self, tree):
+        generator = visitors.SourceGeneratorNodeVisitor(' ' * 4)
+        generator.visit(tree)
+        return generator.writer.getvalue()
+
+    def test_statement_between_statements(self):
+        tree = self._tree()
+        function = tree.body[0]
+
+        node = self._insert(function, 'body', 1, self._statement('y = a * 2'))
+
+        assert (node.lineno, node.col_offset) == (3, 4)
+        assert node.value.left.lineno == 3
+        assert function.body[2].lineno == 3
+        assert ast.dump(ast.parse(self._render(tree))) == ast.dump(
+            ast.parse(self.SOURCE.replace('    x = a\n', '    x = a\n    y = a * 2\n')))
+
+    def test_compound_statement_before_statements(self):
+        tree = self._tree()
+
+        self._insert(tree.body[0], 'body', 0, self._statement('for i in a:\n    print(i)'))
+
+        assert ast.dump(ast.parse(self._render(tree))) == ast.dump(
+            ast.parse(self.SOURCE.replace('(a):\n', '(a):\n    for i in a:\n        print(i)\n')))
+
+    def test_statement_in_new_block(self):
+        tree = self._tree()
+        statement = tree.body[0].body[1]
+
+        node = self._insert(statement, 'orelse', 0, self._statement('x = 0'))
+
+        assert node.lineno == 5
+        assert ast.dump(ast.parse(self._render(tree))) == ast.dump(
+            ast.parse(self.SOURCE.replace('x += 1\n', 'x += 1\n    else:\n        x = 0\n')))
+
+    def test_statement_before_clause(self):
+        source = 'if a:\n    x = 1\nelif b:\n    x = 2\nelse:\n    x = 3\n'
+        tree = transformers.ParentChildNodeTransformer().visit(ast.parse(source))
+
+        self._insert(tree.body[0], 'body', 1, self._statement('y = 1'))
+        self._insert(tree.body[0].orelse[0], 'body', 1, self._statement('y = 2'))
+
+        assert ast.dump(ast.parse(self._render(tree))) == ast.dump(
+            ast.parse(source.replace('x = 1\n', 'x = 1\n    y = 1\n').replace('x = 2\n', 'x = 2\n    y = 2\n')))
+
+    def test_except_handler(self):
+        tree = self._tree()
+
+        self._insert(tree.body[1], 'handlers', 0, self._statement(
+            'try:\n    pass\nexcept ValueError:\n    pass').handlers[0])
+
+        assert ast.dump(ast.parse(self._render(tree))) == ast.dump(
+            ast.parse(self.SOURCE.replace('finally', 'except ValueError:\n    pass\nfinally')))
+
+    def test_expression(self):
+        tree = self._tree()
+        elements = tree.body[0].body[2].value.elts
+
+        node = self._insert(tree.body[0].body[2].value, 'elts', 1, ast.BinOp(
+            left=ast.Name(id='x', ctx=ast.Load()), op=ast.Add(), right=ast.Constant(value=1)))
+
+        assert (node.lineno, node.col_offset) == (5, 13)
+        assert (node.right.lineno, node.right.col_offset) == (5, 13)
+        assert elements[2].col_offset == 15
+        compile(tree, '<test>', 'exec')
+
+    def test_located_node_is_kept(self):
+        tree = self._tree()
+        old_node = tree.body[0].body[0].value
+        new_node = ast.copy_location(ast.UnaryOp(op=ast.USub(), operand=ast.Name(id='a', ctx=ast.Load())), old_node)
+        tree.body[0].body[0].value = new_node
+        transformers.ParentChildNodeTransformer().visit(tree.body[0].body[0])
+
+        utils.fix_locations(new_node)
+
+        assert (new_node.lineno, new_node.col_offset, new_node.operand.lineno) == (2, 8, 2)
+        assert 'x = -a' in self._render(tree)
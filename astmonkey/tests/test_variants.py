@@ -0,0 +1,90 @@
+import ast
+
+import pytest
+
+from astmonkey import transformers, variants, visitors
+
+
+class TestTreeVariant(object):
+    SOURCE = 'def f(a):\n    return a + 1\nx = f(2) * 3'
+
+    @pytest.fixture
+    def tree(self):
+        return transformers.ParentChildNodeTransformer().visit(ast.parse(self.SOURCE))
+
+    @pytest.fixture
+    def variant(self, tree):
+        return variants.TreeVariant(tree)
+
+    def test_original_variant(self, variant):
+        assert variant.to_source() == self.SOURCE
+
+    def test_fixed_line_numbers(self):
+        source = 'if a: b = 1\nc = 2\nwhile x: pass\nd = 3\n'
+        tree = transformers.ParentChildNodeTransformer().visit(ast.parse(source))
+        linenos = [node.lineno for node in ast.walk(tree) if hasattr(node, 'lineno')]
+
+        generated = variants.TreeVariant(tree).to_source()
+
+        assert generated == visitors.to_source(ast.parse(source))
+        assert [node.lineno for node in ast.walk(tree) if hasattr(node, 'lineno')] == linenos
+
+    def test_set_field(self, tree, variant):
+        binop_node = tree.body[0].body[0].value
+
+        mutant = variant.set_field(binop_node, 'op', ast.Sub())
+
+        assert mutant.to_source() == 'def f(a):\n    return a - 1\nx = f(2) * 3'
+        assert variant.to_source() == self.SOURCE
+        assert visitors.to_source(tree) == self.SOURCE
+
+    def test_untouched_subtrees_are_shared(self, tree, variant):
+        binop_node = tree.body[0].body[0].value
+
+        mutant = variant.set_field(binop_node, 'op', ast.Sub())
+
+        assert mutant.root is not tree
+        assert mutant.root.body[0] is not tree.body[0]
+        assert mutant.root.body[1] is tree.body[1]
+        assert mutant.root.body[0].body[0].value.left is binop_node.left
+
+    def test_overlay_annotations(self, tree, variant):
+        binop_node = tree.body[0].body[0].value
+
+        mutant = variant.set_field(binop_node, 'op', ast.Sub())
+
+        new_binop_node = mutant.root.body[0].body[0].value
+        assert mutant.parent_of(binop_node.left) is new_binop_node
+        assert mutant.parent_of(mutant.root.body[1]) is mutant.root
+        assert mutant.field_of(mutant.root.body[1]) == ('body', 1)
+        assert mutant.parent_of(mutant.root) is None
+        assert mutant.children_of(mutant.root) == mutant.root.body
+        assert binop_node.left.parent is binop_node
+
+    def test_replace(self, tree, variant):
+        new_node = ast.Name(id='y', ctx=ast.Load())
+
+        mutant = variant.replace(tree.body[1].value.left, new_node)
+
+        assert mutant.to_source() == 'def f(a):\n    return a + 1\nx = y * 3'
+        assert mutant.parent_of(new_node) is mutant.root.body[1].value
+        assert mutant.field_of(new_node) == ('left', None)
+
+    def test_remove(self, tree, variant):
+        mutant = variant.remove(tree.body[0])
+
+        assert mutant.to_source() == '\n\nx = f(2) * 3'
+        assert mutant.field_of(mutant.root.body[0]) == ('body', 0)
+
+    def test_remove_non_list_element(self, tree, variant):
+        with pytest.raises(ValueError):
+            variant.remove(tree.body[1].value)
+
+    def test_variant_of_variant(self, tree, variant):
+        first = variant.set_field(tree.body[0].body[0].value, 'op', ast.Sub())
+
+        second = first.replace(tree.body[1].value.right, ast.Num(n=4))
+
+        assert second.to_source() == 'def f(a):\n    return a - 1\nx = f(2) * 4'
+        assert first.to_source() == 'def f(a):\n    return a - 1\nx = f(2) * 3'
+        assert second.root.body[0] is first.root.body[0]
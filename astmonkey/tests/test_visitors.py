@@ -58,6 +58,68 @@ class TestGraphNodeVisitor(object):
         assert dot_node.get_label() == "ast.Name(id='x', ctx=ast.Store())"
 
 
+class TestGraphNodeVisitorNeighborhood(object):
+    SOURCE = 'def f(a):\n    x = a + 1\n    y = x * 2\n    z = y - 3\n    return z'
+
+    @staticmethod
+    def names(graph):
+        return set(dot_node.get_name().strip('"') for dot_node in graph.get_nodes())
+
+    def test_draws_only_nodes_within_radius(self):
+        node = transformers.ParentChildNodeTransformer().visit(ast.parse(self.SOURCE))
+        binop = node.body[0].body[1].value
+        visitor = visitors.GraphNodeVisitor(focus=binop, radius=1)
+
+        visitor.visit(node)
+
+        drawn = [dot_node for dot_node in visitor.graph.get_nodes() if dot_node.get('style') != 'dashed']
+        # operators are singletons shared by all trees, so they are drawn only if annotated once
+        assert set(dot_node.get_name().strip('"') for dot_node in drawn) - {str(binop.op)} == set(
+            str(child) for child in [binop, binop.parent, binop.left, binop.right])
+        assert visitor.graph.get_edge(str(binop.parent), str(binop))
+        assert visitor.graph.get_edge(str(binop), str(binop.right))
+
+    def test_stubs_at_cut_edges(self):
+        node = transformers.ParentChildNodeTransformer().visit(ast.parse(self.SOURCE))
+        assign = node.body[0].body[1]
+        visitor = visitors.GraphNodeVisitor(focus=assign, radius=1)
+
+        visitor.visit(node)
+
+        module_stub = visitor.graph.get_node(str(node))[0]
+        assert module_stub.get_label() == 'ast.Module(...)'
+        assert module_stub.get('style') == 'dashed'
+        assert visitor.graph.get_edge(str(node), str(node.body[0]))[0].get_label() == 'body[0]'
+        left_stub = visitor.graph.get_node(str(assign.value.left))[0]
+        assert left_stub.get_label() == 'ast.Name(...)'
+        assert str(assign.value.left.ctx) not in self.names(visitor.graph)
+
+    def test_cut_children_of_one_field_share_stub(self):
+        node = transformers.ParentChildNodeTransformer().visit(ast.parse(self.SOURCE))
+        function = node.body[0]
+        visitor = visitors.GraphNodeVisitor(focus=function.args, radius=1)
+
+        visitor.visit(node)
+
+        stub_name = '{0}.body'.format(function)
+        stub = [dot_node for dot_node in visitor.graph.get_nodes() if dot_node.get_name().strip('"') == stub_name][0]
+        assert stub.get_label() == '4 nodes'
+        edges = [edge for edge in visitor.graph.get_edges() if edge.get_destination().strip('"') == stub_name]
+        assert [edge.get_label() for edge in edges] == ['body']
+
+    def test_graph_size_does_not_depend_on_module_size(self):
+        sizes = []
+        for statements in [10, 1000]:
+            source = 'def f():\n    return x + 1\n' + 'y = 2\n' * statements
+            node = transformers.ParentChildNodeTransformer().visit(ast.parse(source))
+            visitor = visitors.GraphNodeVisitor(focus=node.body[0].body[0].value, radius=2)
+
+            visitor.visit(node)
+
+            sizes.append((len(visitor.graph.get_nodes()), len(visitor.graph.get_edges())))
+        assert sizes[0] == sizes[1]
+
+
 class TestSourceGeneratorNodeVisitor(object):
     EOL = '\n'
     SIMPLE_ASSIGN = 'x = 1'
@@ -406,3 +468,198 @@ class TestSourceGeneratorNodeVisitor(object):
         node.body[1].lineno = 1
         visitors.to_source(node)
         assert node.body[1].lineno == 2
+
+
+class TestParallelRendering(object):
+    SOURCE = (
+        '"""Module docstring."""\n'
+        'import os\n\n'
+        '@decorator\n'
+        'def f(x,\n'
+        '      y):\n'
+        '    return x + y\n\n\n'
+        'class A(object):\n'
+        '    """Class\n    docstring."""\n'
+        '    x = [1,\n'
+        '         2]\n'
+    ) + ''.join('x{0} = f({0}, 2)\n'.format(i) for i in range(50))
+
+    @pytest.mark.parametrize('workers', [2, 3])
+    def test_same_as_serial(self, workers):
+        expected = visitors.to_source(ast.parse(self.SOURCE))
+
+        generated = visitors.to_source(ast.parse(self.SOURCE), workers=workers)
+
+        assert generated == expected
+
+    def test_without_fork(self, monkeypatch):
+        monkeypatch.setattr(visitors.multiprocessing, 'get_all_start_methods', lambda: ['spawn'])
+        expected = visitors.to_source(ast.parse(self.SOURCE))
+
+        generated = visitors.to_source(ast.parse(self.SOURCE), workers=2)
+
+        assert generated == expected
+
+    def test_serial_without_parallel_rendering(self, monkeypatch):
+        monkeypatch.setattr(visitors, '_PARALLEL_RENDERING', False)
+        monkeypatch.setattr(visitors, '_render_module_in_parallel', None)
+        expected = visitors.to_source(ast.parse(self.SOURCE))
+
+        generated = visitors.to_source(ast.parse(self.SOURCE), workers=2)
+
+        assert generated == expected
+
+    def test_statements_rendered_too_late(self):
+        node = transformers.ParentChildNodeTransformer().visit(ast.parse("'a\\nb'\ny = 1"))
+        generator = visitors.SourceGeneratorNodeVisitor(' ' * 4)
+        generator.body(node.body[:1], indent=0)
+        text = visitors.render_statements(node.body[1:], start_lines=1)
+
+        assert not visitors.write_rendered_statements(generator, node.body[1:], text)
+        assert ''.join(generator.result) == "'''a\nb'''"
+
+    def test_render_statements(self):
+        node = transformers.ParentChildNodeTransformer().visit(ast.parse('x = 1\n\ny = 2'))
+        generator = visitors.SourceGeneratorNodeVisitor(' ' * 4)
+        generator.body(node.body[:1], indent=0)
+        text = visitors.render_statements(node.body[1:], start_lines=2)
+
+        assert visitors.write_rendered_statements(generator, node.body[1:], text)
+        assert ''.join(generator.result) == 'x = 1\n\ny = 2'
+
+
+class TestBulkConstants(object):
+
+    @pytest.fixture
+    def generator_class(self):
+        if not hasattr(visitors.SourceGeneratorNodeVisitor, 'bulk_constants'):
+            pytest.skip('bulk constants are rendered only by Python 3.8+ generator')
+        return visitors.SourceGeneratorNodeVisitor
+
+    def _render(self, source, bulk, monkeypatch):
+        monkeypatch.setattr(visitors.SourceGeneratorNodeVisitor, 'bulk_constants', bulk)
+        return visitors.to_source(ast.parse(source))
+
+    @pytest.mark.parametrize('source', [
+        'x = [1, 2.5, -3, +4, ~5, -1.5, 1j, "a", b"b", None, True, ...]',
+        'x = (1,)',
+        'x = ()',
+        'x = {1, "a"}',
+        'x = {"a": 1, 2: -3.0}',
+        'x = [\n    1,\n    2,\n\n    3]',
+        'def f():\n    if x:\n        return {\n            "a": 1,\n            "b":\n                2}',
+        'x = [not 1, -y, f(1), [1, 2], -(1)]',
+        'x = {**y, "a": 1}',
+        'x = {1: -2, 3:\n    -4,\n\n    5:\n    6, "a\\nb": 7}',
+        'x = [-\n    1, 2]',
+        'x = {}',
+    ])
+    def test_same_as_visiting_elements(self, generator_class, monkeypatch, source):
+        expected = self._render(source, False, monkeypatch)
+
+        generated = self._render(source, True, monkeypatch)
+
+        assert generated == expected
+
+    def test_elements_not_visited(self, generator_class, monkeypatch):
+        visited = []
+        monkeypatch.setattr(generator_class, 'visit_Constant', lambda generator, node: visited.append(node))
+
+        generated = visitors.to_source(ast.parse('x = [1, "a", -2]'))
+
+        assert generated == "x = [1, 'a', -2]"
+        assert visited == []
+
+    def test_nodes_without_location(self, generator_class):
+        node = ast.parse('x = 1')
+        node.body[0].value = ast.List(elts=[ast.Constant(value=1), ast.Constant(value='a')], ctx=ast.Load())
+
+        assert visitors.to_source(node) == "x = [1, 'a']"
+
+
+class TestDeepChains(object):
+    DEPTH = 10000
+
+    def _name(self, index):
+        return ast.Name(id='a{0}'.format(index), ctx=ast.Load())
+
+    def _to_source(self, expression):
+        return visitors.to_source(ast.Module(body=[ast.Expr(value=expression, lineno=1, col_offset=0)],
+                                             type_ignores=[]))
+
+    def _build(self, make_link):
+        node = self._name(0)
+        for index in range(1, self.DEPTH):
+            node = make_link(node, index)
+        return node
+
+    def test_binop_chain(self):
+        node = self._build(lambda left, index: ast.BinOp(left=left, op=ast.Add(), right=self._name(index)))
+
+        generated = self._to_source(node)
+
+        assert generated == '(' * (self.DEPTH - 2) + 'a0 + a1' + ''.join(
+            ') + a{0}'.format(index) for index in range(2, self.DEPTH))
+
+    def test_boolop_chain(self):
+        node = self._build(lambda left, index: ast.BoolOp(op=ast.And(), values=[left, self._name(index)]))
+
+        generated = self._to_source(node)
+
+        assert generated == '(' * (self.DEPTH - 1) + 'a0' + ''.join(
+            ' and a{0})'.format(index) for index in range(1, self.DEPTH))
+
+    def test_method_call_chain(self):
+        node = self._build(lambda value, index: ast.Call(
+            func=ast.Attribute(value=value, attr='m', ctx=ast.Load()), args=[], keywords=[]))
+
+        assert self._to_source(node) == 'a0' + '.m()' * (self.DEPTH - 1)
+
+    def test_nested_calls(self):
+        node = self._build(lambda arg, index: ast.Call(func=self._name(index), args=[ast.Constant(value=1), arg],
+                                                        keywords=[]))
+
+        generated = self._to_source(node)
+
+        assert generated == ''.join('a{0}(1, '.format(index) for index in reversed(range(1, self.DEPTH))) + 'a0' + (
+                ')' * (self.DEPTH - 1))
+
+    def test_nested_calls_with_keywords(self):
+        keyword = ast.keyword(arg='k', value=ast.Constant(value=1))
+        node = self._build(lambda arg, index: ast.Call(func=self._name(index), args=[arg], keywords=[keyword]))
+
+        generated = self._to_source(node)
+
+        assert generated == ''.join('a{0}('.format(index) for index in reversed(range(1, self.DEPTH))) + 'a0' + (
+                ', k=1)' * (self.DEPTH - 1))
+
+    def test_calls_nested_in_keywords_and_starred_arguments(self):
+        def make_link(arg, index):
+            if index % 2:
+                return ast.Call(func=self._name(index), args=[], keywords=[ast.keyword(arg='k', value=arg)])
+            return ast.Call(func=self._name(index), args=[ast.Starred(value=arg, ctx=ast.Load())], keywords=[])
+
+        generated = self._to_source(self._build(make_link))
+
+        assert generated == ''.join(('a{0}(*' if index % 2 == 0 else 'a{0}(k=').format(index)
+                                    for index in reversed(range(1, self.DEPTH))) + 'a0' + ')' * (self.DEPTH - 1)
+
+    def test_subscript_chain(self):
+        node = self._build(lambda value, index: ast.Subscript(value=value, slice=self._name(index), ctx=ast.Load()))
+
+        generated = self._to_source(node)
+
+        assert generated == 'a0' + ''.join('[a{0}]'.format(index) for index in range(1, self.DEPTH))
+
+    def test_overridden_visit_method(self):
+        class Generator(visitors.SourceGeneratorNodeVisitor):
+
+            def visit_Attribute(self, node):
+                self.visit(node.value)
+                self.write('->' + node.attr)
+
+        node = ast.parse('x = a.b.c(d).e + f')
+        generator = Generator(' ' * 4)
+        generator.visit(transformers.ParentChildNodeTransformer().visit(node))
+
+        assert ''.join(generator.result) == 'x = a->b->c(d)->e + f'
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import ast
+
+import pytest
+
+from astmonkey import utils, visitors, writers
+
+WRITER_CLASSES = [writers.ListWriter, writers.StringIOWriter, writers.BytesWriter]
+if utils.check_version(from_inclusive=(3, 0)):
+    from astmonkey.tokens import TokenWriter
+    WRITER_CLASSES.append(TokenWriter)
+
+
+class TestWriters(object):
+    SOURCE = 'class A:\n\n    def f(self):\n        """doc\n        string"""\n        return u\'zażółć\''
+
+    @pytest.fixture(params=WRITER_CLASSES)
+    def writer(self, request):
+        return request.param()
+
+    def _decode(self, value):
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def test_same_output(self, writer):
+        expected = visitors.to_source(ast.parse(self.SOURCE))
+
+        generated = visitors.to_source(ast.parse(self.SOURCE), writer=writer)
+
+        assert self._decode(generated) == expected
+
+    def test_position(self, writer):
+        writer.newline('')
+        writer.write('x = """a\nbc"""')
+        writer.newline('  ')
+        writer.write('y')
+
+        assert (writer.lines, writer.column) == (3, 3)
+        assert self._decode(writer.getvalue()) == 'x = """a\nbc"""\n  y'
+
+    def test_empty(self, writer):
+        assert (writer.lines, writer.column) == (0, 0)
+        assert not writer.getvalue()
+
+    def test_first_newline(self, writer):
+        writer.newline('')
+
+        assert writer.lines == 1
+        assert not writer.getvalue()
+
+
+class TestBytesWriter(object):
+
+    def test_bytes(self):
+        generated = visitors.to_source(ast.parse(u'x = "ł"'), writer=writers.BytesWriter())
+
+        assert generated == u"x = 'ł'".encode('utf-8')
+
+    def test_external_buffer(self):
+        buffer = bytearray(b'# header\n')
+
+        visitors.to_source(ast.parse('x = 1'), writer=writers.BytesWriter(buffer))
+
+        assert buffer == b'# header\nx = 1'
+
+
+class TestListWriter(object):
+
+    def test_generator_result(self):
+        generator = visitors.SourceGeneratorNodeVisitor(' ' * 4)
+
+        generator.visit(ast.parse('x = 1'))
+
+        assert ''.join(generator.result) == 'x = 1'
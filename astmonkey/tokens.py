@@ -0,0 +1,223 @@
+"""Writer emitting tokens of the generated code.
+
+The writer needs Python 3, its tokens are equal to those of `tokenize` of
+Python 3.7 to 3.11.
+"""
+import re
+import tokenize
+
+from astmonkey.utils import check_version
+from astmonkey.writers import ListWriter
+
+if not check_version(from_inclusive=(3, 0)):
+    raise ImportError('astmonkey.tokens needs Python 3')
+
+# operators missing in `tokenize.EXACT_TOKEN_TYPES` of Python 3.6
+_OPERATORS = set(tokenize.EXACT_TOKEN_TYPES).union(['->', '...'])
+
+
+def _group(*choices):
+    # groups of the choices, like of `tokenize` patterns, must not be capturing to keep `lastindex` right
+    return '(' + re.sub(r'(?<!\\)\((?!\?)', '(?:', '|'.join(choices)) + ')'
+
+
+def _string_pattern():
+    prefix = tokenize.StringPrefix
+    return '(?:' + '|'.join([
+        prefix + r"'''[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*'''",
+        prefix + r'"""[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*"""',
+        prefix + r"'[^\n'\\]*(?:\\.[^\n'\\]*)*'",
+        prefix + r'"[^\n"\\]*(?:\\.[^\n"\\]*)*"',
+    ]) + ')'
+
+
+def _unterminated_string_patterns():
+    # quotes of single-quoted strings which end with the line
+    prefix = '[rRbBuUfF]{0,2}'
+    return [
+        prefix + r"'(?=[^\n'\\]*(?:\\.[^\n'\\]*)*\r?\n)",
+        prefix + r'"(?=[^\n"\\]*(?:\\.[^\n"\\]*)*\r?\n)',
+    ]
+
+
+# names and operators, the most common tokens, are tried first
+_TOKEN = re.compile(r'[ \f\t]*(?:' + '|'.join([
+    # string prefixes directly followed by quotes start strings which may not be written completely yet
+    _group(r'(?![rRbBuUfF]{1,2}[\'"]|\d)\w+'),
+    _group(r'(?!\.\d)(?:' + '|'.join(map(re.escape, sorted(_OPERATORS, key=len, reverse=True))) + ')'),
+    _group(tokenize.Number),
+    _group(_string_pattern()),
+    _group(*_unterminated_string_patterns()),
+    _group(r'[^\s\w\'"\\]'),
+    _group(r'\\\r?\n'),
+    _group(r'\r?\n'),
+]) + ')', re.DOTALL)
+(_NAME_GROUP, _OP_GROUP, _NUMBER_GROUP, _STRING_GROUP, _UNTERMINATED_GROUP, _ERROR_GROUP, _CONTINUATION_GROUP,
+ _NEWLINE_GROUP) = range(1, 9)
+_TOKEN_TYPES = {
+    _STRING_GROUP: tokenize.STRING,
+    _NUMBER_GROUP: tokenize.NUMBER,
+    _NAME_GROUP: tokenize.NAME,
+    _OP_GROUP: tokenize.OP,
+    _UNTERMINATED_GROUP: tokenize.ERRORTOKEN,
+    _ERROR_GROUP: tokenize.ERRORTOKEN,
+}
+_OPENING_BRACKETS = frozenset('([{')
+_CLOSING_BRACKETS = frozenset(')]}')
+
+
+class TokenWriter(ListWriter):
+    """Collects written strings like `ListWriter` and emits tokens of them.
+
+    `get_tokens` returns `tokenize.TokenInfo` tokens equal to the tokens
+    `tokenize.generate_tokens` of Python 3.7 to 3.11 produces from the
+    generated code (string literals, including f-strings, are single
+    ``STRING`` tokens), so consumers can skip tokenizing it again. Tokens
+    are the same on other versions, though `tokenize` of Python 3.6 has
+    ``ASYNC`` and ``AWAIT`` tokens and `tokenize` of Python 3.12+ splits
+    f-strings and fills lines of the last ``NEWLINE`` tokens. Strings may be split between
+    writes only between tokens or inside string literals, like the source
+    generator does.
+
+    Written strings are scanned in batches of at least `scan_batch` strings,
+    ending with a line break, and their tokens are appended to `tokens`.
+    Tokens of the rest are emitted by `get_tokens`.
+    """
+    scan_batch = 1024
+
+    def __init__(self):
+        super(TokenWriter, self).__init__()
+        self.tokens = []
+        self._scanned = 0
+        self._pending = ''
+        self._row = 1
+        self._col = 0
+        self._indents = [0]
+        self._depth = 0
+        self._continued = False
+        self._line_has_tokens = False
+        self._at_line_start = True
+        # scanned text of the current line and finished lines spanned by tokens of the buffer
+        self._line_text = ''
+        self._lines = []
+        self._buffer = []
+
+    def write(self, text):
+        self.result.append(text)
+        self._advance(text)
+        if '\n' in text and len(self.result) - self._scanned >= self.scan_batch:
+            self._scan()
+
+    def get_tokens(self):
+        """Return tokens of the written code, ending with ``NEWLINE``, ``DEDENT`` and ``ENDMARKER`` like `tokenize`."""
+        self._scan()
+        tokens = list(self.tokens)
+        row = self._row
+        line_text = self._line_text + self._pending
+        tokens.extend(self._with_lines(self._buffer, self._lines + [line_text], row))
+        if self._pending.strip(' \f\t'):
+            tokens.append(tokenize.TokenInfo(tokenize.ERRORTOKEN, self._pending, (row, self._col),
+                                             (row, self._col + len(self._pending)), line_text))
+        if self._line_has_tokens:
+            tokens.append(tokenize.TokenInfo(tokenize.NEWLINE, '', (row, self._col), (row, self._col + 1), ''))
+            row += 1
+        for _ in self._indents[1:]:
+            tokens.append(tokenize.TokenInfo(tokenize.DEDENT, '', (row, 0), (row, 0), ''))
+        tokens.append(tokenize.TokenInfo(tokenize.ENDMARKER, '', (row, 0), (row, 0), ''))
+        return tokens
+
+    def _scan(self):
+        pending = self._pending + ''.join(self.result[self._scanned:])
+        self._scanned = len(self.result)
+        match = _TOKEN.match
+        buffer = self._buffer
+        row = self._row
+        col = self._col
+        depth = self._depth
+        at_line_start = self._at_line_start
+        line_has_tokens = self._line_has_tokens
+        carry = self._line_text
+        line_start = 0
+        position = 0
+        while True:
+            token = match(pending, position)
+            if token is None:
+                break
+            group = token.lastindex
+            start, end = token.span(group)
+            start_col = col + start - position
+            position = end
+            if group < _CONTINUATION_GROUP:
+                text = pending[start:end]
+                if at_line_start:
+                    at_line_start = False
+                    if not self._continued and not depth:
+                        self._indent(buffer, row, start_col, (carry + pending[line_start:start])[:start_col])
+                line_has_tokens = True
+                if group == _OP_GROUP:
+                    if text in _OPENING_BRACKETS:
+                        depth += 1
+                    elif text in _CLOSING_BRACKETS and depth:
+                        depth -= 1
+                elif group == _STRING_GROUP and '\n' in text:
+                    token_end = (row + text.count('\n'), len(text) - text.rfind('\n') - 1)
+                    buffer.append((tokenize.STRING, text, (row, start_col), token_end))
+                    lines = (carry + pending[line_start:end]).split('\n')
+                    self._lines.extend(line + '\n' for line in lines[:-1])
+                    carry = ''
+                    line_start = end - len(lines[-1])
+                    row, col = token_end
+                    continue
+                elif group == _UNTERMINATED_GROUP:
+                    # like `tokenize`, the prefix is a name and the quote an error, the rest of the line is tokenized
+                    if len(text) > 1:
+                        buffer.append((tokenize.NAME, text[:-1], (row, start_col), (row, start_col + len(text) - 1)))
+                    start_col += len(text) - 1
+                    text = text[-1]
+                col = start_col + len(text)
+                buffer.append((_TOKEN_TYPES[group], text, (row, start_col), (row, col)))
+                continue
+            if group == _NEWLINE_GROUP:
+                token_type = tokenize.NEWLINE if line_has_tokens and not depth else tokenize.NL
+                buffer.append((token_type, pending[start:end], (row, start_col), (row, start_col + 1)))
+                if token_type == tokenize.NEWLINE:
+                    line_has_tokens = False
+            self._lines.append(carry + pending[line_start:end])
+            self.tokens.extend(self._with_lines(buffer, self._lines, row))
+            buffer = self._buffer = []
+            self._lines = []
+            carry = ''
+            line_start = end
+            row += 1
+            col = 0
+            self._continued = group == _CONTINUATION_GROUP
+            at_line_start = True
+        self._row = row
+        self._col = col
+        self._depth = depth
+        self._at_line_start = at_line_start
+        self._line_has_tokens = line_has_tokens
+        self._line_text = carry + pending[line_start:position]
+        self._pending = pending[position:]
+
+    def _indent(self, buffer, row, col, indentation):
+        indents = self._indents
+        position = (row, col)
+        if col > indents[-1]:
+            indents.append(col)
+            buffer.append((tokenize.INDENT, indentation, (row, 0), position))
+        while col < indents[-1]:
+            indents.pop()
+            buffer.append((tokenize.DEDENT, '', position, position))
+
+    @staticmethod
+    def _with_lines(buffer, lines, last_row):
+        # tokens are created directly by the tuple constructor, which is much faster than the named one
+        new = tuple.__new__
+        token_info = tokenize.TokenInfo
+        if len(lines) == 1:
+            line = (lines[0],)
+            return [new(token_info, item + line) for item in buffer]
+        first_row = last_row - len(lines) + 1
+        return [new(token_info, item + (''.join(lines[item[2][0] - first_row:item[3][0] - first_row + 1]),))
+                for item in buffer]
@@ -5,8 +5,15 @@ class ParentChildNodeTransformer(object):
 
     def visit(self, node):
         self._prepare_node(node)
-        for field, value in ast.iter_fields(node):
-            self._process_field(node, field, value)
+        # explicit stack instead of recursion, so deep trees can be annotated
+        stack = [node]
+        while stack:
+            parent = stack.pop()
+            children = []
+            for field, value in ast.iter_fields(parent):
+                self._process_field(parent, field, value, children)
+            children.reverse()
+            stack.extend(children)
         return node
 
     @staticmethod
@@ -18,18 +25,308 @@ class ParentChildNodeTransformer(object):
         if not hasattr(node, 'children'):
             node.children = []
 
-    def _process_field(self, node, field, value):
+    def _process_field(self, node, field, value, children):
         if isinstance(value, list):
             for index, item in enumerate(value):
                 if isinstance(item, ast.AST):
                     self._process_child(item, node, field, index)
+                    children.append(item)
         elif isinstance(value, ast.AST):
             self._process_child(value, node, field)
+            children.append(value)
 
     def _process_child(self, child, parent, field_name, index=None):
-        self.visit(child)
+        self._prepare_node(child)
         child.parent = parent
         child.parents.append(parent)
         child.parent_field = field_name
         child.parent_field_index = index
         child.parent.children.append(child)
+
+
+class Annotations(object):
+    """Parent links of a tree computed on demand, without modifying nodes.
+
+    `children_of` computes links only of the queried node. `parent_of` and
+    `field_of` walk the tree from the root just until the queried node is
+    reached and remember the walked part, so workloads touching a small
+    part of the tree pay only for it. Nodes shared by many parents, like
+    `ast.Load`, are linked to the first parent found.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._parents = {tree: (None, None, None)}
+        self._children = {}
+        self._pending = [tree]
+
+    def parent_of(self, node):
+        return self._get_entry(node)[0]
+
+    def field_of(self, node):
+        """Return name of the parent field containing `node` and its index in the list field."""
+        _, field, index = self._get_entry(node)
+        return field, index
+
+    def children_of(self, node):
+        try:
+            return self._children[node]
+        except KeyError:
+            pass
+        children = self._children[node] = []
+        parents = self._parents
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    if isinstance(item, ast.AST):
+                        children.append(item)
+                        if item not in parents:
+                            parents[item] = (node, field, index)
+            elif isinstance(value, ast.AST):
+                children.append(value)
+                if value not in parents:
+                    parents[value] = (node, field, None)
+        return children
+
+    def _get_entry(self, node):
+        parents = self._parents
+        try:
+            return parents[node]
+        except KeyError:
+            pass
+        pending = self._pending
+        while pending:
+            pending.extend(reversed(self.children_of(pending.pop())))
+            if node in parents:
+                return parents[node]
+        raise ValueError('node does not belong to the tree')
+
+
+class Pipeline(object):
+    """Runs many passes over a tree in a single traversal.
+
+    Stages are `ast.NodeVisitor` or `ast.NodeTransformer` instances with
+    per-node-type hooks: `visit_<type>` is called in pre-order (before the
+    children of the node are traversed) and `leave_<type>` in post-order.
+    Hooks must not call `generic_visit` - the pipeline traverses children,
+    so stages with such hooks are rejected with `ValueError`.
+
+    At every node hooks run in the order of stages and each of them gets
+    the result of the previous one. Results of transformer hooks are
+    handled like in `ast.NodeTransformer` - a node replaces the visited
+    one, `None` removes it and a list is spliced into the list field.
+    Remaining stages see the replacement, dispatched on its own type, and
+    the traversal continues with its children. A replacement returned by a
+    `leave_<type>` hook is traversed by the remaining stages like the tree
+    of a later pass: their `visit_<type>` and `leave_<type>` hooks run on it
+    and on its new nodes, while subtrees already traversed are skipped.
+    Results of visitor hooks are ignored. Node types without hooks are not
+    dispatched at all.
+
+    With `annotate=True` the resulting tree is also annotated in the same
+    traversal, like by `ParentChildNodeTransformer`.
+    """
+
+    def __init__(self, stages, annotate=False):
+        self.stages = list(stages)
+        self.annotate = annotate
+        self._hooks = _Hooks(self.stages)
+        self._annotator = ParentChildNodeTransformer()
+        self._traversed = set()
+        for stage in self.stages:
+            for name in dir(stage):
+                if name.startswith(('visit_', 'leave_')) and _is_hook(stage, name) and _calls_generic_visit(
+                        getattr(stage, name)):
+                    raise ValueError('{0}.{1} calls generic_visit, but children are traversed by the pipeline'.format(
+                        stage.__class__.__name__, name))
+
+    def visit(self, node):
+        if self.annotate:
+            ParentChildNodeTransformer._prepare_node(node)
+        results = [None]
+        # explicit stack instead of recursion, so deep trees can be traversed
+        stack = [(self._enter, node, (0, None), results, 0)]
+        try:
+            while stack:
+                step, node, data, step_results, index = stack.pop()
+                step(stack, node, data, step_results, index)
+        finally:
+            self._traversed.clear()
+        return results[0]
+
+    def _enter(self, stack, node, data, results, index):
+        """Run pre-order hooks of `node` and schedule traversal of its children.
+
+        `data` holds the first stage to run and the node replaced by a post-order
+        hook if `node` is a part of its replacement, see `_run_hooks`. Results of
+        steps are stored in `results` at `index`.
+        """
+        first_stage, replaced = data
+        if replaced is not None:
+            if node is replaced:
+                # only post-order hooks of the replaced node have not run yet
+                node = self._run_hooks(stack, node, 1, first_stage, results, index)
+                if node is not _SCHEDULED:
+                    results[index] = node
+                return
+            if node in self._traversed:
+                results[index] = node
+                return
+        if self._hooks[node.__class__][0]:
+            node = self._run_hooks(stack, node, 0, first_stage, results, index)
+            if node is _SCHEDULED:
+                return
+            if not isinstance(node, ast.AST):
+                results[index] = node
+                return
+        enter = self._enter
+        children_data = data if replaced is not None else _VISIT
+        fields = []
+        children = []
+        for field in node._fields:
+            try:
+                value = getattr(node, field)
+            except AttributeError:
+                continue
+            if isinstance(value, list):
+                children_count = len(children)
+                # results of other items are spliced into the list, so they keep their place in one item lists
+                slots = []
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        children.append((enter, item, children_data, slots, len(slots)))
+                        slots.append(item)
+                    else:
+                        slots.append([item])
+                if len(children) == children_count:
+                    continue
+            elif isinstance(value, ast.AST):
+                slots = [value]
+                children.append((enter, value, children_data, slots, 0))
+            else:
+                continue
+            fields.append((field, value, slots))
+        if not children:
+            self._leave(stack, node, (first_stage, replaced, fields), results, index)
+            return
+        stack.append((self._leave, node, (first_stage, replaced, fields), results, index))
+        children.reverse()
+        stack.extend(children)
+
+    def _leave(self, stack, node, data, results, index):
+        """Replace children of `node` with their results and run its post-order hooks."""
+        first_stage, replaced, fields = data
+        for field, value, slots in fields:
+            if isinstance(value, list):
+                if slots == value:
+                    continue
+                new_values = []
+                for result in slots:
+                    self._extend(new_values, result)
+                value[:] = new_values
+            elif slots[0] is None:
+                delattr(node, field)
+            elif slots[0] is not value:
+                setattr(node, field, slots[0])
+        self._traversed.add(node)
+        if self.annotate:
+            self._annotate_children(node)
+        if self._hooks[node.__class__][1]:
+            node = self._run_hooks(stack, node, 1, first_stage if replaced is not None else 0, results, index)
+            if node is _SCHEDULED:
+                return
+        results[index] = node
+
+    def _collect(self, stack, node, data, results, index):
+        """Splice results of nodes returned in a list by a pre-order hook."""
+        nodes = []
+        for result in data:
+            self._extend(nodes, result)
+        results[index] = nodes
+
+    def _run_hooks(self, stack, node, order, first_stage, results, index):
+        """Run hooks and return the result, or `_SCHEDULED` if it needs a traversal first.
+
+        A replacement returned by a post-order hook is traversed by the
+        remaining stages and nodes returned in a list by a pre-order hook
+        are traversed before they are spliced, their results are stored
+        in `results` at `index`.
+        """
+        hooks = self._hooks[node.__class__][order]
+        hook_index = 0
+        while hook_index < len(hooks):
+            stage, hook, transforms = hooks[hook_index]
+            hook_index += 1
+            if stage < first_stage:
+                continue
+            result = hook(node)
+            if not transforms or result is node:
+                continue
+            if isinstance(result, ast.AST):
+                if order:
+                    stack.append((self._enter, result, (stage + 1, node), results, index))
+                    return _SCHEDULED
+                node = result
+                hooks = self._hooks[node.__class__][order]
+                hook_index = 0
+                first_stage = stage + 1
+            elif result is None or order:
+                return result
+            else:
+                items = list(result)
+                item_results = [None] * len(items)
+                stack.append((self._collect, None, item_results, results, index))
+                stack.extend((self._enter, items[item_index], (stage + 1, None), item_results, item_index)
+                             for item_index in reversed(range(len(items))))
+                return _SCHEDULED
+        return node
+
+    def _annotate_children(self, node):
+        node.children = []
+        children = []
+        for field, value in ast.iter_fields(node):
+            self._annotator._process_field(node, field, value, children)
+
+    @staticmethod
+    def _extend(nodes, result):
+        if result is None:
+            return
+        if isinstance(result, ast.AST):
+            nodes.append(result)
+        else:
+            nodes.extend(result)
+
+
+class _Hooks(dict):
+    """Hooks of pipeline stages by node class, as (stage index, hook, transforms) for pre-order and post-order."""
+
+    def __init__(self, stages):
+        super(_Hooks, self).__init__()
+        self.stages = stages
+
+    def __missing__(self, node_class):
+        hooks = ([], [])
+        for index, stage in enumerate(self.stages):
+            transforms = isinstance(stage, ast.NodeTransformer)
+            for order, prefix in enumerate(['visit_', 'leave_']):
+                name = prefix + node_class.__name__
+                if _is_hook(stage, name):
+                    hooks[order].append((index, getattr(stage, name), transforms))
+        self[node_class] = hooks
+        return hooks
+
+
+def _is_hook(stage, name):
+    # default visit methods of ast.NodeVisitor, like visit_Constant, are not hooks
+    return name in getattr(stage, '__dict__', ()) or getattr(stage.__class__, name, None) is not getattr(
+        ast.NodeVisitor, name, None)
+
+
+def _calls_generic_visit(hook):
+    code = getattr(getattr(hook, '__func__', hook), '__code__', None)
+    return code is not None and 'generic_visit' in code.co_names
+
+
+_VISIT = (0, None)
+_SCHEDULED = object()
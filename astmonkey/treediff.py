@@ -0,0 +1,215 @@
+"""Structural diff between two trees."""
+import ast
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+_MAX_CANDIDATES = 32
+
+
+class Edit(namedtuple('Edit', ['kind', 'old_path', 'new_path', 'old', 'new'])):
+    """Node-level edit turning the first tree into the second one.
+
+    `kind` is one of ``insert``, ``delete``, ``replace`` and ``move``. Paths
+    are tuples of ``(parent_field, parent_field_index)`` steps from the root,
+    `old_path` points into the first tree and `new_path` into the second
+    one - ``insert`` edits have no `old_path` and `old`, ``delete`` edits
+    have no `new_path` and `new`. ``replace`` edits of nodes of the same
+    type mean that only their own (non-node) fields changed, edits of their
+    children are listed separately.
+    """
+    __slots__ = ()
+
+
+def diff(tree_a, tree_b):
+    """Return list of `Edit` objects turning `tree_a` into `tree_b`.
+
+    Every subtree gets a structural key, which ignores locations, so
+    identical subtrees are matched without visiting them and only paths to
+    changed nodes are compared. Deleted and inserted subtrees with equal
+    keys are reported as moves. Trees don't have to be annotated.
+    """
+    return TreeDiff(tree_a, tree_b).edits
+
+
+class TreeDiff(object):
+
+    def __init__(self, tree_a, tree_b):
+        keys = {}
+        self.keys_a = _subtree_keys(tree_a, keys)
+        self.keys_b = _subtree_keys(tree_b, keys)
+        self.edits = self._match_moves(self._compare(tree_a, tree_b))
+
+    def _compare(self, tree_a, tree_b):
+        edits = []
+        stack = [(tree_a, tree_b, (), ())]
+        while stack:
+            node_a, node_b, path_a, path_b = stack.pop()
+            if self.keys_a[node_a] == self.keys_b[node_b]:
+                continue
+            if type(node_a) is not type(node_b):
+                edits.append(Edit('replace', path_a, path_b, node_a, node_b))
+                continue
+            if _own_fields_differ(node_a, node_b):
+                edits.append(Edit('replace', path_a, path_b, node_a, node_b))
+            pending = []
+            for field, value_a in ast.iter_fields(node_a):
+                value_b = getattr(node_b, field, None)
+                if _is_node_list(value_a) or _is_node_list(value_b):
+                    self._compare_lists(path_a, path_b, field, value_a or [], value_b or [], edits, pending)
+                else:
+                    step = ((field, None),)
+                    _compare_items(path_a + step, path_b + step, value_a, value_b, edits, pending)
+            stack.extend(reversed(pending))
+        return edits
+
+    def _compare_lists(self, path_a, path_b, field, items_a, items_b, edits, pending):
+        keys_a = [self.keys_a.get(item) for item in items_a]
+        keys_b = [self.keys_b.get(item) for item in items_b]
+        matcher = SequenceMatcher(None, keys_a, keys_b, autojunk=False)
+        for tag, start_a, end_a, start_b, end_b in matcher.get_opcodes():
+            if tag != 'equal':
+                self._compare_blocks(path_a, path_b, field, items_a, items_b, (start_a, end_a, start_b, end_b), edits,
+                                     pending)
+
+    def _compare_blocks(self, path_a, path_b, field, items_a, items_b, block, edits, pending):
+        """Compare changed items of lists.
+
+        Every new item is compared deeper with the old item of the same type
+        which shares most children with it, the rest is deleted or inserted.
+        """
+        start_a, end_a, start_b, end_b = block
+        candidates = {}
+        for index_a in range(start_a, end_a):
+            candidates.setdefault(type(items_a[index_a]), []).append(index_a)
+        paired = set()
+        for index_b in range(start_b, end_b):
+            item_b = items_b[index_b]
+            index_a = self._most_similar(item_b, items_a, candidates.get(type(item_b), []), paired)
+            if index_a is None:
+                _compare_items(None, path_b + ((field, index_b),), None, item_b, edits, pending)
+            else:
+                paired.add(index_a)
+                _compare_items(path_a + ((field, index_a),), path_b + ((field, index_b),), items_a[index_a], item_b,
+                               edits, pending)
+        for index_a in range(start_a, end_a):
+            if index_a not in paired:
+                _compare_items(path_a + ((field, index_a),), None, items_a[index_a], None, edits, pending)
+
+    def _most_similar(self, item_b, items_a, candidates, paired):
+        if not isinstance(item_b, ast.AST):
+            return None
+        children_b = set(self.keys_b[child] for child in ast.iter_child_nodes(item_b))
+        best_index = None
+        best_score = -1
+        for index_a in candidates[:_MAX_CANDIDATES + len(paired)]:
+            if index_a in paired:
+                continue
+            score = sum(1 for child in ast.iter_child_nodes(items_a[index_a]) if self.keys_a[child] in children_b)
+            if score > best_score:
+                best_index = index_a
+                best_score = score
+        return best_index
+
+    def _match_moves(self, edits):
+        deleted = {}
+        for position, edit in enumerate(edits):
+            if edit.kind == 'delete':
+                deleted.setdefault(self.keys_a[edit.old], []).append(position)
+        if not deleted:
+            return edits
+        moves = {}
+        for position, edit in enumerate(edits):
+            if edit.kind == 'insert':
+                positions = deleted.get(self.keys_b[edit.new])
+                if positions:
+                    moves[positions.pop(0)] = position
+        inserts = set(moves.values())
+        result = []
+        for position, edit in enumerate(edits):
+            if position in moves:
+                insert = edits[moves[position]]
+                result.append(Edit('move', edit.old_path, insert.new_path, edit.old, insert.new))
+            elif position not in inserts:
+                result.append(edit)
+        return result
+
+
+def _compare_items(path_a, path_b, item_a, item_b, edits, pending):
+    is_node_a = isinstance(item_a, ast.AST)
+    is_node_b = isinstance(item_b, ast.AST)
+    if is_node_a and is_node_b:
+        if type(item_a) is type(item_b):
+            pending.append((item_a, item_b, path_a, path_b))
+        else:
+            edits.append(Edit('replace', path_a, path_b, item_a, item_b))
+        return
+    if is_node_a:
+        edits.append(Edit('delete', path_a, None, item_a, None))
+    if is_node_b:
+        edits.append(Edit('insert', None, path_b, None, item_b))
+
+
+def _is_node_list(value):
+    return isinstance(value, list) and any(isinstance(item, ast.AST) for item in value)
+
+
+def _own_fields_differ(node_a, node_b):
+    for field, value_a in ast.iter_fields(node_a):
+        value_b = getattr(node_b, field, None)
+        if any(isinstance(value, ast.AST) or _is_node_list(value) for value in (value_a, value_b)):
+            continue
+        if _value_key(value_a) != _value_key(value_b):
+            return True
+    return False
+
+
+def _value_key(value):
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(_value_key(item) for item in value)
+    if isinstance(value, (float, complex)):
+        # 0.0 and -0.0 are equal, NaN is not equal to itself
+        return type(value), repr(value)
+    # constants equal across types, like 1 and True, have to differ
+    return type(value), value
+
+
+def _subtree_keys(tree, keys, locations=False):
+    """Return mapping of every node of the tree to the structural key of its subtree.
+
+    Keys are integers interned in the `keys` dictionary, equal keys from
+    the same dictionary mean equal subtrees - a key is given to a tuple of
+    the node type, keys of its children and its own field values, so
+    unlike hashes keys never collide. Locations are ignored by default.
+    """
+    AST = ast.AST
+    nodes = [tree]
+    for node in nodes:
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, AST):
+                nodes.append(value)
+            elif isinstance(value, list):
+                nodes.extend(item for item in value if isinstance(item, AST))
+    subtrees = {}
+    # children always follow their parents in the breadth-first order
+    for node in reversed(nodes):
+        if node in subtrees:
+            continue
+        key = [type(node)]
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, AST):
+                key.append(subtrees[value])
+            elif isinstance(value, list):
+                key.append(tuple(subtrees[item] if isinstance(item, AST) else _value_key(item) for item in value))
+            else:
+                key.append(_value_key(value))
+        if locations:
+            key.extend(getattr(node, attribute, None) for attribute in node._attributes)
+        key = tuple(key)
+        subtree = keys.get(key)
+        if subtree is None:
+            subtree = keys[key] = len(keys)
+        subtrees[node] = subtree
+    return subtrees
+
@@ -24,6 +24,157 @@ def get_by_python_version(classes, python_version=sys.version_info):
     return result
 
 
+def clone(node, annotate=True):
+    """Copy the tree without following `ParentChildNodeTransformer` annotations.
+
+    Only node fields and location attributes are copied. If `annotate` is
+    true, the copy gets the same annotations as `ParentChildNodeTransformer`
+    would add to it. Nodes shared within the tree, like expression contexts,
+    stay shared within the copy.
+    """
+    copies = {}
+    root_copy = _copy_node(node)
+    copies[id(node)] = root_copy
+    if annotate:
+        root_copy.parent = None
+        root_copy.parents = []
+        root_copy.children = []
+    stack = [(node, root_copy)]
+    while stack:
+        original, node_copy = stack.pop()
+        new_nodes = []
+        for field in original._fields:
+            try:
+                value = getattr(original, field)
+            except AttributeError:
+                continue
+            if isinstance(value, list):
+                items = []
+                for index, item in enumerate(value):
+                    if isinstance(item, ast.AST):
+                        item = _copy_child(item, node_copy, field, index, copies, new_nodes, annotate)
+                    items.append(item)
+                value = items
+            elif isinstance(value, ast.AST):
+                value = _copy_child(value, node_copy, field, None, copies, new_nodes, annotate)
+            setattr(node_copy, field, value)
+        new_nodes.reverse()
+        stack.extend(new_nodes)
+    return root_copy
+
+
+def _copy_node(node):
+    cls = node.__class__
+    node_copy = cls.__new__(cls)
+    for attribute in node._attributes:
+        try:
+            setattr(node_copy, attribute, getattr(node, attribute))
+        except AttributeError:
+            pass
+    return node_copy
+
+
+def _copy_child(child, parent_copy, field, index, copies, new_nodes, annotate):
+    child_copy = copies.get(id(child))
+    if child_copy is None:
+        child_copy = copies[id(child)] = _copy_node(child)
+        new_nodes.append((child, child_copy))
+        if annotate:
+            child_copy.parents = []
+            child_copy.children = []
+    if annotate:
+        child_copy.parent = parent_copy
+        child_copy.parents.append(parent_copy)
+        child_copy.parent_field = field
+        child_copy.parent_field_index = index
+        parent_copy.children.append(child_copy)
+    return child_copy
+
+
+_LOCATION_ATTRIBUTES = ('lineno', 'col_offset', 'end_lineno', 'end_col_offset')
+
+
+def fix_locations(node):
+    """Set missing locations of a subtree inserted into an annotated tree.
+
+    `node` has to be placed in the tree by `parent`, `parent_field` and
+    `parent_field_index` annotations (like set by
+    `ParentChildNodeTransformer`). If it has no location, it gets one from
+    its neighbouring siblings or, without them, from its nearest located
+    ancestor, and nodes of the subtree without locations get locations of
+    their parents. Only the subtree is visited, so it is much cheaper than
+    `ast.fix_missing_locations` and `FixLinenoNodeVisitor` over the whole
+    module. Statements may get line numbers of their neighbours, code
+    generators still start them on new lines.
+    """
+    if 'lineno' in node._attributes:
+        if getattr(node, 'lineno', None) is None:
+            node.lineno, node.col_offset = _neighbour_location(node)
+        if getattr(node, 'end_lineno', None) is None:
+            node.end_lineno, node.end_col_offset = node.lineno, node.col_offset
+    stack = [(node, _location(node) or _location(_located_ancestor(node)))]
+    while stack:
+        parent, location = stack.pop()
+        for child in ast.iter_child_nodes(parent):
+            child_location = location
+            if 'lineno' in child._attributes:
+                for name, value in zip(_LOCATION_ATTRIBUTES, location):
+                    if getattr(child, name, None) is None:
+                        setattr(child, name, value)
+                child_location = _location(child)
+            stack.append((child, child_location))
+    return node
+
+
+def _location(node):
+    if node is None or getattr(node, 'lineno', None) is None:
+        return None
+    return tuple(getattr(node, name, None) for name in _LOCATION_ATTRIBUTES)
+
+
+def _located_ancestor(node):
+    node = node.parent
+    while node is not None and getattr(node, 'lineno', None) is None:
+        node = node.parent
+    return node
+
+
+def _neighbour_location(node):
+    """Return (lineno, col_offset) of the node from the previous or following child of its parent, or its ancestors."""
+    children = node.parent.children
+    position = next(index for index, child in enumerate(children) if child is node)
+    previous = following = None
+    for child in reversed(children[:position]):
+        if getattr(child, 'lineno', None) is not None:
+            previous = child
+            break
+    for child in children[position + 1:]:
+        if getattr(child, 'lineno', None) is not None:
+            following = child
+            break
+    if isinstance(node, (ast.stmt, ast.excepthandler)):
+        if previous is not None:
+            # statements start after the previous node, like the test of ``if`` or the preceding statement
+            lineno = (previous.end_lineno or previous.lineno) + 1
+            if following is not None:
+                lineno = min(lineno, following.lineno)
+            return lineno, following.col_offset if following is not None else previous.col_offset
+        if following is not None:
+            return following.lineno, following.col_offset
+        ancestor = _located_ancestor(node)
+        if ancestor is None:
+            return 1, 0
+        return ancestor.lineno + 1, ancestor.col_offset
+    if previous is not None and previous.end_lineno is not None:
+        return previous.end_lineno, previous.end_col_offset
+    if following is not None:
+        return following.lineno, following.col_offset
+    ancestor = _located_ancestor(node)
+    if ancestor is None:
+        return 1, 0
+    return ancestor.lineno, ancestor.col_offset
+
+
 class CommaWriter:
 
     def __init__(self, write_func, add_space_at_beginning=False):
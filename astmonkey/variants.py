@@ -0,0 +1,148 @@
+import ast
+
+from astmonkey.visitors import LinenoFixes, SourceGeneratorNodeVisitor
+
+
+class TreeVariant(object):
+    """Copy-on-write variant of a tree annotated by `ParentChildNodeTransformer`.
+
+    Every modification returns a new variant which copies only the nodes on
+    the path from the changed node up to the root and shares all untouched
+    subtrees with the original tree. Shared nodes are never modified, so
+    their `parent` links still point into the original tree - annotations
+    of a variant have to be resolved through `parent_of`, `field_of` and
+    `children_of`, which consult the per-variant overlay first.
+    """
+
+    def __init__(self, root, _overlay=None, _local=None):
+        self.root = root
+        self._overlay = _overlay if _overlay is not None else {}
+        self._local = _local if _local is not None else set()
+
+    def parent_of(self, node):
+        entry = self._overlay.get(node)
+        if entry is not None:
+            return entry[0]
+        return getattr(node, 'parent', None)
+
+    def field_of(self, node):
+        entry = self._overlay.get(node)
+        if entry is not None:
+            return entry[1], entry[2]
+        return getattr(node, 'parent_field', None), getattr(node, 'parent_field_index', None)
+
+    def children_of(self, node):
+        if node in self._local:
+            return list(ast.iter_child_nodes(node))
+        return node.children
+
+    def replace(self, node, new_node):
+        """Return a variant with `node` replaced by `new_node`."""
+        parent = self.parent_of(node)
+        if parent is None:
+            return self._derive(node, new_node)
+        field, index = self.field_of(node)
+        if index is None:
+            return self.set_field(parent, field, new_node)
+        items = list(getattr(parent, field))
+        items[index] = new_node
+        return self.set_field(parent, field, items)
+
+    def remove(self, node):
+        """Return a variant without `node`, which has to be an element of a list field."""
+        field, index = self.field_of(node)
+        if index is None:
+            raise ValueError('only list field elements can be removed')
+        parent = self.parent_of(node)
+        items = list(getattr(parent, field))
+        del items[index]
+        return self.set_field(parent, field, items)
+
+    def set_field(self, node, field, value):
+        """Return a variant with `field` of `node` set to `value`.
+
+        This is the only way to modify nodes shared by many parents, like
+        `ast.Load` or operator singletons.
+        """
+        node_copy = _shallow_copy(node)
+        setattr(node_copy, field, value)
+        return self._derive(node, node_copy)
+
+    def to_source(self, indent_with=' ' * 4):
+        generator = VariantSourceGeneratorNodeVisitor(indent_with, self)
+        generator.visit(self.root)
+        return ''.join(generator.result)
+
+    def _derive(self, node, new_node):
+        overlay = dict(self._overlay)
+        local = set(self._local)
+        self._annotate(new_node, overlay, local)
+        while True:
+            overlay.pop(node, None)
+            local.discard(node)
+            parent = self.parent_of(node)
+            if parent is None:
+                overlay[new_node] = (None, None, None)
+                return TreeVariant(new_node, overlay, local)
+            field, index = self.field_of(node)
+            parent_copy = _shallow_copy(parent)
+            if index is None:
+                setattr(parent_copy, field, new_node)
+            else:
+                getattr(parent_copy, field)[index] = new_node
+            local.add(parent_copy)
+            self._adopt(parent_copy, overlay)
+            node, new_node = parent, parent_copy
+
+    def _annotate(self, node, overlay, local):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            local.add(node)
+            for child in self._adopt(node, overlay):
+                if not hasattr(child, 'parent') and child not in local:
+                    stack.append(child)
+
+    @staticmethod
+    def _adopt(node, overlay):
+        children = []
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    if isinstance(item, ast.AST):
+                        overlay[item] = (node, field, index)
+                        children.append(item)
+            elif isinstance(value, ast.AST):
+                overlay[value] = (node, field, None)
+                children.append(value)
+        return children
+
+
+class VariantSourceGeneratorNodeVisitor(SourceGeneratorNodeVisitor):
+    """Source generator which resolves parents through a `TreeVariant`.
+
+    Line numbers are fixed like by `FixLinenoNodeVisitor`, without modifying
+    nodes shared with other variants.
+    """
+
+    def __init__(self, indent_with, variant):
+        super(VariantSourceGeneratorNodeVisitor, self).__init__(indent_with)
+        self.variant = variant
+        self._lineno_fixes = LinenoFixes()
+        self._lineno_fixes.visit(variant.root)
+
+    def parent_of(self, node):
+        return self.variant.parent_of(node)
+
+    def _get_actual_lineno(self, node):
+        lineno = super(VariantSourceGeneratorNodeVisitor, self)._get_actual_lineno(node)
+        return self._lineno_fixes.actual_lineno(node, lineno)
+
+
+def _shallow_copy(node):
+    node_copy = node.__class__.__new__(node.__class__)
+    for name in node._fields + node._attributes:
+        if hasattr(node, name):
+            value = getattr(node, name)
+            setattr(node_copy, name, list(value) if isinstance(value, list) else value)
+    return node_copy
@@ -1,25 +1,82 @@
 import ast
+import multiprocessing
 import re
+from collections import OrderedDict
 from contextlib import contextmanager
+from itertools import chain, compress, count, cycle, islice, repeat
+from operator import add, attrgetter, getitem, is_, sub
 
 import pydot
 
 from astmonkey import utils
 from astmonkey.transformers import ParentChildNodeTransformer
 from astmonkey.utils import CommaWriter, check_version
+from astmonkey.writers import ListWriter
 
 
 class GraphNodeVisitor(ast.NodeVisitor):
-    def __init__(self):
+    """Builds Graphviz `graph` of a tree annotated by `ParentChildNodeTransformer`.
+
+    If `focus` node is given, only nodes at most `radius` edges away from
+    it (through `parent` and `children` links) are drawn, whichever node
+    is visited. Nodes just behind the cut are drawn as dashed stubs - cut
+    children of a single field share one stub.
+    """
+
+    def __init__(self, focus=None, radius=2):
         self.graph = pydot.Dot(graph_type='graph', **self._dot_graph_kwargs())
+        self.focus = focus
+        self.radius = radius
 
     def visit(self, node):
+        if self.focus is not None:
+            self._visit_neighborhood()
+            return
         if len(node.parents) <= 1:
             self.graph.add_node(self._dot_node(node))
         if len(node.parents) == 1:
             self.graph.add_edge(self._dot_edge(node))
         super(GraphNodeVisitor, self).visit(node)
 
+    def _visit_neighborhood(self):
+        distances = {self.focus: 0}
+        nodes = [self.focus]
+        for node in nodes:
+            distance = distances[node]
+            if distance == self.radius:
+                continue
+            for neighbor in [node.parent] + node.children:
+                if neighbor is not None and neighbor not in distances and len(neighbor.parents) <= 1:
+                    distances[neighbor] = distance + 1
+                    nodes.append(neighbor)
+        for node in nodes:
+            self.graph.add_node(self._dot_node(node))
+            if node.parent in distances:
+                self.graph.add_edge(self._dot_edge(node))
+            elif node.parent is not None:
+                self.graph.add_node(self._dot_stub_node(node.parent))
+                self.graph.add_edge(self._dot_edge(node))
+            cut_children = OrderedDict()
+            for child in node.children:
+                if child not in distances and len(child.parents) <= 1:
+                    cut_children.setdefault(child.parent_field, []).append(child)
+            for field, children in cut_children.items():
+                self._add_stub(node, field, children)
+
+    def _add_stub(self, parent, field, children):
+        if len(children) == 1:
+            self.graph.add_node(self._dot_stub_node(children[0]))
+            self.graph.add_edge(self._dot_edge(children[0]))
+            return
+        name = '{0}.{1}'.format(parent, field)
+        kwargs = dict(self._dot_node_kwargs(children[0]), style='dashed')
+        self.graph.add_node(pydot.Node(name, label='{0} nodes'.format(len(children)), **kwargs))
+        self.graph.add_edge(pydot.Edge(str(parent), name, label=field, **self._dot_edge_kwargs(children[0])))
+
+    def _dot_stub_node(self, node):
+        kwargs = dict(self._dot_node_kwargs(node), style='dashed')
+        return pydot.Node(str(node), label='ast.{0}(...)'.format(node.__class__.__name__), **kwargs)
+
     def _dot_graph_kwargs(self):
         return {}
 
@@ -116,8 +173,11 @@ ALL_SYMBOLS.update(BINOP_SYMBOLS)
 ALL_SYMBOLS.update(CMPOP_SYMBOLS)
 ALL_SYMBOLS.update(UNARYOP_SYMBOLS)
 
+# rendering by worker processes needs executors with contexts and initializers
+_PARALLEL_RENDERING = check_version(from_inclusive=(3, 7))
 
-def to_source(node, indent_with=' ' * 4):
+
+def to_source(node, indent_with=' ' * 4, writer=None, workers=None):
     """This function can convert a node tree back into python sourcecode.
     This is useful for debugging purposes, especially if you're dealing with
     custom asts not generated by python itself.
@@ -130,13 +190,101 @@ def to_source(node, indent_with=' ' * 4):
     Each level of indentation is replaced with `indent_with`.  Per default this
     parameter is equal to four spaces as suggested by PEP 8, but it might be
     adjusted to match the application's styleguide.
+
+    Generated code is collected by `writer` (a `writers.ListWriter` by
+    default) and the result of its `getvalue` is returned, so for example
+    with `writers.BytesWriter` this function returns UTF-8 encoded bytes.
+
+    If `workers` is greater than 1, top-level statements of a module are
+    split into chunks rendered by a pool of `workers` processes. The result is
+    identical to the serial rendering. Before Python 3.7 modules are always
+    rendered serially.
     """
     ParentChildNodeTransformer().visit(node)
     FixLinenoNodeVisitor().visit(node)
+    generator = SourceGeneratorNodeVisitor(indent_with, writer)
+    if workers and workers > 1 and _PARALLEL_RENDERING and isinstance(node, ast.Module) and len(node.body) > 1:
+        _render_module_in_parallel(generator, node, workers)
+    else:
+        generator.visit(node)
+
+    return generator.writer.getvalue()
+
+
+def render_statements(statements, indent_with=' ' * 4, start_lines=0):
+    """Render top-level statements as if `start_lines` lines were already generated.
+
+    Statements have to be annotated and have fixed line numbers.
+    """
     generator = SourceGeneratorNodeVisitor(indent_with)
-    generator.visit(node)
+    generator.writer.lines = start_lines
+    generator.body(statements, indent=0)
+    return generator.writer.getvalue()
 
-    return ''.join(generator.result)
+
+def write_rendered_statements(generator, statements, text):
+    """Write `text` generated by `render_statements` started one line before the first statement.
+
+    Returns False, without writing anything, if the generator is already
+    past that line and the statements have to be rendered again.
+    """
+    missing_lines = generator._get_actual_lineno(statements[0]) - 1 - generator._get_current_line_no()
+    if missing_lines < 0:
+        return False
+    generator.write('\n' * missing_lines + text)
+    return True
+
+
+def _render_module_in_parallel(generator, node, workers):
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunk_size = max(1, -(-len(node.body) // (workers * 4)))
+    chunks = [node.body[index:index + chunk_size] for index in range(0, len(node.body), chunk_size)]
+    generator.body(chunks[0], indent=0)
+    start_lines = [generator._get_actual_lineno(chunk[0]) - 1 for chunk in chunks[1:]]
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # forked workers inherit the annotated tree passed to their initializer, so only chunk bounds are sent
+        executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'),
+                                       initializer=_init_forked_worker, initargs=(node,))
+        tasks = [
+            (index, index + chunk_size, generator.indent_with, lines)
+            for index, lines in zip(range(chunk_size, len(node.body), chunk_size), start_lines)
+        ]
+        render_chunk = _render_forked_chunk
+    else:
+        executor = ProcessPoolExecutor(workers)
+        tasks = [
+            ([utils.clone(statement, annotate=False) for statement in chunk], generator.indent_with, lines)
+            for chunk, lines in zip(chunks[1:], start_lines)
+        ]
+        render_chunk = _render_chunk
+    with executor:
+        for chunk, text in zip(chunks[1:], executor.map(render_chunk, tasks)):
+            if not write_rendered_statements(generator, chunk, text):
+                generator.body(chunk, indent=0, new_line=True)
+
+
+# module rendered by a forked worker process
+_forked_module = None
+
+
+def _init_forked_worker(module):
+    global _forked_module
+    _forked_module = module
+
+
+def _render_forked_chunk(task):
+    start, end, indent_with, start_lines = task
+    return render_statements(_forked_module.body[start:end], indent_with, start_lines)
+
+
+def _render_chunk(task):
+    statements, indent_with, start_lines = task
+    module = ast.Module(body=statements)
+    if 'type_ignores' in ast.Module._fields:
+        module.type_ignores = []
+    ParentChildNodeTransformer().visit(module)
+    return render_statements(statements, indent_with, start_lines)
 
 
 class FixLinenoNodeVisitor(ast.NodeVisitor):
@@ -178,24 +326,59 @@ class FixLinenoNodeVisitor(ast.NodeVisitor):
             self.visit(body_node)
 
 
+class LinenoFixes(FixLinenoNodeVisitor):
+    """Collects line numbers `FixLinenoNodeVisitor` would set in `linenos`, without modifying nodes."""
+
+    def __init__(self):
+        super(LinenoFixes, self).__init__()
+        self.linenos = {}
+
+    def _fix_lineno(self, node):
+        if node.lineno < self.min_lineno:
+            self.linenos[node] = self.min_lineno
+        else:
+            self.min_lineno = node.lineno
+
+    def actual_lineno(self, node, lineno):
+        """Return `lineno` computed by a source generator for the node, moved like by the fix of the node."""
+        fixed_lineno = self.linenos.get(node)
+        if fixed_lineno is None or isinstance(node, ast.FunctionDef) and node.decorator_list:
+            return lineno
+        return lineno + fixed_lineno - node.lineno
+
+
 class BaseSourceGeneratorNodeVisitor(ast.NodeVisitor):
     """This visitor is able to transform a well formed syntax tree into python
     sourcecode.  For more details have a look at the docstring of the
     `node_to_source` function.
     """
 
-    def __init__(self, indent_with):
-        self.result = []
+    def __init__(self, indent_with, writer=None):
+        self.writer = writer if writer is not None else ListWriter()
         self.indent_with = indent_with
         self.indentation = 0
+        self._indent_prefixes = {}
+        self._chain_renderers = {}
+
+    @property
+    def result(self):
+        return self.writer.result
+
+    def reset(self, writer=None):
+        """Prepare the generator for rendering another tree. Caches of the generator are kept."""
+        self.writer = writer if writer is not None else ListWriter()
+        self.indentation = 0
 
     @classmethod
     def _is_node_args_valid(cls, node, arg_name):
         return hasattr(node, arg_name) and getattr(node, arg_name) is not None
 
+    def parent_of(self, node):
+        """Return parent of the node. Override it to render trees without `parent` links."""
+        return node.parent
+
     def _get_current_line_no(self):
-        lines = len("".join(self.result).split('\n')) if self.result else 0
-        return lines
+        return self.writer.lines
 
     @classmethod
     def _get_actual_lineno(cls, node):
@@ -238,7 +421,7 @@ class BaseSourceGeneratorNodeVisitor(ast.NodeVisitor):
             self.write(post)
 
     def write(self, x):
-        self.result.append(x)
+        self.writer.write(x)
 
     def correct_line_number(self, node, within_statement=True, use_line_continuation=True):
         if not node or not self._is_node_args_valid(node, 'lineno'):
@@ -256,31 +439,52 @@ class BaseSourceGeneratorNodeVisitor(ast.NodeVisitor):
 
     def add_line(self, within_statement, use_line_continuation):
         if within_statement and use_line_continuation:
-            self.result.append('\\')
+            self.write('\\')
         self.write_newline()
 
     def write_newline(self):
-        if self.result:
-            self.result.append('\n')
-        self.result.append(self.indent_with * self.indentation)
+        try:
+            prefix = self._indent_prefixes[self.indentation]
+        except KeyError:
+            prefix = self._indent_prefixes[self.indentation] = self.indent_with * self.indentation
+        self.writer.newline(prefix)
+
+    def body(self, statements, indent=1, new_line=None):
+        """Write statements of a block, each on its own line unless the block is a single simple statement.
 
-    def body(self, statements, indent=1):
+        Pass `new_line` to decide if the first statement starts a new line.
+        """
         if statements:
+            if new_line is None:
+                new_line = bool(indent) and (len(statements) > 1 or hasattr(statements[0], 'body'))
             with self.indent(indent):
                 for stmt in statements:
-                    self.correct_line_number(stmt, within_statement=False)
+                    self.statement_line(stmt, new_line)
                     self.visit(stmt)
+                    new_line = True
+
+    def statement_line(self, node, new_line=True):
+        """Move to the line of the statement, starting a new line if the statement's line was already reached.
+
+        Statements which got line numbers of their neighbours, for example
+        from `utils.fix_locations`, are thus still written on their own lines.
+        """
+        lines = self._get_current_line_no()
+        self.correct_line_number(node, within_statement=False)
+        if new_line and self._get_current_line_no() == lines:
+            self.write_newline()
 
     def body_or_else(self, node):
         self.body(node.body)
         if node.orelse:
             self.or_else(node)
 
-    def keyword_and_body(self, keyword, body):
-        if self._newline_needed(body[0]):
+    def keyword_and_body(self, keyword, body, new_line=None):
+        # keywords of statements, like ``else:``, always follow a block
+        if self._newline_needed(body[0]) or new_line is not False:
             self.write_newline()
         self.write(keyword)
-        self.body(body)
+        self.body(body, new_line=new_line)
 
     def or_else(self, node):
         self.keyword_and_body('else:', node.orelse)
@@ -390,12 +594,12 @@ class BaseSourceGeneratorNodeVisitor(ast.NodeVisitor):
         else:
             self.generic_visit(node)
 
-    def visit_keyword(self, node):
+    def chain_keyword(self, node):
         if self._is_node_args_valid(node, 'arg'):
             self.write(node.arg + '=')
         else:
             self.write('**')
-        self.visit(node.value)
+        yield node.value
 
     def visit_FunctionDef(self, node):
         self.function_definition(node)
@@ -437,7 +641,10 @@ class BaseSourceGeneratorNodeVisitor(ast.NodeVisitor):
         self.if_elif(node)
 
     def if_elif(self, node, use_elif=False):
-        self.correct_line_number(node, within_statement=False)
+        self.statement_line(node, new_line=use_elif)
+        self.if_clause(node, use_elif)
+
+    def if_clause(self, node, use_elif=False):
         if use_elif:
             self.write('elif ')
         else:
@@ -544,24 +751,88 @@ class BaseSourceGeneratorNodeVisitor(ast.NodeVisitor):
 
     # Expressions
 
-    def visit_Attribute(self, node):
-        self.visit(node.value)
+    def render_chain(self, node):
+        """Render `node` and chains of nodes below it, like `a.b(c).d + e`, without recursion.
+
+        `chain_<type>` generators render nodes and yield children, which
+        are rendered by the same loop if they are chain nodes too. Only
+        remaining children, like right operands of binary operations, are
+        visited recursively.
+        """
+        nodes = [node]
+        renderers = [getattr(self, 'chain_' + node.__class__.__name__)(node)]
+        chain_renderers = self._chain_renderers
+        while renderers:
+            child = next(renderers[-1], None)
+            if child is None:
+                renderers.pop()
+                finished = nodes.pop()
+                if nodes:
+                    self._finish_chain_node(finished)
+                continue
+            try:
+                renderer = chain_renderers[child.__class__]
+            except KeyError:
+                renderer = self._get_chain_renderer(child)
+            if renderer is None:
+                self.visit(child)
+            else:
+                self.correct_line_number(child)
+                self._start_chain_node(child)
+                nodes.append(child)
+                renderers.append(renderer(child))
+
+    visit_Attribute = visit_BinOp = visit_BoolOp = visit_Call = visit_Subscript = render_chain
+    visit_keyword = visit_Starred = render_chain
+
+    def _get_chain_renderer(self, node):
+        name = node.__class__.__name__
+        # nodes with overridden visit methods are not rendered as a part of chains
+        visit = getattr(getattr(self, 'visit_' + name, None), '__func__', None)
+        render_chain = BaseSourceGeneratorNodeVisitor.render_chain
+        # methods of classes are unbound methods in Python 2
+        renderer = getattr(self, 'chain_' + name) if visit is getattr(render_chain, '__func__', render_chain) else None
+        self._chain_renderers[node.__class__] = renderer
+        return renderer
+
+    def _start_chain_node(self, node):
+        pass
+
+    def _finish_chain_node(self, node):
+        pass
+
+    def chain_Attribute(self, node):
+        yield node.value
         self.write('.' + node.attr)
 
-    def visit_Call(self, node):
-        self.visit(node.func)
+    def chain_Call(self, node):
+        yield node.func
         with self.inside('(', ')'):
-            starargs = getattr(node, 'starargs', None)
-            kwargs = getattr(node, 'kwargs', None)
-            if starargs:
-                starargs = [starargs]
-            else:
-                starargs = []
-            if kwargs:
-                kwargs = [kwargs]
-            else:
-                kwargs = []
-            self.call_signature(node.args, node.keywords, starargs, kwargs)
+            # arguments are rendered as a part of the chain, so calls nested in any of them don't recurse
+            write_comma = CommaWriter(self.write)
+            for prefix, arguments in zip(self.call_argument_prefixes, self._call_arguments(node)):
+                for argument in arguments:
+                    write_comma()
+                    self.correct_line_number(argument, use_line_continuation=False)
+                    self.write(prefix)
+                    yield argument
+
+    # prefixes of arguments, keywords, starargs and kwargs of calls
+    call_argument_prefixes = ('', '', '*', '**')
+
+    @staticmethod
+    def _call_arguments(node):
+        starargs = getattr(node, 'starargs', None)
+        kwargs = getattr(node, 'kwargs', None)
+        if starargs:
+            starargs = [starargs]
+        else:
+            starargs = []
+        if kwargs:
+            kwargs = [kwargs]
+        else:
+            kwargs = []
+        return node.args, node.keywords, starargs, kwargs
 
     def call_signature(self, args, keywords, starargs, kwargs):
         write_comma = CommaWriter(self.write)
@@ -644,28 +915,28 @@ class BaseSourceGeneratorNodeVisitor(ast.NodeVisitor):
                     self.write('**')
                 self.visit(value)
 
-    def visit_BinOp(self, node):
-        with self.inside('(', ')', cond=isinstance(node.parent, (ast.BinOp, ast.Attribute))):
-            self.visit(node.left)
+    def chain_BinOp(self, node):
+        with self.inside('(', ')', cond=isinstance(self.parent_of(node), (ast.BinOp, ast.Attribute))):
+            yield node.left
             self.write(' %s ' % BINOP_SYMBOLS[type(node.op)])
             self.visit(node.right)
 
-    def visit_BoolOp(self, node):
+    def chain_BoolOp(self, node):
         with self.inside('(', ')'):
             for idx, value in enumerate(node.values):
                 if idx:
                     self.write(' %s ' % BOOLOP_SYMBOLS[type(node.op)])
-                self.visit(value)
+                yield value
 
     def visit_Compare(self, node):
-        with self.inside('(', ')', cond=(isinstance(node.parent, ast.Compare))):
+        with self.inside('(', ')', cond=(isinstance(self.parent_of(node), ast.Compare))):
             self.visit(node.left)
             for op, right in zip(node.ops, node.comparators):
                 self.write(' %s ' % CMPOP_SYMBOLS[type(op)])
                 self.visit(right)
 
     def visit_UnaryOp(self, node):
-        with self.inside('(', ')', cond=isinstance(node.parent, (ast.BinOp, ast.UnaryOp))):
+        with self.inside('(', ')', cond=isinstance(self.parent_of(node), (ast.BinOp, ast.UnaryOp))):
             op = UNARYOP_SYMBOLS[type(node.op)]
             self.write(op)
             if op == 'not':
@@ -675,8 +946,8 @@ class BaseSourceGeneratorNodeVisitor(ast.NodeVisitor):
                                              and not self._is_named_constant(node.operand))):
                 self.visit(node.operand)
 
-    def visit_Subscript(self, node):
-        self.visit(node.value)
+    def chain_Subscript(self, node):
+        yield node.value
         with self.inside('[', ']'):
             self.visit(node.slice)
 
@@ -713,7 +984,7 @@ class BaseSourceGeneratorNodeVisitor(ast.NodeVisitor):
             self.visit(node.value)
 
     def visit_Lambda(self, node):
-        with self.inside('(', ')', cond=isinstance(node.parent, ast.Call)):
+        with self.inside('(', ')', cond=isinstance(self.parent_of(node), ast.Call)):
             self.write('lambda')
             self.signature(node.args, add_space=True)
             self.write(': ')
@@ -747,15 +1018,15 @@ class BaseSourceGeneratorNodeVisitor(ast.NodeVisitor):
                 self.visit(comprehension)
 
     def visit_IfExp(self, node):
-        with self.inside('(', ')', cond=isinstance(node.parent, ast.BinOp)):
+        with self.inside('(', ')', cond=isinstance(self.parent_of(node), ast.BinOp)):
             self.visit(node.body)
             self.write(' if ')
             self.visit(node.test)
-            self.keyword_and_body(' else ', [node.orelse])
+            self.keyword_and_body(' else ', [node.orelse], new_line=False)
 
-    def visit_Starred(self, node):
+    def chain_Starred(self, node):
         self.write('*')
-        self.visit(node.value)
+        yield node.value
 
     def visit_Repr(self, node):
         with self.inside('`', '`'):
@@ -808,7 +1079,7 @@ class BaseSourceGeneratorNodeVisitor(ast.NodeVisitor):
 
     def try_handlers(self, node):
         for handler in node.handlers:
-            self.correct_line_number(handler, within_statement=False)
+            self.statement_line(handler)
             self.visit(handler)
 
     def visit_TryFinally(self, node):
@@ -957,12 +1228,10 @@ class SourceGeneratorNodeVisitorPython35(SourceGeneratorNodeVisitorPython34):
         if self._is_node_args_valid(node, 'value'):
             self.visit(node.value)
 
-    def visit_Call(self, node):
-        self.visit(node.func)
-        with self.inside('(', ')'):
-            args, starargs = self._separate_args_and_starargs(node)
-            keywords, kwargs = self._separate_keywords_and_kwargs(node)
-            self.call_signature(args, keywords, starargs, kwargs)
+    def _call_arguments(self, node):
+        args, starargs = self._separate_args_and_starargs(node)
+        keywords, kwargs = self._separate_keywords_and_kwargs(node)
+        return args, keywords, starargs, kwargs
 
     @staticmethod
     def _separate_keywords_and_kwargs(node):
@@ -986,6 +1255,8 @@ class SourceGeneratorNodeVisitorPython35(SourceGeneratorNodeVisitorPython34):
                 args.append(arg)
         return args, starargs
 
+    call_argument_prefixes = ('', '', '', '')
+
     def call_starargs(self, stararg):
         self.visit(stararg)
 
@@ -1015,6 +1286,9 @@ class SourceGeneratorNodeVisitorPython36(SourceGeneratorNodeVisitorPython35):
 
 class SourceGeneratorNodeVisitorPython38(SourceGeneratorNodeVisitorPython36):
     __python_version__ = (3, 8)
+    # containers of simple constants are written at once, without visiting elements
+    bulk_constants = True
+    _BULK_CONSTANT_TYPES = frozenset([int, float, complex, str, bytes, bool, type(None), type(Ellipsis)])
 
     def visit_Constant(self, node):
         if type(node.value) == str:
@@ -1024,6 +1298,147 @@ class SourceGeneratorNodeVisitorPython38(SourceGeneratorNodeVisitorPython36):
         else:
             self.write(str(node.value))
 
+    def visit_Tuple(self, node):
+        constants = self._constant_texts(node.elts)
+        if constants is None:
+            super(SourceGeneratorNodeVisitorPython38, self).visit_Tuple(node)
+            return
+        with self.inside('(', ')'):
+            self._write_constants(constants)
+            if len(node.elts) == 1:
+                self.write(',')
+
+    def sequence_visit(left, right, name):  # @NoSelf
+        def visit(self, node):
+            constants = self._constant_texts(node.elts)
+            if constants is None:
+                getattr(super(SourceGeneratorNodeVisitorPython38, self), name)(node)
+                return
+            with self.inside(left, right):
+                self._write_constants(constants)
+
+        return visit
+
+    visit_List = sequence_visit('[', ']', 'visit_List')
+    visit_Set = sequence_visit('{', '}', 'visit_Set')
+    del sequence_visit
+
+    def visit_Dict(self, node):
+        keys = self._constant_texts(node.keys)
+        values = None if keys is None else self._constant_texts(node.values)
+        if values is None:
+            super(SourceGeneratorNodeVisitorPython38, self).visit_Dict(node)
+            return
+        with self.inside('{', '}'):
+            self._write_constants(keys, values)
+
+    def _constant_texts(self, nodes):
+        """Return code and line numbers of constant nodes, or None if the fast path can not be used.
+
+        Every check is a single pass of builtins over the whole container,
+        only signed numbers are checked separately.
+        """
+        if not self.bulk_constants or not self.writer.lines:
+            return None
+        node_types = set(map(type, nodes))
+        if not node_types <= {ast.Constant, ast.UnaryOp}:
+            return None
+        if ast.UnaryOp in node_types:
+            # signed numbers have no values, so they get None, which is a constant too
+            values = list(map(getattr, nodes, repeat('value'), repeat(None)))
+        else:
+            values = list(map(_get_value, nodes))
+        value_types = set(map(type, values))
+        if not value_types <= self._BULK_CONSTANT_TYPES:
+            return None
+        try:
+            linenos = list(map(_get_lineno, nodes))
+        except AttributeError:
+            return None
+        if None in linenos:
+            return None
+        texts = list(map(repr, values))
+        # line numbers of multi-line strings with unknown columns are fixed by visiting them
+        multi_line = str in value_types and '\\n' in ''.join(texts)
+        if multi_line and -1 in map(getattr, nodes, repeat('col_offset'), repeat(None)):
+            return None
+        if ast.UnaryOp in node_types:
+            unary_indexes = list(compress(count(), map(is_, map(type, nodes), repeat(ast.UnaryOp))))
+            signed_texts = self._signed_number_texts(list(map(nodes.__getitem__, unary_indexes)),
+                                                     list(map(linenos.__getitem__, unary_indexes)))
+            if signed_texts is None:
+                return None
+            for index, text in zip(unary_indexes, signed_texts):
+                texts[index] = text
+        if type(Ellipsis) in value_types:
+            texts = ['...' if text == 'Ellipsis' else text for text in texts]
+        return texts, linenos
+
+    @staticmethod
+    def _signed_number_texts(nodes, linenos):
+        """Return code of unary operations on numbers, or None if some of them are not."""
+        operands = list(map(_get_operand, nodes))
+        if set(map(type, operands)) != {ast.Constant}:
+            return None
+        values = list(map(_get_value, operands))
+        op_types = list(map(type, map(_get_op, nodes)))
+        if not set(map(type, values)) <= {int, float, complex} or ast.Not in op_types:
+            return None
+        try:
+            # operands on other lines are preceded by line continuations
+            if list(map(_get_lineno, operands)) != linenos:
+                return None
+        except AttributeError:
+            return None
+        return list(map(add, map(UNARYOP_SYMBOLS.__getitem__, op_types), map(repr, values)))
+
+    def _write_constants(self, constants, values=None):
+        """Write constants, or keys and values of pairs, the same way as visiting them one by one would do."""
+        texts, linenos = constants
+        if not texts:
+            return
+        separators = (', ',)
+        if values is None:
+            parts = [None] * (2 * len(texts))
+            parts[1::2] = texts
+        else:
+            parts = [None] * (4 * len(texts))
+            parts[1::4] = texts
+            parts[3::4] = values[0]
+            if linenos == values[1]:
+                # no value needs a line continuation, so only keys get prefixes
+                parts[2::4] = [': '] * len(texts)
+            else:
+                separators = (', ', ': ')
+                linenos = list(chain.from_iterable(zip(linenos, values[1])))
+        # every constant is preceded by a separator and line continuations if needed
+        step = len(parts) // len(linenos)
+        lines = self.writer.lines
+        if max(linenos) > lines:
+            continuation = '\\\n' + self.indent_with * (self.indentation + 1)
+            line_steps = list(map(sub, linenos, chain([lines], linenos)))
+            if min(line_steps) < 0:
+                line_steps = self._line_steps(linenos, lines)
+            prefixes = [_Prefixes(separator, continuation) for separator in separators]
+            parts[::step] = map(getitem, cycle(prefixes), line_steps)
+            parts[0] = continuation * line_steps[0]
+        else:
+            parts[::step] = islice(cycle(separators), len(linenos))
+            parts[0] = ''
+        self.write(''.join(parts))
+
+    @staticmethod
+    def _line_steps(linenos, lines):
+        """Return numbers of lines every constant starts below the furthest line reached before it."""
+        steps = []
+        for lineno in linenos:
+            if lineno > lines:
+                steps.append(lineno - lines)
+                lines = lineno
+            else:
+                steps.append(0)
+        return steps
+
     def visit_NamedExpr(self, node):
         self.visit(node.target)
         self.write(' := ')
@@ -1058,6 +1473,24 @@ class SourceGeneratorNodeVisitorPython38(SourceGeneratorNodeVisitorPython36):
             return SourceGeneratorNodeVisitorPython36._get_actual_lineno(node)
 
 
+class _Prefixes(dict):
+    """Separator followed by line continuations, by the number of the continuations."""
+
+    def __init__(self, separator, continuation):
+        super(_Prefixes, self).__init__()
+        self.separator = separator
+        self.continuation = continuation
+
+    def __missing__(self, count):
+        prefix = self[count] = self.separator + self.continuation * count
+        return prefix
+
+
+_get_lineno = attrgetter('lineno')
+_get_value = attrgetter('value')
+_get_operand = attrgetter('operand')
+_get_op = attrgetter('op')
+
 SourceGeneratorNodeVisitor = utils.get_by_python_version([
     SourceGeneratorNodeVisitorPython26,
     SourceGeneratorNodeVisitorPython27,
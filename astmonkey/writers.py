@@ -0,0 +1,100 @@
+import io
+
+
+class BaseWriter(object):
+    """Output sink of the source generator.
+
+    Writers keep track of the position of the end of the output: `lines` is
+    the number of started lines (0 if nothing was written yet) and `column`
+    is the length of the last line.
+    """
+
+    def __init__(self):
+        self.lines = 0
+        self.column = 0
+
+    def write(self, text):
+        raise NotImplementedError()
+
+    def newline(self, prefix):
+        """Start a new line indented with `prefix`."""
+        if self.lines:
+            self.write('\n' + prefix)
+        else:
+            self.write(prefix)
+
+    def getvalue(self):
+        raise NotImplementedError()
+
+    def _advance(self, text):
+        if not self.lines:
+            self.lines = 1
+        newlines = text.count('\n')
+        if newlines:
+            self.lines += newlines
+            self.column = len(text) - text.rfind('\n') - 1
+        else:
+            self.column += len(text)
+
+
+class ListWriter(BaseWriter):
+    """Collects written strings in the `result` list."""
+
+    def __init__(self):
+        super(ListWriter, self).__init__()
+        self.result = []
+
+    def write(self, text):
+        self.result.append(text)
+        self._advance(text)
+
+    def getvalue(self):
+        return ''.join(self.result)
+
+
+class StringIOWriter(BaseWriter):
+    """Writes to `stream`, a new `io.StringIO` by default."""
+
+    def __init__(self, stream=None):
+        super(StringIOWriter, self).__init__()
+        self.stream = stream if stream is not None else io.StringIO()
+
+    def write(self, text):
+        self.stream.write(text)
+        self._advance(text)
+
+    def getvalue(self):
+        return self.stream.getvalue()
+
+
+class BytesWriter(BaseWriter):
+    """Encodes written strings into the `buffer` bytearray.
+
+    Encoded line breaks with indentation are cached, so starting a new line
+    does not allocate anything but the buffer growth.
+    """
+
+    def __init__(self, buffer=None, encoding='utf-8'):
+        super(BytesWriter, self).__init__()
+        self.buffer = buffer if buffer is not None else bytearray()
+        self.encoding = encoding
+        self._newlines = {}
+
+    def write(self, text):
+        self.buffer += text.encode(self.encoding)
+        self._advance(text)
+
+    def newline(self, prefix):
+        if not self.lines:
+            self.write(prefix)
+            return
+        try:
+            encoded = self._newlines[prefix]
+        except KeyError:
+            encoded = self._newlines[prefix] = ('\n' + prefix).encode(self.encoding)
+        self.buffer += encoded
+        self.lines += 1
+        self.column = len(prefix)
+
+    def getvalue(self):
+        return bytes(self.buffer)
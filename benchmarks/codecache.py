@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""Compare compiling whole mutated modules with compiling them by `CodeCache`.
+
+Every standard library module given on the command line (by default a few
+large ones) is parsed and annotated. Then a few mutants are made by
+changing integer constants spread over the module, and every mutant (and
+its reverted version) is compiled as a whole and by `CodeCache`, which
+compiles only the function or method containing the mutated constant.
+
+Usage: python benchmarks/codecache.py [module_name ...]
+"""
+import ast
+import importlib
+import inspect
+import sys
+import timeit
+
+from astmonkey import transformers
+from astmonkey.codecache import CodeCache
+
+DEFAULT_MODULES = ['typing', 'argparse', 'pydoc', 'tarfile']
+MUTANTS = 20
+
+
+def mutants(tree):
+    constants = [node for node in ast.walk(tree) if isinstance(node, ast.Constant) and type(node.value) is int]
+    return constants[::max(1, len(constants) // MUTANTS)][:MUTANTS]
+
+
+def compile_module(tree, filename):
+    def update(node):
+        compile(tree, filename, 'exec')
+    return update
+
+
+def compile_units(tree, filename):
+    cache = CodeCache(tree, filename)
+    cache.code_objects()
+
+    def update(node):
+        cache.invalidate(node)
+        cache.code_objects()
+    return update
+
+
+if __name__ == '__main__':
+    for module_name in sys.argv[1:] or DEFAULT_MODULES:
+        module = importlib.import_module(module_name)
+        tree = transformers.ParentChildNodeTransformer().visit(ast.parse(inspect.getsource(module)))
+        nodes = mutants(tree)
+        print('{0} ({1} mutants)'.format(module_name, len(nodes)))
+        for name, prepare in [('compile', compile_module), ('CodeCache', compile_units)]:
+            update = prepare(tree, module.__file__)
+
+            def run():
+                for node in nodes:
+                    node.value += 1
+                    update(node)
+                    node.value -= 1
+                    update(node)
+            best = min(timeit.repeat(run, number=1, repeat=3))
+            print('    {0:<10} {1:8.2f} ms per mutant'.format(name, best * 1000 / len(nodes)))
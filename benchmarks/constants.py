@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+"""Compare rendering of large literal tables with and without the bulk constants fast path.
+
+Usage: python benchmarks/constants.py [number_of_elements]
+"""
+import ast
+import random
+import sys
+import timeit
+
+from astmonkey import transformers, visitors
+
+
+def make_source(size):
+    rng = random.Random(0)
+    values = [rng.choice([rng.randint(-10 ** 6, 10 ** 6), 'key{0}'.format(rng.randint(0, 999)), None])
+              for _ in range(size)]
+    lines = ['TABLE = {0!r}'.format(values), 'MAPPING = {']
+    lines.extend('    {0!r}: {1!r},'.format('key{0}'.format(index), value) for index, value in enumerate(values))
+    lines.append('}')
+    return '\n'.join(lines)
+
+
+def render(node):
+    generator = visitors.SourceGeneratorNodeVisitor(' ' * 4)
+    generator.visit(node)
+    return generator.writer.getvalue()
+
+
+if __name__ == '__main__':
+    node = ast.parse(make_source(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
+    transformers.ParentChildNodeTransformer().visit(node)
+    visitors.FixLinenoNodeVisitor().visit(node)
+    for bulk in [False, True]:
+        visitors.SourceGeneratorNodeVisitor.bulk_constants = bulk
+        best = min(timeit.repeat(lambda: render(node), number=1, repeat=3))
+        print('bulk_constants={0!s:<6} {1:8.2f} ms'.format(bulk, best * 1000))
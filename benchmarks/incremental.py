@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""Compare `incremental.reparse` with parsing and annotating whole modules after an edit.
+
+Every standard library module given on the command line (by default a few
+large ones) is parsed and annotated, then a character is typed at the end
+of the last line of the middle function, with and without adding a line.
+
+Usage: python benchmarks/incremental.py [module_name ...]
+"""
+import ast
+import importlib
+import inspect
+import sys
+import timeit
+
+from astmonkey import incremental, transformers
+
+DEFAULT_MODULES = ['typing', 'argparse', 'pydoc', 'tarfile']
+
+
+def full(tree, source, edit):
+    tree = ast.parse(incremental.apply_edit(source, edit))
+    return transformers.ParentChildNodeTransformer().visit(tree)
+
+
+def edits(tree, source):
+    functions = [node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)]
+    function = functions[len(functions) // 2]
+    line = function.end_lineno
+    column = len(source.split('\n')[line - 1])
+    yield 'same lines', incremental.TextEdit((line, column), (line, column), ' ')
+    yield 'new line', incremental.TextEdit((line, column), (line, column), '\n')
+
+
+if __name__ == '__main__':
+    for module_name in sys.argv[1:] or DEFAULT_MODULES:
+        source = inspect.getsource(importlib.import_module(module_name))
+        print(module_name)
+        for edit_name, edit in edits(ast.parse(source), source):
+            for name, update in [('full', full), ('reparse', incremental.reparse)]:
+                timings = []
+                for _ in range(5):
+                    tree = full(ast.parse(source), source, incremental.TextEdit((1, 0), (1, 0), ''))
+                    timings.append(timeit.timeit(lambda: update(tree, source, edit), number=1))
+                print('    {0:<10} {1:<8} {2:8.2f} ms'.format(edit_name, name, min(timings) * 1000))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""Compare fixing locations of whole modules with fixing only inserted subtrees.
+
+Every standard library module given on the command line (by default a few
+large ones) is parsed and annotated. Then a synthetic statement is inserted
+at the start of a few function bodies spread over the module, one at a time, and its
+locations are fixed by `ast.fix_missing_locations` and
+`FixLinenoNodeVisitor` over the whole module and by `fix_locations` of the
+inserted statement.
+
+Usage: python benchmarks/locations.py [module_name ...]
+"""
+import ast
+import importlib
+import inspect
+import sys
+import timeit
+
+from astmonkey import transformers
+from astmonkey.utils import fix_locations
+from astmonkey.visitors import FixLinenoNodeVisitor
+
+DEFAULT_MODULES = ['typing', 'argparse', 'pydoc', 'tarfile']
+MUTANTS = 20
+
+
+def mutants(tree):
+    functions = [node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)]
+    return functions[::max(1, len(functions) // MUTANTS)][:MUTANTS]
+
+
+def statement():
+    call = ast.Call(func=ast.Name(id='print', ctx=ast.Load()), args=[ast.Constant(value='mutant')], keywords=[])
+    return ast.Expr(value=call)
+
+
+def fix_module(tree, node):
+    ast.fix_missing_locations(tree)
+    FixLinenoNodeVisitor().visit(tree)
+
+
+def fix_subtree(tree, node):
+    fix_locations(node)
+
+
+if __name__ == '__main__':
+    for module_name in sys.argv[1:] or DEFAULT_MODULES:
+        module = importlib.import_module(module_name)
+        tree = transformers.ParentChildNodeTransformer().visit(ast.parse(inspect.getsource(module)))
+        functions = mutants(tree)
+        print('{0} ({1} mutants)'.format(module_name, len(functions)))
+        for name, fix in [('module', fix_module), ('subtree', fix_subtree)]:
+            def run():
+                for function in functions:
+                    node = statement()
+                    function.body.insert(0, node)
+                    transformers.ParentChildNodeTransformer().visit(node)
+                    node.parent, node.parents, node.parent_field, node.parent_field_index = function, [function], 'body', 0
+                    function.children.insert(function.children.index(function.body[1]), node)
+                    fix(tree, node)
+                    del function.body[0]
+                    function.children.remove(node)
+            best = min(timeit.repeat(run, number=1, repeat=3))
+            print('    {0:<10} {1:8.3f} ms per mutant'.format(name, best * 1000 / len(functions)))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""Compare separate transformer passes with a fused `Pipeline`.
+
+Every standard library module given on the command line (by default a few
+large ones) is annotated and transformed by five passes, first as separate
+tree walks and then in a single traversal.
+
+Usage: python benchmarks/pipeline.py [module_name ...]
+"""
+import ast
+import importlib
+import inspect
+import sys
+import timeit
+
+from astmonkey import transformers
+
+DEFAULT_MODULES = ['typing', 'argparse', 'pydoc', 'tarfile']
+
+
+class SwapComparison(ast.NodeTransformer):
+
+    def visit_Compare(self, node):
+        return node
+
+
+class CountCalls(ast.NodeVisitor):
+
+    def __init__(self):
+        self.calls = 0
+
+    def visit_Call(self, node):
+        self.calls += 1
+
+
+class RenameNames(ast.NodeTransformer):
+
+    def visit_Name(self, node):
+        return node
+
+
+class NegateConditions(ast.NodeTransformer):
+
+    def leave_If(self, node):
+        return node
+
+
+class DropPass(ast.NodeTransformer):
+
+    def visit_Pass(self, node):
+        return node
+
+
+def make_stages():
+    return [SwapComparison(), CountCalls(), RenameNames(), NegateConditions(), DropPass()]
+
+
+def separate(source):
+    node = ast.parse(source)
+    for stage in make_stages():
+        for node_class in (ast.Compare, ast.Call, ast.Name, ast.If, ast.Pass):
+            generic = getattr(stage, 'visit_' + node_class.__name__, None) or getattr(
+                stage, 'leave_' + node_class.__name__, None)
+            if generic is not None:
+                setattr(stage, 'visit_' + node_class.__name__, _generic(stage, generic))
+        stage.visit(node)
+    return transformers.ParentChildNodeTransformer().visit(node)
+
+
+def _generic(stage, hook):
+    def visit(node):
+        stage.generic_visit(node)
+        return hook(node)
+
+    return visit
+
+
+def fused(source):
+    return transformers.Pipeline(make_stages(), annotate=True).visit(ast.parse(source))
+
+
+if __name__ == '__main__':
+    for module_name in sys.argv[1:] or DEFAULT_MODULES:
+        source = inspect.getsource(importlib.import_module(module_name))
+        print(module_name)
+        for name, function in [('separate', separate), ('pipeline', fused)]:
+            best = min(timeit.repeat(lambda: function(source), number=3, repeat=3)) / 3
+            print('    {0:<10} {1:8.2f} ms'.format(name, best * 1000))
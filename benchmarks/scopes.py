@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""Compare analyzing scopes of whole mutated modules with invalidating only changed scopes.
+
+Every standard library module given on the command line (by default a few
+large ones) is parsed and annotated. Then names spread over the module are
+renamed one by one, and after every change the scopes are computed again
+by a new `ScopeAnalysis` of the whole module and by `invalidate` of the
+scope containing the renamed name. Every change is followed by looking up
+bindings of all names of the module.
+
+Usage: python benchmarks/scopes.py [module_name ...]
+"""
+import ast
+import importlib
+import inspect
+import sys
+import timeit
+
+from astmonkey import transformers
+from astmonkey.scopes import ScopeAnalysis
+
+DEFAULT_MODULES = ['typing', 'argparse', 'pydoc', 'tarfile']
+MUTANTS = 20
+
+
+def mutants(tree):
+    names = [node for node in ast.walk(tree) if isinstance(node, ast.Name) and isinstance(node.parent, ast.stmt)]
+    return names[::max(1, len(names) // MUTANTS)][:MUTANTS]
+
+
+def analyze_module(tree):
+    def update(node):
+        return ScopeAnalysis(tree)
+    return update
+
+
+def invalidate_scope(tree):
+    analysis = ScopeAnalysis(tree)
+
+    def update(node):
+        analysis.invalidate(node)
+        return analysis
+    return update
+
+
+if __name__ == '__main__':
+    for module_name in sys.argv[1:] or DEFAULT_MODULES:
+        module = importlib.import_module(module_name)
+        tree = transformers.ParentChildNodeTransformer().visit(ast.parse(inspect.getsource(module)))
+        nodes = mutants(tree)
+        names = [node for node in ast.walk(tree) if isinstance(node, ast.Name)]
+        print('{0} ({1} mutants, {2} names)'.format(module_name, len(nodes), len(names)))
+        for name, prepare in [('analysis', analyze_module), ('invalidate', invalidate_scope)]:
+            update = prepare(tree)
+
+            def run():
+                for node in nodes:
+                    node.id += '_'
+                    update(node)
+                    node.id = node.id[:-1]
+                    analysis = update(node)
+                    for name_node in names:
+                        analysis.binding_of(name_node)
+            best = min(timeit.repeat(run, number=1, repeat=3))
+            print('    {0:<10} {1:8.2f} ms per mutant'.format(name, best * 1000 / len(nodes)))
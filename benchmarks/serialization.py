@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""Compare `serialize`/`deserialize` with pickle.
+
+Every standard library module given on the command line (by default a few
+large ones) is parsed and written with pickle and with `serialize`. Loading
+is measured for plain trees (`pickle.loads` and `deserialize` with
+``annotate=False``) and for annotated trees (an annotated pickle, a plain
+pickle annotated after loading, and `deserialize`, which annotates while
+loading).
+
+Every measurement runs in a fresh process: expression context nodes are
+shared between all trees parsed by the interpreter, so once any tree was
+annotated, their `parents` would pull nodes of other trees into pickles.
+
+Usage: python benchmarks/serialization.py [module_name ...]
+"""
+import ast
+import importlib
+import inspect
+import pickle
+import subprocess
+import sys
+import timeit
+
+from astmonkey import serialization, transformers
+
+DEFAULT_MODULES = ['typing', 'argparse', 'pydoc', 'tarfile']
+
+
+def plain_pickle(source):
+    return pickle.dumps(ast.parse(source), pickle.HIGHEST_PROTOCOL), pickle.loads
+
+
+def plain_serialized(source):
+    return serialization.serialize(ast.parse(source)), lambda data: serialization.deserialize(data, annotate=False)
+
+
+def annotated_pickle(source):
+    tree = transformers.ParentChildNodeTransformer().visit(ast.parse(source))
+    return pickle.dumps(tree, pickle.HIGHEST_PROTOCOL), pickle.loads
+
+
+def annotated_after_pickle(source):
+    return pickle.dumps(ast.parse(source), pickle.HIGHEST_PROTOCOL), lambda data: (
+        transformers.ParentChildNodeTransformer().visit(pickle.loads(data)))
+
+
+def annotated_serialized(source):
+    return serialization.serialize(ast.parse(source)), serialization.deserialize
+
+
+METHODS = [
+    ('plain pickle', plain_pickle),
+    ('plain serialize', plain_serialized),
+    ('annotated pickle', annotated_pickle),
+    ('pickle, annotate', annotated_after_pickle),
+    ('serialize', annotated_serialized),
+]
+
+
+def measure(module_name, method_name):
+    source = inspect.getsource(importlib.import_module(module_name))
+    data, load = dict(METHODS)[method_name](source)
+    best = min(timeit.repeat(lambda: load(data), number=3, repeat=5)) / 3
+    print('    {0:<16} {1:8d} bytes {2:8.2f} ms'.format(method_name, len(data), best * 1000))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--measure']:
+        measure(*sys.argv[2:4])
+        sys.exit()
+    for module_name in sys.argv[1:] or DEFAULT_MODULES:
+        print(module_name)
+        sys.stdout.flush()
+        for method_name, _ in METHODS:
+            subprocess.check_call([sys.executable, __file__, '--measure', module_name, method_name])
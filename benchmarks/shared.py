@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""Compare memory of workers receiving a copy of a tree with workers sharing it.
+
+The tree of a standard library module is sent to every worker of a pool as
+a pickle or shared with `SharedTree`, and every worker renders a few of its
+top-level statements. Peak memory growth of every worker is reported.
+
+Usage: python benchmarks/shared.py [module_name] [workers]
+"""
+import ast
+import importlib
+import inspect
+import pickle
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from astmonkey import transformers, visitors
+from astmonkey.shared import SharedTree
+
+STATEMENTS = 5
+
+
+def _peak_memory():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def render_copy(data):
+    before = _peak_memory()
+    tree = pickle.loads(data)
+    for statement in tree.body[:STATEMENTS]:
+        visitors.to_source(ast.Module(body=[statement], type_ignores=[]))
+    return _peak_memory() - before
+
+
+def render_shared(name):
+    before = _peak_memory()
+    with SharedTree.attach(name) as tree:
+        for index in tree.children_of(0)[:STATEMENTS]:
+            tree.to_source(index)
+    return _peak_memory() - before
+
+
+if __name__ == '__main__':
+    module_name = sys.argv[1] if len(sys.argv) > 1 else 'typing'
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    tree = transformers.ParentChildNodeTransformer().visit(
+        ast.parse(inspect.getsource(importlib.import_module(module_name))))
+    shared_tree = SharedTree.share(tree)
+    try:
+        print('{0}, {1} workers, peak memory growth per worker'.format(module_name, workers))
+        for name, function, argument in [('pickle', render_copy, pickle.dumps(tree, pickle.HIGHEST_PROTOCOL)),
+                                         ('shared', render_shared, shared_tree.name)]:
+            with ProcessPoolExecutor(workers) as executor:
+                growths = list(executor.map(function, [argument] * workers))
+            print('    {0:<8} {1:8d} kB'.format(name, max(growths)))
+    finally:
+        shared_tree.close()
+        shared_tree.unlink()
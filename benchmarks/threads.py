@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""Measure scaling of rendering variants of a shared tree in many threads.
+
+Every thread renders variants of the same standard library module with a
+shared `Renderer`. Scaling is expected only on free-threaded CPython.
+
+Usage: python benchmarks/threads.py [module_name] [max_threads]
+"""
+import ast
+import importlib
+import inspect
+import sys
+import threading
+import time
+
+from astmonkey import transformers
+from astmonkey.rendering import Renderer
+from astmonkey.variants import TreeVariant
+
+RENDERS_PER_THREAD = 8
+
+
+def make_variants(module_name):
+    node = ast.parse(inspect.getsource(importlib.import_module(module_name)))
+    transformers.ParentChildNodeTransformer().visit(node)
+    binops = [child for child in ast.walk(node) if isinstance(child, ast.BinOp)][:RENDERS_PER_THREAD]
+    return [TreeVariant(node).replace(binop.op, ast.Sub()) for binop in binops]
+
+
+def measure(renderer, variants, threads_count):
+    barrier = threading.Barrier(threads_count + 1)
+
+    def render():
+        barrier.wait()
+        for variant in variants:
+            renderer.to_source(variant)
+
+    threads = [threading.Thread(target=render) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return threads_count * len(variants) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    module_name = sys.argv[1] if len(sys.argv) > 1 else 'argparse'
+    max_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('{0} ({1})'.format(module_name, 'GIL enabled' if gil else 'free-threaded'))
+    variants = make_variants(module_name)
+    renderer = Renderer()
+    base = None
+    threads_count = 1
+    while threads_count <= max_threads:
+        throughput = measure(renderer, variants, threads_count)
+        base = base or throughput
+        print('    {0:>3} threads {1:8.1f} renders/s {2:5.2f}x'.format(threads_count, throughput, throughput / base))
+        threads_count *= 2
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""Compare tokens of generated code from `TokenWriter` with tokenizing the code.
+
+Every standard library module given on the command line (by default a few
+large ones) is parsed. Generating code with `StringIOWriter` followed by
+`tokenize.generate_tokens` is compared with generating it with
+`TokenWriter`, which emits the tokens while the code is written.
+
+Usage: python benchmarks/tokens.py [module_name ...]
+"""
+import ast
+import importlib
+import inspect
+import io
+import sys
+import timeit
+import tokenize
+
+from astmonkey import tokens, visitors, writers
+
+DEFAULT_MODULES = ['typing', 'argparse', 'pydoc', 'tarfile']
+
+
+def tokenized(tree):
+    code = visitors.to_source(tree, writer=writers.StringIOWriter())
+    return list(tokenize.generate_tokens(io.StringIO(code).readline))
+
+
+def token_writer(tree):
+    writer = tokens.TokenWriter()
+    visitors.to_source(tree, writer=writer)
+    return writer.get_tokens()
+
+
+if __name__ == '__main__':
+    for module_name in sys.argv[1:] or DEFAULT_MODULES:
+        tree = ast.parse(inspect.getsource(importlib.import_module(module_name)))
+        print(module_name)
+        for name, generate in [('tokenize', tokenized), ('TokenWriter', token_writer)]:
+            best = min(timeit.repeat(lambda: generate(tree), number=3, repeat=3)) / 3
+            print('    {0:<12} {1:8d} tokens {2:8.2f} ms'.format(name, len(generate(tree)), best * 1000))
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""Compare the structural tree diff with a text diff of generated code.
+
+Every standard library module given on the command line (by default a few
+large ones) is parsed twice, one copy gets a few statements changed and
+moved, and both versions are compared.
+
+Usage: python benchmarks/treediff.py [module_name ...]
+"""
+import ast
+import difflib
+import importlib
+import inspect
+import sys
+import timeit
+
+from astmonkey import treediff
+from astmonkey.visitors import to_source
+
+DEFAULT_MODULES = ['typing', 'argparse', 'pydoc', 'tarfile']
+
+
+def modify(source):
+    node = ast.parse(source)
+    for binop in [child for child in ast.walk(node) if isinstance(child, ast.BinOp)][::50]:
+        binop.op = ast.Sub()
+    node.body.append(node.body.pop(len(node.body) // 2))
+    return node
+
+
+def text_diff(original, modified):
+    return list(difflib.unified_diff(to_source(original).split('\n'), to_source(modified).split('\n'), n=0))
+
+
+if __name__ == '__main__':
+    for module_name in sys.argv[1:] or DEFAULT_MODULES:
+        source = inspect.getsource(importlib.import_module(module_name))
+        original = ast.parse(source)
+        modified = modify(source)
+        print('{0} ({1} edits)'.format(module_name, len(treediff.diff(original, modified))))
+        for name, function in [('text', text_diff), ('tree', treediff.diff)]:
+            best = min(timeit.repeat(lambda: function(original, modified), number=3, repeat=3)) / 3
+            print('    {0:<10} {1:8.2f} ms'.format(name, best * 1000))
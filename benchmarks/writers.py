@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""Compare output backends of the source generator.
+
+Every standard library module given on the command line (by default a few
+large ones) is rendered to UTF-8 encoded bytes with each writer.
+
+Usage: python benchmarks/writers.py [module_name ...]
+"""
+import ast
+import importlib
+import inspect
+import sys
+import timeit
+
+from astmonkey import transformers, visitors, writers
+
+DEFAULT_MODULES = ['typing', 'argparse', 'pydoc', 'tarfile']
+
+
+def prepare(module_name):
+    node = ast.parse(inspect.getsource(importlib.import_module(module_name)))
+    transformers.ParentChildNodeTransformer().visit(node)
+    visitors.FixLinenoNodeVisitor().visit(node)
+    return node
+
+
+def render(node, writer):
+    generator = visitors.SourceGeneratorNodeVisitor(' ' * 4, writer)
+    generator.visit(node)
+    result = writer.getvalue()
+    return result if isinstance(result, bytes) else result.encode('utf-8')
+
+
+BACKENDS = [
+    ('list', writers.ListWriter),
+    ('StringIO', writers.StringIOWriter),
+    ('bytes', writers.BytesWriter),
+]
+
+if __name__ == '__main__':
+    for module_name in sys.argv[1:] or DEFAULT_MODULES:
+        node = prepare(module_name)
+        print(module_name)
+        for name, writer_class in BACKENDS:
+            best = min(timeit.repeat(lambda: render(node, writer_class()), number=5, repeat=3)) / 5
+            print('    {0:<10} {1:8.2f} ms'.format(name, best * 1000))
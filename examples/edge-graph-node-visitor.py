@@ -4,15 +4,17 @@
 This script draws the AST of a Python module as graph with simple points as nodes.
 Astmonkey's GraphNodeVisitor is subclassed for custom representation of the AST.
 
-Usage: python3 edge-graph-node-visitor.py some_file.py
+Graphs of all given files are laid out by concurrent sfdp processes.
+
+Usage: python3 edge-graph-node-visitor.py some_file.py [other_file.py ...]
 """
 import ast
-import os
 import sys
 
 import pydot
 
 from astmonkey import transformers
+from astmonkey.graphviz import GraphvizRenderer
 from astmonkey.visitors import GraphNodeVisitor
 
 
@@ -36,12 +38,22 @@ class EdgeGraphNodeVisitor(GraphNodeVisitor):
         return pydot.Node(id(node), **self._dot_node_kwargs(node))
 
 
-if __name__ == '__main__':
-    filename = sys.argv[1]
-
+def graph(filename):
     node = ast.parse(open(filename).read())
     node = transformers.ParentChildNodeTransformer().visit(node)
     visitor = EdgeGraphNodeVisitor()
     visitor.visit(node)
-    visitor.graph.write(filename + '.dot')
-    os.system('sfdp -Tpng -o {} {}'.format(filename + '.png', filename + '.dot'))
+    return visitor.graph
+
+
+if __name__ == '__main__':
+    filenames = sys.argv[1:]
+
+    results = GraphvizRenderer('sfdp', timeout=600).run([graph(filename) for filename in filenames])
+    for filename, result in zip(filenames, results):
+        if result.error:
+            print('{}: {}'.format(filename, result.error))
+            continue
+        with open(filename + '.png', 'wb') as f:
+            f.write(result.output)
+        print('{}.png rendered in {:.2f} s'.format(filename, result.elapsed))
@@ -15,6 +15,9 @@ setup(
     url='https://github.com/mutpy/astmonkey',
     packages=['astmonkey'],
     install_requires=['pydot'],
+    entry_points={
+        'console_scripts': ['astmonkey = astmonkey.cli:main'],
+    },
     long_description=long_description,
     classifiers=[
         'Intended Audience :: Developers',